@@ -0,0 +1,197 @@
+"""
+
+Age-based archival: moves files that have sat in a category folder for too
+long into dated buckets, so category folders stay small and quick to list.
+
+plan_archive lists each category folder once (top level only: the buckets
+themselves are never rescanned) and keeps every file whose mtime is older than
+the cutoff, in a CompactPlan per category. The destination is the bucket
+(strftime of the file's mtime, '%Y/%m' by default) under the same category,
+either inside the sorted folder or under a separate archive root:
+
+    Images/photo.jpg  ->  Images/2023/06/photo.jpg
+                      ->  <archive_root>/Images/2023/06/photo.jpg
+
+execute_archive creates every bucket up front and moves the files with the
+same helpers and throttle as a sort.
+
+CLI:
+    python archive.py [folder] [--days N] [--archive-root PATH] [--dry-run]
+
+"""
+
+import os
+import re
+import sys
+from argparse import ArgumentParser
+from os import path
+from time import localtime, strftime, time
+
+from compact_plan import CompactPlan
+
+DEFAULT_BUCKET_FORMAT = '%Y/%m'
+# strftime fields that only depend on the date, and how much of a struct_time the time fields need
+DATE_DIRECTIVES = frozenset('YyCGgmbBhdejaAuwUWVDFx%nt')
+TIME_DIRECTIVE_FIELDS = {'H': 4, 'I': 4, 'k': 4, 'l': 4, 'p': 4, 'M': 5, 'R': 5}
+
+class ArchivePlan:
+    """Files to archive, grouped by source category, each with its destination folder."""
+    def __init__(self, folder_path, target_root, cutoff):
+        self.folder_path = folder_path
+        self.target_root = target_root # folder_path, or the separate archive root
+        self.cutoff = cutoff # files last modified before this timestamp are archived
+        self.by_category = {} # category -> CompactPlan of (filename, destination relative to target_root)
+
+    @property
+    def total(self):
+        return sum(len(entries) for entries in self.by_category.values())
+
+    def destinations(self):
+        """Every destination folder the plan needs, relative to target_root."""
+        return {destination for entries in self.by_category.values() for destination in entries.categories_used()}
+
+    def describe(self, max_examples=10):
+        lines = [f"Archiving {self.total} file(s) from '{self.folder_path}' into '{self.target_root}':"]
+        counts = sorted(((len(entries), category) for category, entries in self.by_category.items()), reverse=True)
+        for files, category in counts[:max_examples]:
+            lines.append(f"  {files} file(s) from {category}")
+        if len(counts) > max_examples:
+            lines.append(f"  ...and {len(counts) - max_examples} more categories")
+        return lines
+
+def bucket_key_length(bucket_format):
+    """How many leading struct_time fields decide the bucket: 3 (the date) unless the format uses time fields."""
+    length = 3
+    for directive in re.findall(r'%(.)', bucket_format):
+        if directive not in DATE_DIRECTIVES:
+            length = max(length, TIME_DIRECTIVE_FIELDS.get(directive, 9)) # seconds, time zone or unknown: all of it
+    return length
+
+def plan_archive(folder_path, categories, older_than_days, archive_root='', bucket_format=DEFAULT_BUCKET_FORMAT,
+                 now=None, on_error=None):
+    """Builds the ArchivePlan for files older than older_than_days in the given category folders.
+
+    Category folders that do not exist are skipped. A folder that cannot be
+    listed is reported through on_error(message) and skipped.
+    """
+    cutoff = (now if now is not None else time()) - float(older_than_days) * 86400
+    plan = ArchivePlan(folder_path, archive_root or folder_path, cutoff)
+    key_length = bucket_key_length(bucket_format)
+    bucket_cache = {} # leading struct_time fields the format uses -> bucket; a folder holds few distinct dates
+    for category in categories:
+        category_folder = path.join(folder_path, category)
+        entries = CompactPlan(with_stats=True)
+        try:
+            with os.scandir(category_folder) as scanned:
+                for entry in scanned:
+                    try:
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        file_stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if file_stat.st_mtime >= cutoff:
+                        continue
+                    moment = localtime(file_stat.st_mtime)
+                    key = moment[:key_length]
+                    bucket = bucket_cache.get(key)
+                    if bucket is None:
+                        bucket = bucket_cache[key] = strftime(bucket_format, moment)
+                    entries.append(entry.name, path.join(category, bucket), file_stat.st_size, file_stat.st_mtime)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            if on_error:
+                on_error(f"Error reading category folder '{category_folder}': {e}")
+            continue
+        if entries:
+            plan.by_category[category] = entries
+    return plan
+
+def execute_archive(plan, progress_callback=None, cancel_event=None, throttle=None):
+    """Carries out an ArchivePlan. Returns (SortProgress, [error messages]).
+
+    The caller is expected to hold the root (a Sorter runs this inside its lock).
+    """
+    from file_sorter import SortProgress, create_category_folders, move_file
+
+    progress = SortProgress(plan.folder_path, plan.total, phase='archive')
+    errors = []
+    failed_destinations = create_category_folders(plan.target_root, plan.destinations())
+    for destination, e in failed_destinations.items():
+        errors.append(f"Error creating folder '{path.join(plan.target_root, destination)}': {e}")
+
+    for category, entries in plan.by_category.items():
+        for filename, destination in entries:
+            if progress.cancelled or (cancel_event is not None and cancel_event.is_set()):
+                progress.cancelled = True
+                break
+            progress.done += 1
+            if destination in failed_destinations:
+                continue
+            if throttle is not None and not throttle.before_move(cancel_event):
+                progress.cancelled = True
+                break
+            try:
+                _, file_size = move_file(path.join(plan.folder_path, category, filename),
+                                         path.join(plan.target_root, destination), filename)
+                progress.moved += 1
+            except OSError as e:
+                errors.append(f"Error archiving '{filename}' from '{category}' to '{destination}': {e}")
+                continue
+            finally:
+                progress.report(progress_callback)
+            if throttle is not None:
+                throttle.after_move(file_size, cancel_event)
+    progress.finished = True
+    progress.report(progress_callback, force=True)
+    return progress, errors
+
+def main(argv=None):
+    from config_manager import load_config
+    from file_sorter import claim_root, release_root
+    from root_lock import RootLock
+
+    parser = ArgumentParser(description="Move files older than N days from each category folder into dated buckets.")
+    parser.add_argument('folder', nargs='?', help="sorted folder (defaults to the configured folder)")
+    parser.add_argument('--days', type=float, help="archive files older than this (defaults to archive.older_than_days)")
+    parser.add_argument('--archive-root', help="archive into this folder instead of inside each category")
+    parser.add_argument('--dry-run', action='store_true', help="only show what would be archived")
+    args = parser.parse_args(argv)
+
+    config_data = load_config()
+    settings = config_data.get('archive', {})
+    folder_path = args.folder or config_data.get('folder_path')
+    if not folder_path:
+        print("Folder path is not set. Pass a folder or configure one.", file=sys.stderr)
+        return 1
+    categories = settings.get('categories') or list(config_data.get('folder_extensions_mapping', {}))
+    plan = plan_archive(folder_path, categories,
+                        args.days if args.days is not None else settings.get('older_than_days', 365),
+                        archive_root=args.archive_root if args.archive_root is not None else settings.get('archive_root', ''),
+                        bucket_format=settings.get('bucket_format') or DEFAULT_BUCKET_FORMAT,
+                        on_error=lambda message: print(message, file=sys.stderr))
+    print("\n".join(plan.describe()))
+    if args.dry_run or not plan.total:
+        return 0
+    lock = RootLock(folder_path) if config_data.get('root_lock', {}).get('enabled') else None
+    if not claim_root(folder_path):
+        print(f"A sort of '{folder_path}' is running. Try again when it has finished.", file=sys.stderr)
+        return 1
+    try:
+        if lock is not None and not lock.try_acquire():
+            print(f"'{folder_path}' is being sorted by {lock.holder() or 'another process'}. Try again when it has finished.",
+                  file=sys.stderr)
+            return 1
+        progress, errors = execute_archive(plan)
+    finally:
+        if lock is not None:
+            lock.release()
+        release_root(folder_path)
+    for message in errors:
+        print(message, file=sys.stderr)
+    print(f"Archived {progress.moved} of {progress.total} file(s).")
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
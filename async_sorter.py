@@ -0,0 +1,93 @@
+"""
+
+Async sort engine API for embedding Folder Sorter in asyncio services.
+
+sort_folder runs a file_sorter.Sorter on a worker thread and bridges its
+callbacks into the event loop through an asyncio.Queue, so an async sort is
+the same sort as any other: it claims the root, takes the cross-process lock,
+defers files still being written, honours the throttle, link modes and
+destination templates, as set in the SortOptions it is given. Nothing is read
+from config.json unless the caller builds the options from it, and no GUI
+callbacks are touched, so several roots can be sorted concurrently in one
+event loop.
+
+    rules = SortRules({'Images': ['png', 'jpg']})
+    async for event in sort_folder('/data/inbox', rules):
+        print(event.kind, event.filename)
+
+"""
+
+import asyncio
+from dataclasses import dataclass
+from threading import Event
+
+from file_sorter import Sorter
+
+@dataclass(frozen=True)
+class SortEvent:
+    """Progress event yielded by sort_folder.
+
+    kind is one of 'progress', 'moved', 'error' or 'finished'.
+    """
+    kind: str
+    root: str
+    filename: str = None
+    category: str = None
+    destination: str = None
+    size: int = 0
+    done: int = 0
+    total: int = 0
+    error: str = None
+
+async def sort_folder(root, rules, options=None, executor=None, throttle=None):
+    """Sorts root with rules, yielding SortEvent objects as work completes.
+
+    options, executor and throttle are passed to the Sorter. 'progress' events
+    carry the throttled SortProgress counts, 'moved' one event per sorted file,
+    and the last event is 'finished' (done = files moved, error = the run's
+    error message, if any). Files deferred as still being written are
+    re-checked in follow-up passes before 'finished', like the tray does.
+    Cancelling the consuming task, or closing the generator, cancels the sort
+    and waits for its in-flight move.
+    """
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    cancel_event = Event()
+    moved = total = 0 # over the run and its follow-up passes
+
+    def emit(event): # called on the sort thread
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    sorter = Sorter(
+        root, rules, options, executor=executor, throttle=throttle,
+        on_progress=lambda progress: emit(SortEvent('progress', root, done=progress.done, total=progress.total)),
+        on_error=lambda message: emit(SortEvent('error', root, error=message)),
+        on_move=lambda filename, category, destination, size: emit(
+            SortEvent('moved', root, filename, category, destination, size)),
+    )
+    run = None
+    try:
+        attempt = 0
+        while True:
+            run = loop.run_in_executor(None, sorter.run_deferred if attempt else sorter.run, cancel_event)
+            # Scheduled after every event the thread emitted, so it marks the end of the pass
+            run.add_done_callback(lambda _: events.put_nowait(None))
+            while (event := await events.get()) is not None:
+                yield event
+            error = run.result()
+            progress = sorter.progress
+            if progress:
+                moved += progress.moved
+                total = total or progress.total
+            attempt += 1
+            if error or not sorter.deferred or cancel_event.is_set() \
+                    or attempt > int(sorter.options.stability.get('recheck_passes', 5)):
+                break
+            await asyncio.sleep(sorter.retry_delay(attempt))
+        yield SortEvent('finished', root, done=moved, total=total, error=error)
+    finally:
+        # Reached on normal completion, task cancellation and generator close alike.
+        if run is not None and not run.done():
+            cancel_event.set()
+            # Let the in-flight move land so no file is left half-handled.
+            await asyncio.wait([run])
@@ -0,0 +1,167 @@
+"""
+
+Benchmark for the sort pipeline stages.
+
+Builds a scratch folder, then times scanning, classification (in-process and
+over 1..N worker processes) and moving, printing throughput and speedup per
+stage. Nothing outside the scratch folder is touched.
+
+The memory section builds the plan for --memory-names names once as a list of
+tuples and once as a CompactPlan. Each is built in a fresh child process that
+traces its allocations with tracemalloc, and reports the peak and the memory
+the finished plan still holds. RSS is not used: the allocator keeps freed
+arenas and the interpreter's own startup peak can hide the plan entirely.
+
+CLI:
+    python benchmark.py [--files 20000] [--names 1000000] [--workers 0,1,2,4]
+                        [--memory-names 2000000]
+
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from argparse import ArgumentParser
+from os import path
+from random import Random
+from time import perf_counter
+
+from sort_rules import SortRules
+from compact_plan import CompactPlan
+from parallel_stage import scan_file_names, classify_names, default_workers
+
+BENCH_MAPPING = {
+    'Documents': ['pdf', 'doc', 'docx', 'odt', 'rtf'],
+    'Images': ['png', 'jpg', 'jpeg', 'bmp', 'webp'],
+    'Images/Gifs': ['gif'],
+    'Videos': ['mp4', 'mov', 'avi', 'mkv'],
+    'Music': ['mp3', 'flac', 'ogg', 'wav'],
+    'Archives': ['zip', 'rar', '7z', 'tar', 'gz'],
+    'Code': ['py', 'js', 'ts', 'java', 'c', 'cpp', 'rs', 'go'],
+}
+UNMATCHED_EXTENSIONS = ['log', 'dat', 'bin', 'tmp']
+
+def synthetic_names(count, seed=1):
+    rng = Random(seed)
+    extensions = [ext for exts in BENCH_MAPPING.values() for ext in exts] + UNMATCHED_EXTENSIONS
+    return [f"file_{i:08d}_{rng.randrange(1 << 30):x}.{rng.choice(extensions)}" for i in range(count)]
+
+def timed(label, func, count, unit, baseline=None, rows=None):
+    started = perf_counter()
+    result = func()
+    seconds = perf_counter() - started
+    rate = count / seconds if seconds > 0 else float('inf')
+    speedup = f"{baseline / seconds:5.2f}x" if baseline else "   --"
+    line = f"{label:<34} {seconds:8.3f} s  {rate:12,.0f} {unit}/s  {speedup}"
+    print(line)
+    if rows is not None:
+        rows.append(line)
+    return result, seconds
+
+def memory_child(kind, count):
+    """Builds one plan representation and prints the traced peak, the retained bytes and the entries (child process)."""
+    import tracemalloc
+
+    rules = SortRules(BENCH_MAPPING)
+    rng = Random(3)
+    extensions = [ext for exts in BENCH_MAPPING.values() for ext in exts] + UNMATCHED_EXTENSIONS
+    names = (f"file_{i:08d}_{rng.randrange(1 << 30):x}.{rng.choice(extensions)}" for i in range(count)) # like a scandir stream
+    tracemalloc.start()
+    if kind == 'compact':
+        planned = CompactPlan()
+        for name in names:
+            category = rules.category_for(name)
+            if category is not None:
+                planned.append(name, category)
+    else:
+        planned = []
+        for name in names:
+            category = rules.category_for(name)
+            if category is not None:
+                planned.append((name, category))
+    retained, peak = tracemalloc.get_traced_memory()
+    print(peak, retained, len(planned))
+
+def measure_memory(count, rows):
+    print(f"\nMemory while planning {count:,} names (tracemalloc, fresh process each)")
+    results = {}
+    for kind in ('tuples', 'compact'):
+        child = subprocess.run([sys.executable, path.abspath(__file__), '--memory-child', kind, '--memory-names', str(count)],
+                               capture_output=True, text=True)
+        try:
+            peak, retained, entries = (int(value) for value in child.stdout.split()[-3:])
+        except ValueError:
+            peak = retained = entries = 0
+        if child.returncode != 0 or peak <= 0:
+            line = f"plan as {kind:<8} measurement failed (exit code {child.returncode}): {child.stderr.strip()[-200:] or 'no output'}"
+            print(line)
+            rows.append(line)
+            continue
+        results[kind] = retained
+        line = (f"plan as {kind:<8} ({entries:,} entries) {retained / (1024 * 1024):10.1f} MiB held,"
+                f" {peak / (1024 * 1024):10.1f} MiB peak")
+        print(line)
+        rows.append(line)
+    if len(results) == 2:
+        line = f"compact plan uses {results['tuples'] / results['compact']:.1f}x less memory"
+    else:
+        line = "memory ratio not available: a measurement failed"
+    print(line)
+    rows.append(line)
+
+def main(argv=None):
+    parser = ArgumentParser(description="Benchmark the Folder Sorter pipeline stages.")
+    parser.add_argument('--files', type=int, default=20000, help="empty files created for the scan and move stages")
+    parser.add_argument('--names', type=int, default=1000000, help="synthetic names for the classification stage")
+    parser.add_argument('--workers', default=None, help="comma separated worker counts (0 = in-process)")
+    parser.add_argument('--memory-names', type=int, default=2000000, help="names planned in the memory section (0 to skip)")
+    parser.add_argument('--memory-child', choices=('tuples', 'compact'), help="internal: run one memory measurement")
+    parser.add_argument('--output', help="also write the results to this file")
+    args = parser.parse_args(argv)
+    if args.memory_child:
+        memory_child(args.memory_child, args.memory_names)
+        return 0
+
+    worker_counts = [int(w) for w in args.workers.split(',')] if args.workers else sorted({0, 1, 2, default_workers()})
+    rules = SortRules(BENCH_MAPPING)
+    rows = [f"Folder Sorter benchmark: {os.cpu_count()} CPUs, Python {sys.version.split()[0]}"]
+    print(rows[0])
+    scratch = tempfile.mkdtemp(prefix="folder_sorter_bench_")
+    try:
+        names = synthetic_names(args.names)
+        print(f"\nClassification of {len(names):,} names")
+        baseline = None
+        for workers in worker_counts:
+            _, seconds = timed(f"classify, workers={workers}", lambda: classify_names(names, rules, workers=workers),
+                               len(names), "names", baseline, rows)
+            baseline = baseline or seconds
+
+        sort_folder = path.join(scratch, "sort")
+        os.makedirs(sort_folder)
+        for name in synthetic_names(args.files, seed=2):
+            open(path.join(sort_folder, name), 'wb').close()
+        print(f"\nScan and move of {args.files:,} files")
+        scanned, _ = timed("scan (scandir)", lambda: scan_file_names(sort_folder), args.files, "files", rows=rows)
+        planned, _ = timed("classify, workers=0", lambda: classify_names(scanned, rules, workers=0), args.files, "files", rows=rows)
+
+        from file_sorter import create_category_folders, move_file
+        def move_all():
+            create_category_folders(sort_folder, {category for _, category in planned})
+            for filename, category in planned:
+                move_file(path.join(sort_folder, filename), path.join(sort_folder, category), filename)
+        timed("move (I/O stage)", move_all, len(planned), "files", rows=rows)
+
+        if args.memory_names:
+            measure_memory(args.memory_names, rows)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write("\n".join(rows) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+
+Compact storage for the (filename, category) list a scan produces.
+
+Holding a million planned moves as a list of tuples costs one tuple and one
+str object per file, about 140 bytes plus the name. CompactPlan instead keeps
+the names in one bytes buffer with an offset column, and categories as
+integer IDs into a small table. Optional size and mtime columns are kept the
+same way. A file's name is rebuilt only when the entry is read, and paths are
+built only when a file is actually moved.
+
+A CompactPlan iterates as (filename, category) pairs and supports len(), so
+it can be used wherever the tuple list was.
+
+"""
+
+from array import array
+from os import fsdecode, fsencode
+
+class CompactPlan:
+    """Append-only, array-backed list of (filename, category[, size, mtime]) entries."""
+    __slots__ = ('_names', '_offsets', '_category_ids', '_categories', '_category_index', 'sizes', 'mtimes')
+
+    def __init__(self, with_stats=False):
+        self._names = bytearray() # all names, fs-encoded, back to back
+        self._offsets = array('Q', [0]) # entry i spans _names[_offsets[i]:_offsets[i + 1]]
+        self._category_ids = array('I')
+        self._categories = [] # category id -> category name
+        self._category_index = {} # category name -> id
+        self.sizes = array('q') if with_stats else None # bytes, per entry
+        self.mtimes = array('d') if with_stats else None # seconds since the epoch, per entry
+
+    def _category_id(self, category):
+        category_id = self._category_index.get(category)
+        if category_id is None:
+            category_id = self._category_index[category] = len(self._categories)
+            self._categories.append(category)
+        return category_id
+
+    def append(self, filename, category, size=0, mtime=0.0):
+        self._names += fsencode(filename)
+        self._offsets.append(len(self._names))
+        self._category_ids.append(self._category_id(category))
+        if self.sizes is not None:
+            self.sizes.append(size)
+            self.mtimes.append(mtime)
+
+    def extend(self, pairs):
+        for filename, category in pairs:
+            self.append(filename, category)
+
+    def __len__(self):
+        return len(self._category_ids)
+
+    def name(self, index):
+        return fsdecode(bytes(self._names[self._offsets[index]:self._offsets[index + 1]]))
+
+    def category(self, index):
+        return self._categories[self._category_ids[index]]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("CompactPlan index out of range")
+        return self.name(index), self.category(index)
+
+    def __iter__(self):
+        names, offsets, categories = self._names, self._offsets, self._categories
+        for index, category_id in enumerate(self._category_ids):
+            yield fsdecode(bytes(names[offsets[index]:offsets[index + 1]])), categories[category_id]
+
+    def categories_used(self):
+        """The distinct categories with at least one entry."""
+        return list(self._categories)
+
+    def nbytes(self):
+        """Approximate memory held by the columns, for diagnostics."""
+        total = len(self._names) + self._offsets.itemsize * len(self._offsets) + self._category_ids.itemsize * len(self._category_ids)
+        if self.sizes is not None:
+            total += self.sizes.itemsize * len(self.sizes) + self.mtimes.itemsize * len(self.mtimes)
+        return total
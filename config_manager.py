@@ -1,8 +1,10 @@
 import sys
-from os import path
+from os import path, replace, fsync
 from json import dump, load, JSONDecodeError
 from PIL import ImageFont
 
+from metadata import METADATA_WORKERS, template_error
+
 def resource_path(relative_path):
     """ Get the absolute path to the resource, works for dev and for PyInstaller """
     try:
@@ -17,6 +19,7 @@ def resource_path(relative_path):
 CONFIG_FILE = resource_path('config.json')
 APP_ICON = resource_path('icons/purp-sort.ico')
 DELETE_PNG = resource_path('icons/x.png')
+METADATA_CACHE_FILE = resource_path('metadata_cache.db') # capture dates for destination templates (see metadata.py)
 
 # Define the paths to the font files
 REGULAR_PATH = resource_path('fonts/CascadiaCode-Regular.ttf')
@@ -39,6 +42,89 @@ except OSError as e:
 # Global config variable
 config = None
 
+# Defaults for the scheduled/idle-time sorting options (see scheduler.py)
+DEFAULT_SCHEDULE = {
+    'enabled': False,
+    'interval_minutes': None,   # run every N minutes, or
+    'cron': None,               # a 5-field cron expression, e.g. "*/30 9-18 * * 1-5"
+    'jitter_seconds': 60,       # random delay added to each run so machines don't hit a share together
+    'only_when_idle': False,
+    'max_cpu_percent': 50,      # defer while CPU use is above this
+    'max_disk_mb_per_s': 20,    # defer while disk throughput is above this (Linux only)
+    'idle_retry_seconds': 60,   # how long to wait before re-checking a busy machine
+}
+
+DEFAULT_THROTTLE = {
+    'moves_per_second': 0,      # 0 = unlimited
+    'bytes_per_second': 0,      # 0 = unlimited; counts the size of every moved file
+    'nice': 0,                  # added to the sort thread's nice value (Linux)
+    'idle_io': False,           # put the sort thread in the idle I/O class via ionice (Linux)
+}
+
+DEFAULT_STABILITY = {
+    'enabled': True,            # on by default: a file saved moments before a sort is sorted by a follow-up pass
+    'quiet_seconds': 5,         # files modified more recently than this are left for later
+    'check_open_handles': True, # also defer files another program has open for writing (Linux, Windows)
+    'recheck_passes': 5,        # follow-up passes over deferred files, quiet_seconds apart and doubling
+}
+
+DEFAULT_ROOT_LOCK = {
+    'enabled': True,            # lock the folder (hidden .folder_sorter.lock) against other processes and machines
+    'contention': 'wait',       # when it is already being sorted: 'wait', 'skip' or 'merge' into the running sort
+    'wait_seconds': 600,        # longest wait with 'wait' before the run is skipped
+}
+
+DEFAULT_ARCHIVE = {
+    'enabled': False,
+    'older_than_days': 365,     # files in a category folder last modified longer ago than this are archived
+    'bucket_format': '%Y/%m',   # strftime pattern of the dated bucket, from the file's mtime
+    'archive_root': '',         # empty = buckets inside each category folder; else <archive_root>/<category>/<bucket>
+    'categories': [],           # categories to archive; empty = all
+}
+
+DEFAULT_CONTROL_API = {
+    'enabled': False,
+    'port': 47831,              # loopback HTTP port (127.0.0.1 only)
+    'socket_path': '',          # if set (POSIX), listen on this Unix domain socket instead of the port
+    'token': '',                # required in the X-Folder-Sorter-Token header; generated on first start if empty
+}
+
+def _ensure_default_keys(config_data):
+    """Ensure all expected optional keys exist, adding defaults if missing."""
+    config_data.setdefault('duplicates_checked_paths', [])
+    config_data.setdefault('dont_show_again', False)
+    config_data.setdefault('window_geometry', None)
+    config_data.setdefault('notification_backend', 'auto')
+    config_data.setdefault('sort_mode', 'move')
+    config_data.setdefault('link_method', 'auto')
+    config_data.setdefault('view_path', '')
+    config_data.setdefault('classify_workers', 0)
+    templates = config_data.setdefault('destination_templates', {})
+    for category, template in list(templates.items()):
+        error = template_error(template)
+        if error:
+            print(f"Ignoring destination template {template!r} for '{category}': it {error}.")
+            del templates[category]
+    config_data.setdefault('metadata_workers', METADATA_WORKERS)
+    schedule = config_data.setdefault('schedule', {})
+    for key, value in DEFAULT_SCHEDULE.items():
+        schedule.setdefault(key, value)
+    throttle = config_data.setdefault('throttle', {})
+    for key, value in DEFAULT_THROTTLE.items():
+        throttle.setdefault(key, value)
+    stability = config_data.setdefault('stability', {})
+    for key, value in DEFAULT_STABILITY.items():
+        stability.setdefault(key, value)
+    root_lock = config_data.setdefault('root_lock', {})
+    for key, value in DEFAULT_ROOT_LOCK.items():
+        root_lock.setdefault(key, value)
+    archive = config_data.setdefault('archive', {})
+    for key, value in DEFAULT_ARCHIVE.items():
+        archive.setdefault(key, value)
+    control_api = config_data.setdefault('control_api', {})
+    for key, value in DEFAULT_CONTROL_API.items():
+        control_api.setdefault(key, value)
+
 def save_config(folder_path=None, folder_extensions_mapping=None, duplicates_checked_path=None, dont_show_again=None, window_geometry=None): 
     global config
     if config is None: # Ensure config is loaded if save is called before load 
@@ -61,24 +147,28 @@ def save_config(folder_path=None, folder_extensions_mapping=None, duplicates_che
     try:
         # Ensure config is not None before saving
         if config is not None:
-            with open(CONFIG_FILE, 'w') as f:
+            # Write to a temp file and swap it in, so a crash never leaves a truncated config
+            temp_file = CONFIG_FILE + '.tmp'
+            with open(temp_file, 'w') as f:
                 dump(config, f, indent=4) 
+                f.flush()
+                fsync(f.fileno())
+            replace(temp_file, CONFIG_FILE)
+            return True
         else:
             print("Error: Config is None, cannot save.")
     except IOError as e:
         print(f"Error saving config: {e}")
     except TypeError as e:
         print(f"Error serializing config to JSON: {e}")
+    return False
 
 
 def load_config():
     global config
     # If config is already loaded and seems valid, return it
     if config and 'folder_path' in config and 'folder_extensions_mapping' in config:
-         # Ensure all expected keys exist, adding defaults if missing
-         config.setdefault('duplicates_checked_paths', [])
-         config.setdefault('dont_show_again', False)
-         config.setdefault('window_geometry', None)
+         _ensure_default_keys(config)
          return config
 
     default_config = {
@@ -103,7 +193,20 @@ def load_config():
         },
         'duplicates_checked_paths': [],
         'dont_show_again': False,
-        'window_geometry': None
+        'window_geometry': None,
+        'notification_backend': 'auto', # 'auto', 'toast', 'dbus', 'log' or 'memory'
+        'sort_mode': 'move', # 'move', 'link' or 'symlink' to build the category tree without touching the files
+        'link_method': 'auto', # 'auto', 'reflink', 'hardlink' or 'copy' (link mode)
+        'view_path': '', # where link/symlink mode builds the category tree; empty means folder_path
+        'classify_workers': 0, # worker processes for classifying file names; 0 classifies in the sort thread
+        'destination_templates': {}, # category -> strftime pattern of dated subfolders, e.g. {'Images': '%Y/%m'}
+        'metadata_workers': METADATA_WORKERS, # threads reading capture dates for destination templates
+        'schedule': dict(DEFAULT_SCHEDULE),
+        'throttle': dict(DEFAULT_THROTTLE),
+        'stability': dict(DEFAULT_STABILITY),
+        'root_lock': dict(DEFAULT_ROOT_LOCK),
+        'archive': dict(DEFAULT_ARCHIVE),
+        'control_api': dict(DEFAULT_CONTROL_API)
     }
 
     if path.exists(CONFIG_FILE):
@@ -113,10 +216,7 @@ def load_config():
                 # Basic validation
                 if isinstance(loaded_data, dict) and 'folder_path' in loaded_data and 'folder_extensions_mapping' in loaded_data:
                     config = loaded_data
-                    # Ensure all expected keys exist, adding defaults if missing
-                    config.setdefault('duplicates_checked_paths', [])
-                    config.setdefault('dont_show_again', False)
-                    config.setdefault('window_geometry', None)
+                    _ensure_default_keys(config)
                     print("Config loaded successfully.")
                     return config
                 else:
@@ -136,5 +236,28 @@ def load_config():
     )
     return config
 
+def reload_config():
+    """Re-reads config.json after it was edited outside the app. Returns True if it was loaded.
+
+    The shared config dict is updated in place, so modules holding a reference see the new values.
+    """
+    global config
+    try:
+        with open(CONFIG_FILE, 'r') as f:
+            loaded_data = load(f)
+    except (IOError, JSONDecodeError) as e:
+        print(f"Error reloading config: {e}. Keeping the current config.")
+        return False
+    if not (isinstance(loaded_data, dict) and 'folder_path' in loaded_data and 'folder_extensions_mapping' in loaded_data):
+        print("Invalid config file format. Keeping the current config.")
+        return False
+    if config is None:
+        config = {}
+    config.clear()
+    config.update(loaded_data)
+    _ensure_default_keys(config)
+    print("Config reloaded.")
+    return True
+
 # Initialize config when module is imported
 config = load_config()
\ No newline at end of file
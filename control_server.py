@@ -0,0 +1,168 @@
+"""
+
+Local control API for the running tray app.
+
+Serves a small JSON-over-HTTP API on 127.0.0.1:<port>, or on a Unix domain
+socket when `socket_path` is set (POSIX). Every request must carry the token
+from the `control_api` section of config.json in the X-Folder-Sorter-Token
+header.
+
+    GET  /status          running sorts and the last finished one
+    GET  /metrics         run counters, files sorted, current speed limits
+    POST /sort            {"root": optional folder, "wait": optional bool}
+    POST /cancel          {"root": optional folder}
+    POST /reload-config   re-read config.json from disk
+
+A sort request for a root that is already being sorted joins that run (the
+response has "coalesced": true) instead of starting a second one.
+
+"""
+
+import json
+import os
+import socket
+import socketserver
+from hmac import compare_digest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import path
+from threading import Thread
+
+TOKEN_HEADER = 'X-Folder-Sorter-Token'
+MAX_BODY_BYTES = 64 * 1024
+LOOPBACK_HOSTS = {'127.0.0.1', 'localhost', '[::1]'}
+
+def _host_name(host_header):
+    """The host part of a Host header ('127.0.0.1:47831' -> '127.0.0.1', '[::1]:80' -> '[::1]')."""
+    if host_header.startswith('['):
+        return host_header.split(']', 1)[0] + ']'
+    return host_header.rsplit(':', 1)[0]
+
+class ControlRequestHandler(BaseHTTPRequestHandler):
+    server_version = "FolderSorter"
+
+    # The Unix socket server has no (host, port) client address
+    def address_string(self):
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix-socket"
+
+    def log_message(self, format, *args):
+        print(f"Control API: {self.address_string()} {format % args}")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        if isinstance(self.client_address, tuple):
+            # Refuse requests a web page could make through DNS rebinding
+            if _host_name(self.headers.get('Host') or '') not in LOOPBACK_HOSTS:
+                return False
+        token = self.headers.get(TOKEN_HEADER) or ''
+        return bool(self.server.token) and compare_digest(token.encode('utf-8'), self.server.token.encode('utf-8'))
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large.")
+        if not length:
+            return {}
+        data = json.loads(self.rfile.read(length).decode('utf-8'))
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object.")
+        return data
+
+    def do_GET(self):
+        if not self._authorized():
+            return self._send_json(403, {'error': "Missing or invalid token."})
+        jobs = self.server.jobs
+        if self.path == '/status':
+            return self._send_json(200, jobs.status())
+        if self.path == '/metrics':
+            return self._send_json(200, jobs.metrics())
+        self._send_json(404, {'error': f"Unknown endpoint {self.path}."})
+
+    def do_POST(self):
+        if not self._authorized():
+            return self._send_json(403, {'error': "Missing or invalid token."})
+        try:
+            data = self._read_json()
+        except (ValueError, UnicodeDecodeError) as e:
+            return self._send_json(400, {'error': f"Invalid request body: {e}"})
+        jobs = self.server.jobs
+        root = data.get('root') or None
+        if root is not None and not isinstance(root, str):
+            return self._send_json(400, {'error': "'root' must be a string."})
+
+        if self.path == '/sort':
+            if root is not None and not path.isdir(root):
+                return self._send_json(400, {'error': f"'{root}' is not a folder."})
+            job, coalesced = jobs.start(root, source='api')
+            if data.get('wait'):
+                job.done.wait()
+                return self._send_json(200, dict(job.to_dict(), coalesced=coalesced))
+            return self._send_json(202, dict(job.to_dict(), coalesced=coalesced))
+        if self.path == '/cancel':
+            job = jobs.cancel(root)
+            if job is None:
+                return self._send_json(404, {'error': "No sort is running for that folder."})
+            return self._send_json(200, job.to_dict())
+        if self.path == '/reload-config':
+            if self.server.reload_callback and not self.server.reload_callback():
+                return self._send_json(500, {'error': "config.json could not be read; the current config was kept."})
+            return self._send_json(200, {'reloaded': True})
+        self._send_json(404, {'error': f"Unknown endpoint {self.path}."})
+
+class _ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class ControlServer:
+    """Runs the control API on a background thread. See the module docstring.
+
+    jobs is the tray's SortJobs; reload_callback() re-reads the config and returns
+    True on success.
+    """
+    def __init__(self, jobs, settings, reload_callback=None):
+        self.jobs = jobs
+        self.settings = settings
+        self.reload_callback = reload_callback
+        self._server = None
+        self._thread = None
+
+    @property
+    def address(self):
+        """Where the server listens: a socket path or (host, port), or None if not running."""
+        if self._server is None:
+            return None
+        return self._server.server_address
+
+    def start(self):
+        socket_path = self.settings.get('socket_path')
+        if socket_path and hasattr(socket, 'AF_UNIX'):
+            if path.exists(socket_path):
+                os.remove(socket_path) # stale socket from a previous run
+            server = _ThreadingUnixHTTPServer(socket_path, ControlRequestHandler)
+            os.chmod(socket_path, 0o600)
+        else:
+            server = ThreadingHTTPServer(('127.0.0.1', int(self.settings.get('port') or 0)), ControlRequestHandler)
+        server.jobs = self.jobs
+        server.token = self.settings.get('token') or ''
+        server.reload_callback = self.reload_callback
+        self._server = server
+        self._thread = Thread(target=server.serve_forever, name="ControlServer", daemon=True)
+        self._thread.start()
+        print(f"Control API listening on {self.address}.")
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        if isinstance(self._server.server_address, str):
+            try:
+                os.remove(self._server.server_address)
+            except OSError:
+                pass
+        self._server = None
@@ -1,8 +1,20 @@
-from os import path, makedirs, listdir
+from os import path, makedirs, scandir
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from shutil import move
-from threading import Thread
-from win11toast import toast
-from config_manager import load_config
+from threading import Lock
+from types import MappingProxyType
+from typing import Mapping
+from time import monotonic, sleep
+from sort_rules import SortRules, RESERVED_NAMES
+from compact_plan import CompactPlan
+from linker import FileLinker, SYMLINK, ViewManifest, prune_view
+from parallel_stage import plan_moves_parallel
+from stability import DEFAULT_QUIET_SECONDS, StabilityChecker, follow_up_delay
+from metadata import METADATA_WORKERS, file_dates, render_destination, shared_cache
+from root_lock import RootLock, POLL_SECONDS
+from throttle import MoveThrottle
+from notifier import NotificationDispatcher, RunSummary
 
 # Global variables for GUI callbacks and app instance
 gui_app_instance = None
@@ -40,130 +52,742 @@ def generate_unique_filename(directory, filename):
         counter += 1
     return new_filename
 
-def show_notification(folder_path):
-    buttons = [
-        {'activationType': 'protocol', 'arguments': f'file:///{folder_path}', 'content': 'Open Folder'}
-    ]
+def plan_moves(folder_path, rules, on_error=None):
+    """Scans folder_path once and returns a CompactPlan of (filename, category) for every matching file.
 
+    Raises OSError if the folder itself cannot be listed. Entries that cannot be
+    inspected are reported through on_error(filename, exc) and skipped.
+    """
+    planned = CompactPlan()
+    with scandir(folder_path) as entries:
+        for entry in entries:
+            try:
+                if not entry.is_file():
+                    continue
+            except OSError as e:
+                if on_error:
+                    on_error(entry.name, e)
+                continue
+            category = rules.category_for(entry.name)
+            if category is not None:
+                planned.append(entry.name, category)
+    return planned
+
+FOLDER_CREATION_WORKERS = 8
+
+def create_category_folders(folder_path, categories, max_workers=FOLDER_CREATION_WORKERS, executor=None):
+    """Creates every category folder a run needs, once, before any file is moved.
+
+    Folders are created level by level (so 'Images' exists before 'Images/Gifs')
+    with the folders of one level created in parallel, which hides the round-trip
+    latency of network shares. Runs on `executor` if given, otherwise on a
+    short-lived pool. Returns {category: OSError} for folders that could not be created.
+    """
+    by_depth = {}
+    for category in set(categories):
+        depth = len([part for part in category.replace('\\', '/').split('/') if part])
+        by_depth.setdefault(depth, []).append(category)
+
+    failures = {}
+    def create(category):
+        try:
+            makedirs(path.join(folder_path, category), exist_ok=True)
+        except OSError as e:
+            return category, e
+        return category, None
+
+    def create_all(executor):
+        for depth in sorted(by_depth):
+            for category, error in executor.map(create, by_depth[depth]):
+                if error is not None:
+                    failures[category] = error
+
+    if executor is not None:
+        create_all(executor)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mkdir") as own_executor:
+            create_all(own_executor)
+    return failures
+
+def resolve_destination(target_folder_path, filename):
+    """Returns the destination path for filename in target_folder_path, renamed if it would clash."""
+    destination_file_path = path.join(target_folder_path, filename)
+    if path.exists(destination_file_path):
+        destination_file_path = path.join(target_folder_path, generate_unique_filename(target_folder_path, filename))
+    return destination_file_path
+
+def move_file(source_file_path, target_folder_path, filename):
+    """Moves one file into an existing category folder. Returns (destination, size in bytes)."""
+    file_size = path.getsize(source_file_path)
+    destination_file_path = resolve_destination(target_folder_path, filename)
+    move(source_file_path, destination_file_path)
+    return destination_file_path, file_size
+
+class SortPreview:
+    """Planning-only result of scanning a folder: what a sort would do, without moving anything."""
+    EXAMPLE_LIMIT = 50 # names kept per list for display
+
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+        self.categories = {}      # destination folder (category, or its dated folder) -> [files, bytes]
+        self.unmatched_files = 0
+        self.unmatched_bytes = 0
+        self.unmatched_examples = []
+        self.collisions = 0       # files whose name already exists in their category folder
+        self.collision_examples = [] # (filename, destination folder)
+        self.scanned = 0
+        self.finished = False
+        self.cancelled = False
+        self.error = None
+
+    def snapshot(self):
+        """Returns a plain-dict copy that is safe to hand to another thread."""
+        return {
+            'folder_path': self.folder_path,
+            'categories': {category: list(counts) for category, counts in self.categories.items()},
+            'unmatched_files': self.unmatched_files,
+            'unmatched_bytes': self.unmatched_bytes,
+            'unmatched_examples': list(self.unmatched_examples),
+            'collisions': self.collisions,
+            'collision_examples': list(self.collision_examples),
+            'scanned': self.scanned,
+            'finished': self.finished,
+            'cancelled': self.cancelled,
+            'error': self.error,
+        }
+
+def preview_sort(folder_path, rules, on_batch=None, batch_size=500, cancel_event=None, options=None):
+    """Scans folder_path like a sort would and returns a SortPreview; nothing is moved.
+
+    on_batch(snapshot) is called every batch_size entries and once at the end, so
+    a UI can show results while the scan is still running. Each destination folder
+    is listed at most once to detect name collisions. With the destination
+    templates of options, files are counted under their dated folder; their dates
+    are read a batch at a time.
+    """
+    preview = SortPreview(folder_path)
+    options = options or SortOptions()
+    templates = options.destination_templates
+    existing_names = {} # destination -> set of normcased names already in its folder
+    undated = [] # (filename, category, size) waiting for their capture date
+
+    def names_in(category):
+        if category not in existing_names:
+            try:
+                with scandir(path.join(folder_path, category)) as entries:
+                    existing_names[category] = {path.normcase(entry.name) for entry in entries}
+            except OSError:
+                existing_names[category] = set() # missing folder: nothing to collide with
+        return existing_names[category]
+
+    def add(filename, destination, file_size):
+        counts = preview.categories.setdefault(destination, [0, 0])
+        counts[0] += 1
+        counts[1] += file_size
+        if path.normcase(filename) in names_in(destination):
+            preview.collisions += 1
+            if len(preview.collision_examples) < preview.EXAMPLE_LIMIT:
+                preview.collision_examples.append((filename, destination))
+
+    def add_dated():
+        dates = file_dates(folder_path, [filename for filename, _, _ in undated],
+                           cache=shared_cache(options.metadata_cache_path), workers=options.metadata_workers,
+                           cancel_event=cancel_event)
+        for filename, category, file_size in undated:
+            destination = category
+            if filename in dates:
+                try:
+                    destination = render_destination(category, templates[category], dates[filename])
+                except ValueError:
+                    pass # the sort falls back to the category too
+            add(filename, destination, file_size)
+        undated.clear()
+
+    try:
+        with scandir(folder_path) as entries:
+            for entry in entries:
+                if cancel_event is not None and cancel_event.is_set():
+                    preview.cancelled = True
+                    break
+                if entry.name in RESERVED_NAMES:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    file_size = entry.stat().st_size
+                except OSError:
+                    continue
+                preview.scanned += 1
+                category = rules.category_for(entry.name)
+                if category is None:
+                    preview.unmatched_files += 1
+                    preview.unmatched_bytes += file_size
+                    if len(preview.unmatched_examples) < preview.EXAMPLE_LIMIT:
+                        preview.unmatched_examples.append(entry.name)
+                elif category in templates:
+                    undated.append((entry.name, category, file_size))
+                else:
+                    add(entry.name, category, file_size)
+                if preview.scanned % batch_size == 0:
+                    if undated:
+                        add_dated()
+                    if on_batch:
+                        on_batch(preview.snapshot())
+    except OSError as e:
+        preview.error = f"Error reading source folder '{folder_path}': {e}"
+    if undated and not preview.cancelled:
+        add_dated()
+
+    preview.finished = True
+    if on_batch:
+        on_batch(preview.snapshot())
+    return preview
+
+class SortProgress:
+    """Live progress of one sort run, passed to the progress callback of sort_files."""
+    REPORT_INTERVAL = 0.25 # seconds between throttled progress callbacks
+
+    def __init__(self, folder_path, total, phase='sort'):
+        self.folder_path = folder_path
+        self.total = total
+        self.phase = phase # 'dates' (capture date lookups), 'sort', or 'archive' (the archive pass after a sort)
+        self.done = 0 # files handled so far, including the one in flight
+        self.moved = 0
+        self.cancelled = False
+        self.finished = False
+        self.started_at = monotonic()
+        self._last_report = 0.0
+
+    @property
+    def elapsed(self):
+        return monotonic() - self.started_at
+
+    @property
+    def files_per_second(self):
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def percent(self):
+        return 100.0 * self.done / self.total if self.total else 100.0
+
+    @property
+    def eta_seconds(self):
+        """Estimated seconds remaining, or None until a rate is known."""
+        rate = self.files_per_second
+        if not rate:
+            return None
+        return (self.total - self.done) / rate
+
+    def describe(self):
+        """Short status line, e.g. '45% (1200/2650), 310 files/s, ETA 0:05'."""
+        text = f"{self.percent:.0f}% ({self.done}/{self.total}), {self.files_per_second:.0f} files/s"
+        eta = self.eta_seconds
+        if eta is not None and not self.finished:
+            minutes, seconds = divmod(int(eta), 60)
+            text += f", ETA {minutes}:{seconds:02d}"
+        return text
+
+    def report(self, callback, force=False):
+        """Calls callback(self) at most every REPORT_INTERVAL seconds unless forced."""
+        if callback is None:
+            return
+        now = monotonic()
+        if force or now - self._last_report >= self.REPORT_INTERVAL:
+            self._last_report = now
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"Error in sort progress callback: {e}")
+
+def _focus_before_notification(summary):
     if focus_app:
         _schedule_on_gui_thread(focus_app) # Schedule focus_app call
 
-    toast(
-        'Folder Sorted',
-        f'Sorted: "{folder_path}"',
-        buttons=buttons,
-        audio={'silent': 'true'},
-        duration='short'
-    )
+# One long-lived worker shows (coalesced) completion toasts for every sort in this process.
+# Its backend is read from config.json on the first notification, not at import.
+notification_dispatcher = NotificationDispatcher(backend_name=None, before_show=_focus_before_notification)
 
-def sort_files():
-    config_data = load_config()
-    folder_path = config_data.get('folder_path', '')
+def show_notification(summary):
+    """Queue a completion notification for a finished run."""
+    if notification_dispatcher.backend is None and notification_dispatcher.backend_name is None:
+        from config_manager import load_config
+        notification_dispatcher.backend_name = load_config().get('notification_backend', 'auto')
+    notification_dispatcher.submit(summary)
 
-    if not folder_path or not path.exists(folder_path):
-        return "Folder path is not set or does not exist" 
+# Rate limits shared by every sort in this process; changes apply to a running sort
+sort_throttle = MoveThrottle()
 
-    folder_extensions_mapping = config_data.get('folder_extensions_mapping', {})
-    files_moved = False
-    failed_folder_creations = set() # Keep track of folders that failed to be created
+def set_throttle_limits(moves_per_second=None, bytes_per_second=None):
+    """Changes the move rate limits now (including for a running sort) and saves them. 0 = unlimited."""
+    from config_manager import load_config, save_config
+    sort_throttle.configure(moves_per_second, bytes_per_second)
+    throttle_config = load_config().setdefault('throttle', {})
+    if moves_per_second is not None:
+        throttle_config['moves_per_second'] = moves_per_second
+    if bytes_per_second is not None:
+        throttle_config['bytes_per_second'] = bytes_per_second
+    save_config()
 
-    try:
-        source_files = listdir(folder_path)
-        if not source_files:
+# Roots with a sort in progress in this process, so manual and scheduled runs never overlap
+_active_roots = set()
+_active_roots_lock = Lock()
+
+def claim_root(folder_path):
+    """Marks folder_path as being sorted. Returns False if a sort of it is already running."""
+    key = path.normcase(path.abspath(folder_path))
+    with _active_roots_lock:
+        if key in _active_roots:
+            return False
+        _active_roots.add(key)
+        return True
+
+def release_root(folder_path):
+    with _active_roots_lock:
+        _active_roots.discard(path.normcase(path.abspath(folder_path)))
+
+def _report_error(err_msg):
+    if show_error_dialog:
+        _schedule_on_gui_thread(show_error_dialog, err_msg)
+    else:
+        print(err_msg)
+
+@dataclass(frozen=True)
+class SortOptions:
+    """How a Sorter sorts, independent of any config file. See config.json for the meaning of each field."""
+    sort_mode: str = 'move' # 'move', 'link' or 'symlink'
+    link_method: str = 'auto'
+    view_path: str = '' # target root for link/symlink modes; empty means the sorted folder
+    classify_workers: int = 0
+    stability: Mapping = field(default_factory=lambda: MappingProxyType({'enabled': False}))
+    root_lock: Mapping = field(default_factory=lambda: MappingProxyType({'enabled': False}))
+    archive: Mapping = field(default_factory=lambda: MappingProxyType({'enabled': False}))
+    destination_templates: Mapping = field(default_factory=lambda: MappingProxyType({})) # category -> strftime pattern
+    metadata_workers: int = METADATA_WORKERS
+    metadata_cache_path: str = '' # SQLite file for cached capture dates; empty caches in memory only
+
+    @classmethod
+    def from_config(cls, config_data):
+        from config_manager import METADATA_CACHE_FILE
+        return cls(
+            sort_mode=config_data.get('sort_mode', 'move'),
+            link_method=config_data.get('link_method', 'auto'),
+            view_path=config_data.get('view_path', ''),
+            classify_workers=config_data.get('classify_workers', 0),
+            stability=MappingProxyType(dict(config_data.get('stability', {}))),
+            root_lock=MappingProxyType(dict(config_data.get('root_lock', {}))),
+            archive=MappingProxyType(dict(config_data.get('archive', {}))),
+            destination_templates=MappingProxyType(dict(config_data.get('destination_templates', {}))),
+            metadata_workers=config_data.get('metadata_workers', METADATA_WORKERS),
+            metadata_cache_path=METADATA_CACHE_FILE,
+        )
+
+class Sorter:
+    """Sorts one root folder with a fixed rule set. Holds no global state.
+
+    Everything a run needs is passed in: the compiled SortRules, SortOptions, an
+    optional executor (used to create category folders), an optional MoveThrottle,
+    and event sinks:
+        on_progress(SortProgress)  throttled progress, plus a final report
+        on_error(message)          a problem that skipped a file or folder
+        on_complete(RunSummary)    after a run that sorted at least one file
+        on_move(filename, folder, destination, size)
+                                   after each file moved (or linked) into folder
+
+    Sorters for different roots can run concurrently. A second run of a root that
+    is already being sorted in this process is skipped. With options.root_lock
+    enabled, the root is also locked against other processes and machines, and
+    its 'contention' setting decides whether a busy root is waited for, skipped
+    or merged into the running sort (see root_lock.py).
+    """
+    def __init__(self, root, rules, options=None, executor=None, throttle=None,
+                 on_progress=None, on_error=None, on_complete=None, on_move=None):
+        self.root = root
+        self.rules = rules if isinstance(rules, SortRules) else SortRules(rules)
+        self.options = options or SortOptions()
+        self.executor = executor
+        self.throttle = throttle
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.on_complete = on_complete
+        self.on_move = on_move
+        self.progress = None # SortProgress of the current (or last) run
+        self.deferred = CompactPlan() # (filename, destination) still being written at the end of the last run
+        self._deferred_categories = {} # dated destination in self.deferred -> its category
+        self._checker = None # StabilityChecker, kept so a follow-up pass knows what each deferred file looked like
+        self._view_manifest = None # ViewManifest of the current symlink-view run
+
+    def _error(self, message):
+        if self.on_error:
+            self.on_error(message)
+        else:
+            print(message)
+
+    def run(self, cancel_event=None):
+        """Sorts the root. Returns an error message, or None on success.
+
+        Setting cancel_event (a threading.Event) stops the run after the in-flight
+        move; files moved so far are still reported as a (partial) run. Files still
+        being written are left in self.deferred for run_deferred.
+        """
+        return self._locked_run(cancel_event)
+
+    def run_deferred(self, cancel_event=None):
+        """Follow-up pass: re-checks only the files the last run deferred and sorts those now complete.
+
+        The folder is not scanned again. Files still busy stay in self.deferred;
+        retry_delay() says when to try next.
+        """
+        if not self.deferred:
+            return None
+        return self._locked_run(cancel_event, retry=True)
+
+    def retry_delay(self, attempt=1):
+        """Seconds to wait before follow-up pass number attempt (1-based)."""
+        quiet_seconds = self._checker.quiet_seconds if self._checker else DEFAULT_QUIET_SECONDS
+        return follow_up_delay(quiet_seconds, attempt)
+
+    def _locked_run(self, cancel_event, retry=False):
+        if not self.root or not path.exists(self.root):
+            return "Folder path is not set or does not exist"
+        lock = RootLock(self.root) if self.options.root_lock.get('enabled') else None
+        if not self._acquire_root(lock, cancel_event):
+            return None
+        while True:
+            try:
+                if lock is not None and not retry:
+                    lock.take_rerun_request() # this run scans the root anyway
+                error = self._run(cancel_event, retry)
+                if not retry and not error and self.options.archive.get('enabled') and self.options.sort_mode == 'move' \
+                        and not (cancel_event and cancel_event.is_set()):
+                    self._archive(cancel_event)
+            finally:
+                if self._view_manifest is not None:
+                    self._view_manifest.save() # also after a failed or cancelled run: the links it made are recorded
+                    self._view_manifest = None
+                if lock is not None:
+                    lock.release()
+                release_root(self.root)
+            # Sorts merged into this one left a marker; it is checked after releasing, so none is missed
+            if error or lock is None or (cancel_event and cancel_event.is_set()) or not lock.take_rerun_request():
+                return error
+            if not self._try_claim(lock):
+                return None # another sort took the root over and will pick the files up
+            print(f"Sorting '{self.root}' again for a sort that was merged into this one.")
+            retry = False # a merged sort asked for a full scan
+
+    def _set_deferred(self, deferred, destination_categories):
+        self.deferred = deferred
+        self._deferred_categories = {destination: destination_categories[destination]
+                                     for destination in deferred.categories_used() if destination in destination_categories}
+
+    def _apply_templates(self, planned_moves, cancel_event=None):
+        """Replaces the category of files in templated categories by their dated folder.
+
+        Returns (plan, {dated folder: category}). Capture dates are only looked up
+        for files in templated categories; on_progress follows the lookups, and a
+        cancel stops them (the caller then checks cancel_event).
+        """
+        templates = self.options.destination_templates
+        if not templates or not any(category in templates for category in planned_moves.categories_used()):
+            return planned_moves, {}
+        templated = [filename for filename, category in planned_moves if category in templates]
+        print(f"Reading capture dates of {len(templated)} files in '{self.root}'...")
+        progress = self.progress = SortProgress(self.root, len(templated), phase='dates')
+        progress_lock = Lock()
+
+        def on_file():
+            with progress_lock: # called from the metadata pool
+                progress.done += 1
+                progress.report(self.on_progress)
+
+        dates = file_dates(self.root, templated, cache=shared_cache(self.options.metadata_cache_path),
+                           workers=self.options.metadata_workers, executor=self.executor,
+                           on_file=on_file, cancel_event=cancel_event)
+        if cancel_event is not None and cancel_event.is_set():
+            progress.cancelled = progress.finished = True
+            progress.report(self.on_progress, force=True)
+            return planned_moves, {}
+        dated = CompactPlan()
+        destination_categories = {}
+        for filename, category in planned_moves:
+            template = templates.get(category)
+            destination = category # also when the file could not be stat'ed; the move reports it
+            if template and filename in dates:
+                try:
+                    destination = render_destination(category, template, dates[filename])
+                    destination_categories[destination] = category
+                except ValueError as e:
+                    self._error(f"{e}. Sorting '{filename}' into '{category}'.")
+            dated.append(filename, destination)
+        return dated, destination_categories
+
+    def _archive(self, cancel_event):
+        """Moves files older than archive.older_than_days from each category into dated buckets (see archive.py)."""
+        from archive import plan_archive, execute_archive, DEFAULT_BUCKET_FORMAT # archive imports this module
+
+        settings = self.options.archive
+        plan = plan_archive(self.root, settings.get('categories') or list(self.rules.mapping),
+                            settings.get('older_than_days', 365), archive_root=settings.get('archive_root', ''),
+                            bucket_format=settings.get('bucket_format') or DEFAULT_BUCKET_FORMAT, on_error=self._error)
+        if not plan.total:
+            return
+        print("\n".join(plan.describe()))
+        # Reported as its own phase after the sort's final report; self.progress stays the sort's
+        archive_progress, errors = execute_archive(plan, progress_callback=self.on_progress, cancel_event=cancel_event,
+                                                   throttle=self.throttle)
+        for message in errors:
+            self._error(message)
+        print(f"Archived {archive_progress.moved} of {archive_progress.total} file(s) from '{self.root}'.")
+
+    def _try_claim(self, lock):
+        if not claim_root(self.root):
+            return False
+        if lock is None or lock.try_acquire():
+            return True
+        release_root(self.root)
+        return False
+
+    def _acquire_root(self, lock, cancel_event):
+        """Claims the root in this process and, if enabled, locks it across processes.
+
+        Returns False if the run should not go ahead (skipped, merged, timed out or cancelled).
+        """
+        if self._try_claim(lock):
+            return True
+        if lock is None:
+            print(f"A sort of '{self.root}' is already running. Skipping this run.")
+            return False
+        settings = self.options.root_lock
+        contention = settings.get('contention', 'wait')
+        holder = lock.holder()
+        busy = f"'{self.root}' is being sorted" + (f" by {holder}" if holder else "")
+        if contention == 'merge':
+            lock.request_rerun()
+            # The holder may have released the root just before the request was left
+            if self._try_claim(lock):
+                return True
+            print(f"{busy}. This sort was merged into it.")
+            return False
+        if contention != 'wait':
+            print(f"{busy}. Skipping this run.")
+            return False
+        print(f"{busy}. Waiting for it to finish...")
+        deadline = monotonic() + float(settings.get('wait_seconds', 600))
+        while monotonic() < deadline:
+            if cancel_event is not None:
+                if cancel_event.wait(POLL_SECONDS):
+                    return False
+            else:
+                sleep(POLL_SECONDS)
+            if self._try_claim(lock):
+                return True
+        print(f"{busy} and did not finish in time. Skipping this run.")
+        return False
+
+    def _plan(self):
+        def on_scan_error(filename, e):
+            print(f"Could not determine if '{filename}' is a file: {e}. Skipping.")
+            if self.on_error:
+                self.on_error(f"Error accessing '{filename}': {str(e)}. Skipping.")
+
+        if self.options.classify_workers:
+            # Shard classification over worker processes; the moves stay in this thread
+            return plan_moves_parallel(self.root, self.rules, workers=self.options.classify_workers, on_error=on_scan_error)
+        return plan_moves(self.root, self.rules, on_error=on_scan_error)
+
+    def _run(self, cancel_event, retry=False):
+        self.progress = None # a pass that moves nothing reports nothing
+        folder_path = self.root
+        options = self.options
+        throttle = self.throttle
+        # 'link' and 'symlink' modes materialize the category tree (under view_path) and leave the files in place
+        linker = None
+        target_root = folder_path
+        if options.sort_mode in ('link', SYMLINK):
+            try:
+                linker = FileLinker(SYMLINK if options.sort_mode == SYMLINK else options.link_method)
+            except ValueError as e:
+                return str(e)
+            target_root = options.view_path or folder_path
+            if options.sort_mode == SYMLINK and not options.view_path:
+                print(f"No view folder is set: the symlink view is built inside '{folder_path}' itself. "
+                      "Set view_path to keep it in a folder of its own.")
+            try:
+                makedirs(target_root, exist_ok=True)
+            except OSError as e:
+                self._error(f"Error creating view folder '{target_root}': {str(e)}")
+                return f"Could not create view folder: {target_root}"
+        run_summary = RunSummary(target_root) # per-category counts for the completion notification
+        failed_folder_creations = set() # Keep track of folders that failed to be created
+
+        if retry:
+            # Follow-up pass: only the deferred files, already planned and dated
+            planned_moves, destination_categories = self.deferred, self._deferred_categories
+            if options.sort_mode == SYMLINK:
+                self._view_manifest = ViewManifest(target_root)
+        else:
+            try:
+                planned_moves = self._plan()
+            except OSError as e:
+                self._error(f"Error reading source folder '{folder_path}': {str(e)}")
+                return f"Could not read source folder: {folder_path}"
+            # Dated destinations ('Images/2024/06') for categories with a template; counted under their category
+            planned_moves, destination_categories = self._apply_templates(planned_moves, cancel_event)
+            if cancel_event is not None and cancel_event.is_set():
+                print(f"Sort of '{folder_path}' cancelled before any file was moved.")
+                return None
+            stability_settings = options.stability
+            self._checker = StabilityChecker(folder_path, stability_settings) if stability_settings.get('enabled', True) else None
+
+        if options.sort_mode == SYMLINK and not retry:
+            # Keep links that are still right, drop stale ones, and only create what is missing
+            manifest = self._view_manifest = ViewManifest(target_root)
+            linked, pruned = prune_view(manifest, folder_path, planned_moves)
+            if pruned:
+                print(f"Removed {pruned} stale links from the view in '{target_root}'.")
+            source_root = path.abspath(folder_path)
+            unlinked = CompactPlan()
+            unlinked.extend((filename, category) for filename, category in planned_moves
+                            if path.normcase(path.join(source_root, filename)) not in linked)
+            planned_moves = unlinked
+
+        # Files still being written are set aside before any folder is created for them
+        checker = self._checker
+        deferred = CompactPlan()
+        if checker:
+            checker.prepare()
+            ready = CompactPlan()
+            for original_filename, category_folder_name in planned_moves:
+                if retry and not path.exists(path.join(folder_path, original_filename)):
+                    continue # renamed or removed by its writer (e.g. a finished download's placeholder)
+                reason = checker.check(original_filename)
+                if reason:
+                    print(f"Deferring '{original_filename}': {reason}.")
+                    deferred.append(original_filename, category_folder_name)
+                else:
+                    ready.append(original_filename, category_folder_name)
+            planned_moves = ready
+        self._set_deferred(deferred, destination_categories)
+
+        if not planned_moves:
+            if deferred:
+                print(f"{len(deferred)} file(s) in '{folder_path}' are still being written; they will be re-checked.")
+                return None
+            if options.sort_mode == SYMLINK:
+                print(f"Symlink view in '{target_root}' is up to date.")
+                return None
             print(f"No files found in '{folder_path}' to sort.")
             return None # Nothing to do
-    except OSError as e:
-        err_msg = f"Error reading source folder '{folder_path}': {str(e)}"
-        if show_error_dialog:
-            _schedule_on_gui_thread(show_error_dialog, err_msg)
-        else:
-            print(err_msg)
-        return f"Could not read source folder: {folder_path}"
 
-    print(f"Starting sort for {len(source_files)} items in '{folder_path}'...")
+        print(f"Starting sort for {len(planned_moves)} matching files in '{folder_path}'...")
+        progress = self.progress = SortProgress(folder_path, len(planned_moves))
 
-    for original_filename in source_files:
-        file_path = path.join(folder_path, original_filename)
+        if self._view_manifest is not None:
+            # Recorded before creating them, so later runs only ever remove folders the view made
+            self._view_manifest.note_missing_folders(planned_moves.categories_used())
+        # Create every needed category folder once, up front, instead of once per file
+        for category_folder_name, e in create_category_folders(
+                target_root, planned_moves.categories_used(), executor=self.executor).items():
+            target_folder_path = path.join(target_root, category_folder_name)
+            self._error(f"Error creating folder '{target_folder_path}': {str(e)}. Files for this category will be skipped.")
+            # Normalize path for reliable checking in failed_folder_creations (OS-dependent case handling)
+            failed_folder_creations.add(path.normcase(target_folder_path))
 
-        try:
-            if not path.isfile(file_path):
-                # print(f"Skipping non-file item: '{original_filename}'") # Debug
+        def transfer(original_filename, category_folder_name):
+            """Moves (or links) one planned file, reporting errors. Returns True if it was sorted."""
+            file_path = path.join(folder_path, original_filename)
+            target_folder_path = path.join(target_root, category_folder_name)
+            # Normalize path for reliable checking in failed_folder_creations (OS-dependent case handling)
+            normalized_target_folder_path_for_check = path.normcase(target_folder_path)
+
+            if normalized_target_folder_path_for_check in failed_folder_creations:
+                # If we already know we can't create this folder, skip the file
+                print(f"Skipping category '{category_folder_name}' for '{original_filename}' as folder creation previously failed.")
+                return False
+
+            if throttle is not None and not throttle.before_move(cancel_event):
+                return False # cancelled while throttled
+            try:
+                if linker is not None:
+                    destination_file_path, file_size, method = linker.link(file_path, target_folder_path, original_filename)
+                    if method is None:
+                        return False # already materialized by an earlier run
+                    if self._view_manifest is not None:
+                        self._view_manifest.add_link(destination_file_path)
+                    print(f"Linked ({method}): '{original_filename}' to '{destination_file_path}'")
+                else:
+                    print(f"Attempting to move: '{file_path}' to '{target_folder_path}'")
+                    destination_file_path, file_size = move_file(file_path, target_folder_path, original_filename)
+                    print(f"Successfully moved: '{original_filename}' to '{destination_file_path}'")
+                progress.moved += 1
+                run_summary.add_file(destination_categories.get(category_folder_name, category_folder_name), file_size)
+                if self.on_move:
+                    self.on_move(original_filename, category_folder_name, destination_file_path, file_size)
+                if throttle is not None:
+                    throttle.after_move(file_size, cancel_event)
+                return True
+            except OSError as e:
+                self._error(f"Error moving file '{original_filename}' to '{target_folder_path}': {str(e)}")
+            except Exception as e: 
+                self._error(f"Unexpected error moving file '{original_filename}' to '{target_folder_path}': {str(e)}")
+            return False
+
+        for original_filename, category_folder_name in planned_moves:
+            if cancel_event is not None and cancel_event.is_set():
+                progress.cancelled = True
+                print(f"Sort cancelled after {progress.done} of {progress.total} files.")
+                break
+            progress.done += 1
+            progress.report(self.on_progress)
+
+            # Checked again right before the move: a long sort may reach it much later
+            reason = checker.check(original_filename) if checker else None
+            if reason:
+                print(f"Deferring '{original_filename}': {reason}.")
+                deferred.append(original_filename, category_folder_name)
                 continue
-        except OSError as e:
-            print(f"Could not determine if '{original_filename}' is a file: {e}. Skipping.")
-            if show_error_dialog:
-                 _schedule_on_gui_thread(show_error_dialog, f"Error accessing '{original_filename}': {str(e)}. Skipping.")
-            continue
-
-        # Process only files with extensions
-        if '.' in original_filename:
-            file_extension = original_filename.split('.')[-1].lower() # Normalize extension for comparison
-            
-            for category_folder_name, configured_extensions in folder_extensions_mapping.items():
-                normalized_configured_extensions = [ext.lower() for ext in configured_extensions]
-
-                if file_extension in normalized_configured_extensions:
-                    target_folder_path = path.join(folder_path, category_folder_name)
-                    # Normalize path for reliable checking in failed_folder_creations (OS-dependent case handling)
-                    normalized_target_folder_path_for_check = path.normcase(target_folder_path)
-
-                    if normalized_target_folder_path_for_check in failed_folder_creations:
-                        # If we already know we can't create this folder,
-                        # break from inner loop (categories), skip category
-                        print(f"Skipping category '{category_folder_name}' for '{original_filename}' as folder creation previously failed.")
-                        break 
-
-                    try:
-                        # Attempt to create the directory. exist_ok=True means no error if it already exists.
-                        makedirs(target_folder_path, exist_ok=True)
-                    except OSError as e:
-                        err_msg = f"Error creating folder '{target_folder_path}': {str(e)}. Files for this category will be skipped."
-                        if show_error_dialog:
-                            _schedule_on_gui_thread(show_error_dialog, err_msg)
-                        else:
-                            print(err_msg)
-                        failed_folder_creations.add(normalized_target_folder_path_for_check)
-                        break # Break from inner loop (categories), process next file
-
-                    current_filename_to_move = original_filename
-                    destination_file_path = path.join(target_folder_path, current_filename_to_move)
-
-                    if path.exists(destination_file_path):
-                        current_filename_to_move = generate_unique_filename(target_folder_path, current_filename_to_move)
-                        destination_file_path = path.join(target_folder_path, current_filename_to_move)
-
-                    try:
-                        print(f"Attempting to move: '{file_path}' to '{destination_file_path}'")
-                        move(file_path, destination_file_path)
-                        files_moved = True
-                        print(f"Successfully moved: '{original_filename}' to '{destination_file_path}'")
-                    except OSError as e:
-                        err_msg = f"Error moving file '{original_filename}' to '{target_folder_path}': {str(e)}"
-                        if show_error_dialog:
-                            _schedule_on_gui_thread(show_error_dialog, err_msg)
-                        else:
-                            print(err_msg)
-                    except Exception as e: 
-                        err_msg = f"Unexpected error moving file '{original_filename}' to '{target_folder_path}': {str(e)}"
-                        if show_error_dialog:
-                            _schedule_on_gui_thread(show_error_dialog, err_msg)
-                        else:
-                            print(err_msg)
-                    
-                    # Once a file is matched and its move attempted (succeeded or failed),
-                    # break from the inner loop (iterating through folder_extensions_mapping)
-                    # and move to the next file in the source_files list.
-                    break 
-    
-    if files_moved:
-        print("File sorting process completed. Some files were moved.")
-        notification_thread = Thread(target=show_notification, args=(folder_path,))
-        notification_thread.daemon = True
-        notification_thread.start()
-    else:
-        # No files matched any criteria, or all matched files failed to move,
-        # or the source_files list was empty initially
-        print("File sorting process completed. No files were moved.")
+            transfer(original_filename, category_folder_name)
+        if deferred:
+            self._set_deferred(deferred, destination_categories)
+            print(f"{len(deferred)} file(s) in '{folder_path}' are still being written; they will be re-checked.")
+
+        progress.finished = True
+        progress.report(self.on_progress, force=True)
+        run_summary.cancelled = progress.cancelled
+
+        if progress.moved:
+            print("File sorting process completed. Some files were moved.")
+            if self.on_complete:
+                self.on_complete(run_summary)
+        else:
+            # No files matched any criteria, or all matched files failed to move,
+            # or the source_files list was empty initially
+            print("File sorting process completed. No files were moved.")
+
+        return None # successful sort
+
+def sorter_from_config(config_data=None, progress_callback=None, root=None):
+    """Builds the Sorter for the configured folder (or root), wired to the GUI dialogs, notifications and shared throttle."""
+    from config_manager import load_config
+    config_data = config_data or load_config()
+    throttle_settings = config_data.get('throttle', {})
+    sort_throttle.configure(throttle_settings.get('moves_per_second', 0), throttle_settings.get('bytes_per_second', 0))
+    return Sorter(
+        root or config_data.get('folder_path', ''),
+        SortRules(config_data.get('folder_extensions_mapping', {})),
+        options=SortOptions.from_config(config_data),
+        throttle=sort_throttle,
+        on_progress=progress_callback,
+        on_error=_report_error,
+        on_complete=show_notification,
+    )
 
+def sort_files(progress_callback=None, cancel_event=None):
+    """Sorts the configured folder. Returns an error message, or None on success.
 
-    return None # successful sort
\ No newline at end of file
+    progress_callback(SortProgress) is called periodically and once at the end.
+    Setting cancel_event (a threading.Event) stops the run after the in-flight
+    move; files moved so far are still reported as a (partial) run.
+    """
+    return sorter_from_config(progress_callback=progress_callback).run(cancel_event)
@@ -10,11 +10,12 @@ if platform.system() == "Windows":
     except Exception as e:       
         print(f"Note: Failed to set DPI awareness - {e}") 
 
-from re import compile
+from bisect import bisect_left
 import customtkinter as ctk
 from PIL import Image
 from os import path
-from threading import Thread
+from queue import Queue, Empty
+from threading import Thread, Event
 from CTkToolTip import CTkToolTip
 
 from config_manager import (
@@ -22,6 +23,10 @@ from config_manager import (
     APP_ICON, DELETE_PNG, REGULAR_FONT, SEMIBOLD_FONT
 )
 import file_sorter
+import rule_io
+from sort_preview import format_preview
+from migration import plan_migration, execute_migration
+from rule_index import get_rule_index, validate_rule, normalize_extensions, SearchIndex
 
 # Force dark mode (realized light mode is broken, will fix soon)
 ctk.set_appearance_mode("dark")
@@ -689,82 +694,200 @@ def path_prompt_popup(message):
 # endregion
 
 
-# region validate input
-def validate_input(folder_name, extensions, original_folder=None):
-    """Validate folder name and extensions against the current config."""
+# region sort preview
+PREVIEW_POLL_MS = 100 # how often the preview window picks up new scan results
+
+def show_sort_preview(parent_window):
+    """Opens a window that scans the configured folder on a background thread and
+    streams per-category counts, collisions and unmatched files into it."""
+    if not parent_window or not parent_window.winfo_exists():
+        print("Error: show_sort_preview called with invalid parent window.")
+        return
+
     current_config = load_config()
-    mapping = current_config.get('folder_extensions_mapping', {})
+    folder_path = current_config.get('folder_path')
+    if not folder_path or not path.exists(folder_path):
+        show_error_dialog(parent_window, "Folder path is not set or does not exist")
+        return
+    rules = file_sorter.SortRules(current_config.get('folder_extensions_mapping', {}))
 
-    folder_name_stripped = folder_name.strip()
-    if not folder_name_stripped:
-        return False, "Folder name cannot be empty."
-    
-    from config_manager import reserved_names
-
-    invalid_folder_chars_pattern = compile(r'[\\:*?"<>|]') 
-    invalid_extension_chars_pattern = compile(r'[\\/:*?"<>|]')
-
-    if invalid_folder_chars_pattern.search(folder_name_stripped):
-        return False, f"Folder name '{folder_name_stripped}' contains invalid characters (e.g., \\:*?\"<>|)."
-    if folder_name_stripped.upper() in reserved_names:
-        return False, f"Folder name '{folder_name_stripped}' is a reserved name."
-    if '//' in folder_name_stripped or '\\\\' in folder_name_stripped:
-        return False, f"Folder name '{folder_name_stripped}' contains multiple consecutive slashes or backslashes."
-    if folder_name_stripped.strip('/') == '': # Catches names like "/" or "///"
-        return False, "Folder name cannot be just slashes."
-    if folder_name_stripped.startswith('/') or folder_name_stripped.endswith('/'):
-        return False, "Folder name cannot start or end with a slash."
-    if folder_name_stripped.startswith('\\') or folder_name_stripped.endswith('\\'):
-         return False, "Folder name cannot start or end with a backslash."
-
-    if folder_name_stripped == "." or folder_name_stripped == "..":
-        return False, f"Folder name cannot be '{folder_name_stripped}' as it's a special directory reference."
-
-    folder_name_lower = folder_name_stripped.lower()
-    for existing_folder_key_in_map in mapping: 
-        existing_folder_key_lower = existing_folder_key_in_map.lower()
-
-        if original_folder is None: # Adding a new category
-            if folder_name_lower == existing_folder_key_lower:
-                return False, f"Folder name '{folder_name_stripped}' already exists in the configuration."
-        else: # Editing an existing category
-            original_folder_name_lower = original_folder.lower() 
-            if folder_name_lower == existing_folder_key_lower and existing_folder_key_lower != original_folder_name_lower:
-                return False, f"Folder name '{folder_name_stripped}' already exists (used by category '{existing_folder_key_in_map}')."
-
-    # --- Extension validation ---
-    processed_extensions_for_check = [] 
-
-    for ext_input in extensions: 
-        ext_stripped = ext_input.strip().lstrip('.')
-        if not ext_stripped: continue
-
-        if invalid_extension_chars_pattern.search(ext_stripped):
-            return False, f"Extension '{ext_stripped}' contains invalid characters (e.g., \\/:*?\"<>|)."
-        if ext_stripped.upper() in reserved_names:
-            return False, f"Extension '{ext_stripped}' is a reserved name."
-
-        ext_lower = ext_stripped.lower()
-
-        for existing_folder_name_in_map, existing_extensions_in_map in mapping.items():
-            existing_folder_name_in_map_lower = existing_folder_name_in_map.lower()
-            
-            normalized_existing_extensions = existing_extensions_in_map 
+    dialog = ToplevelIco(parent_window, APP_ICON)
+    dialog.title("Sort Preview")
 
-            is_adding_new_category = original_folder is None
-            is_editing_a_different_category = not is_adding_new_category and \
-                                              existing_folder_name_in_map_lower != original_folder.lower()
+    content_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+    content_frame.pack(fill="both", expand=True, padx=20, pady=20)
 
-            if (is_adding_new_category or is_editing_a_different_category) and \
-               ext_lower in normalized_existing_extensions:
-                 return False, f"Extension '{ext_stripped}' is already assigned to folder '{existing_folder_name_in_map}'."
-        
-        processed_extensions_for_check.append(ext_stripped)
+    report_box = ctk.CTkTextbox(content_frame, font=FONTS['regular_12'], wrap="none")
+    report_box.pack(fill="both", expand=True)
+    report_box.insert("1.0", f"Scanning '{folder_path}'...")
+    report_box.configure(state="disabled")
+
+    results = Queue()
+    cancel_event = Event()
+
+    def scan():
+        file_sorter.preview_sort(folder_path, rules, on_batch=results.put, cancel_event=cancel_event,
+                                 options=file_sorter.SortOptions.from_config(current_config))
+
+    def poll():
+        if not dialog.winfo_exists():
+            return
+        latest = None
+        while True: # only the newest snapshot matters
+            try:
+                latest = results.get_nowait()
+            except Empty:
+                break
+        if latest is not None:
+            report_box.configure(state="normal")
+            report_box.delete("1.0", "end")
+            report_box.insert("1.0", "\n".join(format_preview(latest)))
+            report_box.configure(state="disabled")
+            if latest['finished']:
+                return # scan done, stop polling
+        dialog.after(PREVIEW_POLL_MS, poll)
+
+    def on_close():
+        cancel_event.set()
+        dialog.destroy()
+
+    close_button = ctk.CTkButton(content_frame, text="Close", width=80, font=FONTS['semibold_12'], command=on_close)
+    close_button.pack(pady=(10, 0))
+
+    dialog.protocol("WM_DELETE_WINDOW", on_close)
+    dialog.center_window(width=520, height=420)
+    dialog.transient(parent_window)
+    dialog.lift()
+
+    Thread(target=scan, name="SortPreview", daemon=True).start()
+    dialog.after(PREVIEW_POLL_MS, poll)
+# endregion
+
+
+# region rule migration
+MIGRATION_POLL_MS = 150 # how often the migration window picks up progress
+
+def start_rule_migration(parent_window, old_mapping):
+    """Plans, on a background thread, how to re-sort already-sorted files after a rule
+    change from old_mapping to the saved rules, and offers to run it if anything moves."""
+    current_config = load_config()
+    folder_path = current_config.get('folder_path')
+    if not folder_path or not path.exists(folder_path):
+        return
+    new_mapping = dict(current_config.get('folder_extensions_mapping', {}))
+    plans = Queue()
+
+    def plan():
+        try:
+            plans.put(plan_migration(folder_path, old_mapping, new_mapping,
+                                     current_config.get('destination_templates', {})))
+        except Exception as e:
+            print(f"Error planning re-sort for rule change: {e}")
+
+    def wait_for_plan():
+        if not parent_window.winfo_exists():
+            return
+        try:
+            migration_plan = plans.get_nowait()
+        except Empty:
+            parent_window.after(MIGRATION_POLL_MS, wait_for_plan)
+            return
+        if migration_plan.total:
+            show_migration_dialog(parent_window, migration_plan)
+
+    Thread(target=plan, name="MigrationPlan", daemon=True).start()
+    parent_window.after(MIGRATION_POLL_MS, wait_for_plan)
+
+def show_migration_dialog(parent_window, migration_plan):
+    """Shows a MigrationPlan and runs it on a background thread with live progress."""
+    dialog = ToplevelIco(parent_window, APP_ICON)
+    dialog.title("Re-sort Sorted Files")
+
+    content_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+    content_frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+    report_box = ctk.CTkTextbox(content_frame, font=FONTS['regular_12'], wrap="none", height=200)
+    report_box.pack(fill="both", expand=True)
+    report_box.insert("1.0", "\n".join(migration_plan.describe()))
+    report_box.configure(state="disabled")
+
+    status_label = ctk.CTkLabel(content_frame, text="Files sorted under the old rules can be moved to match the new ones.",
+                                font=FONTS['regular_12'])
+    status_label.pack(pady=(10, 0))
+
+    button_frame = ctk.CTkFrame(content_frame, fg_color="transparent")
+    button_frame.pack(pady=(10, 0))
+
+    updates = Queue()
+    cancel_event = Event()
+    running = [False]
+
+    def run():
+        progress, errors = execute_migration(migration_plan, progress_callback=lambda p: updates.put((p.describe(), None)),
+                                             cancel_event=cancel_event)
+        updates.put((progress.describe(), (progress, errors)))
+
+    def poll():
+        if not dialog.winfo_exists():
+            return
+        text, result = None, None
+        while True:
+            try:
+                text, result = updates.get_nowait()
+            except Empty:
+                break
+            if result is not None:
+                break
+        if text is not None:
+            status_label.configure(text=text)
+        if result is None:
+            dialog.after(MIGRATION_POLL_MS, poll)
+            return
+        running[0] = False
+        progress, errors = result
+        done_text = "Re-sort cancelled" if progress.cancelled else "Re-sort finished"
+        status_label.configure(text=f"{done_text}: {progress.moved} of {progress.total} item(s) moved.")
+        if errors:
+            report_box.configure(state="normal")
+            report_box.delete("1.0", "end")
+            report_box.insert("1.0", "\n".join(errors))
+            report_box.configure(state="disabled")
+        start_button.configure(state="disabled")
+        close_button.configure(text="Close", state="normal")
+
+    def on_start():
+        running[0] = True
+        start_button.configure(state="disabled")
+        close_button.configure(text="Cancel")
+        Thread(target=run, name="RuleMigration", daemon=True).start()
+        dialog.after(MIGRATION_POLL_MS, poll)
+
+    def on_close():
+        if running[0]:
+            cancel_event.set() # stops after the in-flight move; poll reports the partial result
+            close_button.configure(state="disabled")
+            return
+        dialog.destroy()
+
+    start_button = ctk.CTkButton(button_frame, text="Re-sort", width=80, font=FONTS['semibold_12'], command=on_start)
+    start_button.pack(side="left", padx=5)
+    close_button = ctk.CTkButton(button_frame, text="Skip", width=80, font=FONTS['semibold_12'],
+                                 fg_color="#343638", hover_color="#2d2a2e", command=on_close)
+    close_button.pack(side="left", padx=5)
+
+    dialog.protocol("WM_DELETE_WINDOW", on_close)
+    dialog.center_window(width=520, height=380)
+    dialog.transient(parent_window)
+    dialog.lift()
+# endregion
 
-    if not processed_extensions_for_check:
-        return False, "At least one valid extension is required."
 
-    return True, "" # Validation passed
+# region validate input
+def validate_input(folder_name, extensions, original_folder=None):
+    """Validate folder name and extensions against the current config (via the maintained RuleIndex)."""
+    current_config = load_config()
+    index = get_rule_index(current_config.get('folder_extensions_mapping', {}))
+    return validate_rule(index, folder_name, extensions, original_folder=original_folder)
 # endregion
 
 
@@ -775,14 +898,66 @@ def process_extensions_string(extensions_str):
     removes duplicates while preserving the order of the first occurrence.
     Returns a list of unique, cleaned extensions in order.
     """
-    raw_extensions_list = [ext.strip().lstrip('.').lower() for ext in extensions_str.split(',') if ext.strip()]
-    seen_extensions = set()
-    ordered_unique_extensions = []
-    for ext in raw_extensions_list:
-        if ext not in seen_extensions:
-            ordered_unique_extensions.append(ext)
-            seen_extensions.add(ext)
-    return ordered_unique_extensions
+    return normalize_extensions(extensions_str.split(','))
+# endregion
+
+
+# region ChangeTracker
+DIRTY_CHECK_DELAY_MS = 120 # delay after the last keystroke before a row is compared
+
+class ChangeTracker:
+    """Central, debounced dirty tracking for CategoryRows.
+
+    Keystrokes only (re)schedule one comparison per row; the comparison runs once
+    typing pauses. `dirty` holds the original folder names of every category with
+    unsaved edits (on screen or stashed as a draft), so unsaved-change checks are
+    O(1) and never walk the widget tree.
+    """
+    def __init__(self, window, delay_ms=DIRTY_CHECK_DELAY_MS):
+        self.window = window
+        self.delay_ms = delay_ms
+        self.dirty = set()
+        self._scheduled = {} # row -> after() id of its pending comparison
+
+    def notify(self, row):
+        """Called on every edit of a row; debounces the comparison."""
+        after_id = self._scheduled.pop(row, None)
+        if after_id is not None:
+            self.window.after_cancel(after_id)
+        self._scheduled[row] = self.window.after(self.delay_ms, lambda r=row: self._run_check(r))
+
+    def _run_check(self, row):
+        self._scheduled.pop(row, None)
+        try:
+            if row.winfo_exists():
+                row.check_changed()
+        except Exception as e:
+            print(f"Error checking row changes: {e}")
+
+    def flush(self, row=None):
+        """Runs pending comparisons now (for one row, or all) so dirty state is current."""
+        rows = [row] if row is not None else list(self._scheduled)
+        for pending_row in rows:
+            after_id = self._scheduled.pop(pending_row, None)
+            if after_id is not None:
+                self.window.after_cancel(after_id)
+                self._run_check(pending_row)
+
+    def mark(self, folder_name, is_dirty):
+        if is_dirty:
+            self.dirty.add(folder_name)
+        else:
+            self.dirty.discard(folder_name)
+
+    def forget(self, folder_name):
+        self.dirty.discard(folder_name)
+
+    def retain(self, folder_names):
+        """Drops dirty entries for categories that no longer exist."""
+        self.dirty &= set(folder_names)
+
+    def has_changes(self):
+        return bool(self.dirty)
 # endregion
 
 
@@ -797,6 +972,7 @@ class CategoryRow(ctk.CTkFrame):
         self.original_extensions_str = ', '.join(extensions)
         self.delete_icon = delete_icon
         self.is_dirty = False # to track unsaved changes
+        self.bound_folder = None # category shown by this (recycled) row, set by VirtualCategoryList
 
         label_frame = ctk.CTkFrame(self, corner_radius=10, height=40)
         label_frame.pack_propagate(False)
@@ -835,6 +1011,24 @@ class CategoryRow(ctk.CTkFrame):
         self.folder_entry_var.trace_add("write", self._on_entry_change)
         self.extensions_textbox.bind("<KeyRelease>", self._on_textbox_change)
 
+    def bind_category(self, folder_name, extensions, draft=None):
+        """Re-point this (recycled) row at another category.
+
+        draft is an optional (folder text, extensions text) pair of unsaved edits
+        to restore, e.g. when a dirty row scrolls back into view.
+        """
+        self.original_folder = folder_name
+        self.original_extensions_str = ', '.join(extensions)
+        folder_text, extensions_text = draft if draft else (folder_name, self.original_extensions_str)
+        self.folder_entry_var.set(folder_text)
+        self.extensions_textbox.delete("1.0", "end")
+        self.extensions_textbox.insert("1.0", extensions_text)
+        self._handle_change(draft is not None)
+
+    def current_values(self):
+        """Returns the (folder text, extensions text) currently entered in the row."""
+        return self.folder_entry_var.get().strip(), self.extensions_textbox.get("1.0", "end-1c").strip()
+
     def _handle_change(self, is_changed):
         """Handle UI changes when field values change.
 
@@ -842,6 +1036,9 @@ class CategoryRow(ctk.CTkFrame):
         based on whether the folder name or extensions have been modified from
         their original saved state. It also sets the `is_dirty` flag which is
         used to track unsaved changes when closing the configuration window."""
+        self.config_window.change_tracker.mark(self.original_folder, is_changed)
+        if is_changed == self.is_dirty:
+            return # buttons already in the right state
         self.is_dirty = is_changed # Update dirty state
         if is_changed:
             # Show Save and Reset buttons, hide Remove button
@@ -855,22 +1052,19 @@ class CategoryRow(ctk.CTkFrame):
             self.remove_button.place(relx=0.5, rely=0.5, anchor="center")
 
     def _on_entry_change(self, *args):
-        """Handle folder name entry changes"""
-        new_folder_name = self.folder_entry_var.get().strip()
-        current_extensions = self.extensions_textbox.get("1.0", "end-1c").strip()
-        # Check if current values differ from the last saved state
-        is_changed = (new_folder_name != self.original_folder or
-                      current_extensions != self.original_extensions_str)
-        self._handle_change(is_changed) # Update UI based on change status
+        """Handle folder name entry changes (the comparison is debounced by the ChangeTracker)"""
+        self.config_window.change_tracker.notify(self)
 
     def _on_textbox_change(self, event=None):
-        """Handle extensions textbox changes"""
-        current_folder = self.folder_entry_var.get().strip()
-        new_ext = self.extensions_textbox.get("1.0", "end-1c").strip()
-        # Check if current values differ from the last saved state
+        """Handle extensions textbox changes (the comparison is debounced by the ChangeTracker)"""
+        self.config_window.change_tracker.notify(self)
+
+    def check_changed(self):
+        """Compares the fields with the last saved state and updates the dirty state."""
+        current_folder, current_extensions = self.current_values()
         is_changed = (current_folder != self.original_folder or
-                      new_ext != self.original_extensions_str)
-        self._handle_change(is_changed) # Update UI
+                      current_extensions != self.original_extensions_str)
+        self._handle_change(is_changed) # Update UI based on change status
 
     def _handle_save_button_click(self):
         """Handles the click of the row's save button, showing errors if necessary."""
@@ -881,25 +1075,17 @@ class CategoryRow(ctk.CTkFrame):
 
     def save_entry_changes(self):
         """Save changes to folder name and extensions, preserving order."""
-        new_folder_name = self.folder_entry_var.get().strip()
-        new_extensions_str = self.extensions_textbox.get("1.0", "end-1c").strip()
-
-        # Use the helper function
-        ordered_unique_extensions = process_extensions_string(new_extensions_str)
+        new_folder_name, new_extensions_str = self.current_values()
+        old_folder = self.original_folder
+        old_mapping = dict(load_config()['folder_extensions_mapping']) # for re-sorting files sorted under the old rules
 
-        # Use ordered_unique_extensions for validation
-        is_valid, error_message = validate_input(new_folder_name, ordered_unique_extensions, original_folder=self.original_folder)
-        if is_valid is None:
-            return False
-        if not is_valid:
-            return error_message
-
-        # --- Save logic ---
-        config_data = load_config()
-        config_data['folder_extensions_mapping'].pop(self.original_folder, None)
-        config_data['folder_extensions_mapping'][new_folder_name] = ordered_unique_extensions
-        save_config(folder_extensions_mapping=config_data['folder_extensions_mapping'])
+        save_result, ordered_unique_extensions = self.config_window.save_category(
+            old_folder, new_folder_name, new_extensions_str)
+        if save_result is not True:
+            return save_result
+        self.config_window.schedule_rule_migration(old_mapping)
 
+        self.config_window.change_tracker.forget(old_folder)
         self.original_folder = new_folder_name
         self.original_extensions_str = ', '.join(ordered_unique_extensions)
 
@@ -908,6 +1094,9 @@ class CategoryRow(ctk.CTkFrame):
 
         self._handle_change(False)
 
+        # Move just this entry within the list (a rename may change its sort position)
+        self.config_window.category_list.replace_folder(old_folder, new_folder_name)
+
         return True
 
     def reset_fields(self):
@@ -924,9 +1113,11 @@ class CategoryRow(ctk.CTkFrame):
         def on_confirm():
             """Actual deletion logic, called after confirmation."""
             config_data = load_config()
-            config_data['folder_extensions_mapping'].pop(folder_name_to_delete, None)
+            mapping = config_data['folder_extensions_mapping']
+            get_rule_index(mapping).remove_category(folder_name_to_delete)
+            mapping.pop(folder_name_to_delete, None)
             save_config(folder_extensions_mapping=config_data['folder_extensions_mapping'])
-            self.config_window.render_scrollable_widget()
+            self.config_window.category_list.remove_folder(folder_name_to_delete)
 
         current_config = load_config()
         if current_config.get('dont_show_again', False):
@@ -961,7 +1152,246 @@ class CategoryRow(ctk.CTkFrame):
 # endregion
 
 
+# region VirtualCategoryList
+class VirtualCategoryList(ctk.CTkFrame):
+    """Category list that only creates CategoryRow widgets for the rows on screen.
+
+    Rows are recycled: scrolling rebinds the same widgets to other categories, so
+    opening the window or editing one rule costs O(visible rows), not O(rules).
+    Unsaved edits of rows that scroll out of view are kept in `drafts`.
+    """
+    def __init__(self, master, config_window, delete_icon):
+        super().__init__(master)
+        self.config_window = config_window
+        self.delete_icon = delete_icon
+        self.all_folders = []   # every category name, sorted case-insensitively
+        self.folders = []       # the names shown: all_folders, or the search results
+        self.search_query = ''
+        self._search_index = None # SearchIndex over the current rules, built on demand
+        self.first_index = 0    # index in self.folders of the top row
+        self.rows = []          # pooled CategoryRow widgets, top to bottom
+        self.row_height = None  # measured from the first row created
+        self.drafts = {}        # original folder -> (folder text, extensions text) of off-screen dirty rows
+        self.row_by_folder = {} # bound folder -> CategoryRow
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+        self._build_header()
+
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=1, column=0, sticky="nsew")
+        self.body.pack_propagate(False) # size comes from the window, not from the rows
+        self.scrollbar = ctk.CTkScrollbar(self, width=6, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns", padx=(2, 3), pady=3)
+
+        self.body.bind("<Configure>", lambda e: self._refresh_rows())
+        self.bind("<Enter>", self._bind_mousewheel, add="+")
+        self.bind("<Leave>", self._unbind_mousewheel, add="+")
+
+    def _build_header(self):
+        header_frame = ctk.CTkFrame(self)
+        header_frame.grid(row=0, column=0, columnspan=2, sticky="ew", padx=5, pady=10)
+        folders_frame = ctk.CTkFrame(header_frame, corner_radius=8, fg_color="#242424")
+        folders_frame.pack(side="left", padx=(68, 0))
+        folders_label = ctk.CTkLabel(folders_frame, text="Folders", font=FONTS['semibold_12'])
+        folders_label.pack(padx=7)
+        extensions_frame = ctk.CTkFrame(header_frame, corner_radius=8, fg_color="#242424")
+        extensions_frame.pack(side="left", padx=(140, 0))
+        extensions_label = ctk.CTkLabel(extensions_frame, text="Extensions", font=FONTS['semibold_12'])
+        extensions_label.pack(padx=7)
+
+    # --- data ---
+    def load(self, folder_names):
+        """Replaces the list contents, keeping the scroll position and unsaved drafts where possible."""
+        self.all_folders = sorted(folder_names, key=str.lower)
+        existing = set(self.all_folders)
+        self.drafts = {folder: draft for folder, draft in self.drafts.items() if folder in existing}
+        self.config_window.change_tracker.retain(existing)
+        self._apply_filter()
+
+    def _insert_sorted(self, folder_name):
+        index = bisect_left(_LowerView(self.all_folders), folder_name.lower())
+        self.all_folders.insert(index, folder_name)
+
+    def add_folder(self, folder_name):
+        self._insert_sorted(folder_name)
+        self._apply_filter()
+
+    def remove_folder(self, folder_name):
+        if folder_name in self.all_folders:
+            self.all_folders.remove(folder_name)
+        self.drafts.pop(folder_name, None)
+        self.config_window.change_tracker.forget(folder_name)
+        self._apply_filter()
+
+    def replace_folder(self, old_folder, new_folder):
+        """Updates one entry after a save; a rename may move it to a new sort position."""
+        if old_folder != new_folder:
+            if old_folder in self.all_folders:
+                self.all_folders.remove(old_folder)
+            self._insert_sorted(new_folder)
+        self._apply_filter()
+
+    def set_search(self, query):
+        """Filters the list to categories whose name or extensions contain query."""
+        query = query.strip()
+        if query == self.search_query:
+            return
+        self.search_query = query
+        self.first_index = 0
+        self._apply_filter(rules_changed=False)
+
+    def _apply_filter(self, rules_changed=True):
+        if rules_changed:
+            self._search_index = None # rebuilt on the next query
+        if not self.search_query:
+            self.folders = self.all_folders
+        else:
+            if self._search_index is None:
+                self._search_index = SearchIndex(config['folder_extensions_mapping'])
+            self.folders = self._search_index.search(self.search_query)
+        self._refresh_rows()
+
+    def scroll_to(self, folder_name):
+        """Scrolls so folder_name is visible (if it matches the current search)."""
+        if folder_name not in self.folders:
+            return
+        index = self.folders.index(folder_name)
+        visible = self._full_rows()
+        if not self.first_index <= index < self.first_index + visible:
+            self.first_index = index
+        self._refresh_rows()
+
+    # --- rows ---
+    def bound_rows(self):
+        return [row for row in self.rows if row.bound_folder is not None]
+
+    def row_for(self, folder_name):
+        return self.row_by_folder.get(folder_name)
+
+    def pending_edits(self):
+        """Returns {original folder: (folder text, extensions text)} for every unsaved category."""
+        tracker = self.config_window.change_tracker
+        tracker.flush()
+        pending = {}
+        for folder_name in tracker.dirty:
+            row = self.row_by_folder.get(folder_name)
+            if row is not None:
+                pending[folder_name] = row.current_values()
+            elif folder_name in self.drafts:
+                pending[folder_name] = self.drafts[folder_name]
+        return pending
+
+    def _full_rows(self):
+        if not self.row_height:
+            return 1
+        return max(1, self.body.winfo_height() // self.row_height)
+
+    def _extensions_for(self, folder_name):
+        return config['folder_extensions_mapping'].get(folder_name, [])
+
+    def _create_row(self, folder_name):
+        row = CategoryRow(
+            master=self.body,
+            config_window=self.config_window,
+            folder_name=folder_name,
+            extensions=self._extensions_for(folder_name),
+            delete_icon=self.delete_icon
+        )
+        row.bound_folder = folder_name
+        self.row_by_folder[folder_name] = row
+        self.rows.append(row)
+        if self.row_height is None:
+            row.update_idletasks()
+            self.row_height = max(1, row.winfo_reqheight())
+        return row
+
+    def _refresh_rows(self):
+        """Binds the pooled rows to folders[first_index:], growing the pool to fill the view."""
+        max_first = max(0, len(self.folders) - self._full_rows())
+        self.first_index = min(max(0, self.first_index), max_first)
+
+        # Rows needed to fill the body (one extra for the partly visible bottom row)
+        needed = min(len(self.folders) - self.first_index, self._full_rows() + 1)
+        while len(self.rows) < needed:
+            self._create_row(self.folders[self.first_index + len(self.rows)])
+
+        for offset, row in enumerate(self.rows):
+            index = self.first_index + offset
+            folder_name = self.folders[index] if offset < needed else None
+            if row.bound_folder == folder_name:
+                continue # already showing this category; keep any in-progress edit
+            if row.bound_folder is not None:
+                self.config_window.change_tracker.flush(row) # settle a pending keystroke check first
+                if row.is_dirty:
+                    self.drafts[row.original_folder] = row.current_values()
+                if self.row_by_folder.get(row.bound_folder) is row:
+                    del self.row_by_folder[row.bound_folder]
+            if folder_name is None:
+                row.bound_folder = None
+                row.pack_forget()
+                continue
+            if row.bound_folder is None:
+                row.pack(fill="x", padx=2, pady=0)
+            row.bound_folder = folder_name
+            self.row_by_folder[folder_name] = row
+            row.bind_category(folder_name, self._extensions_for(folder_name), self.drafts.pop(folder_name, None))
+
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self.folders)
+        if not total:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.scrollbar.set(self.first_index / total, min(1.0, (self.first_index + self._full_rows()) / total))
+
+    # --- scrolling ---
+    def scroll_rows(self, count):
+        self.first_index += count
+        self._refresh_rows()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.first_index = int(float(value) * len(self.folders))
+            self._refresh_rows()
+        elif action == "scroll":
+            step = self._full_rows() if unit == "pages" else 1
+            self.scroll_rows(int(value) * step)
+
+    def _on_mousewheel(self, event):
+        if event.num == 5 or event.delta < 0:
+            self.scroll_rows(1)
+        elif event.num == 4 or event.delta > 0:
+            self.scroll_rows(-1)
+
+    def _bind_mousewheel(self, event=None):
+        self.bind_all("<MouseWheel>", self._on_mousewheel)
+        self.bind_all("<Button-4>", self._on_mousewheel)
+        self.bind_all("<Button-5>", self._on_mousewheel)
+
+    def _unbind_mousewheel(self, event=None):
+        self.unbind_all("<MouseWheel>")
+        self.unbind_all("<Button-4>")
+        self.unbind_all("<Button-5>")
+
+class _LowerView:
+    """Read-only lowercased view of a list of names, for bisect on large lists."""
+    def __init__(self, names):
+        self.names = names
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        return self.names[index].lower()
+# endregion
+
+
 # region ConfigWindow
+SEARCH_DEBOUNCE_MS = 150 # delay after the last keystroke before filtering
+MIGRATION_DEBOUNCE_MS = 300 # collects the saves of one "save all" into a single re-sort plan
+
 class ConfigWindow(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -985,9 +1415,17 @@ class ConfigWindow(ctk.CTk):
             print(f"Error loading delete image: {e}")
             self.delete_icon = None
 
+        # --- Dirty tracking for category rows (must exist before rows are built) ---
+        self.change_tracker = ChangeTracker(self)
+
+        # --- Re-sort after rule edits: rules as they were before the first unplanned save ---
+        self._migration_base = None
+        self._migration_after_id = None
+
         # --- Build UI Elements ---
         self._build_path_frame()
         self._build_add_frame()
+        self._build_search_frame()
         self._build_scrollable_frame() 
 
         # --- Set Initial Geometry & Minimum Size ---
@@ -1084,21 +1522,59 @@ class ConfigWindow(ctk.CTk):
                 print(f"Failed to set even basic geometry: {basic_e}")
 
     def get_category_rows(self):
-        """Returns a list of all CategoryRow widgets."""
-        return [widget for widget in self.scrollable_frame.winfo_children()
-                if isinstance(widget, CategoryRow)]
+        """Returns the CategoryRow widgets currently bound to a category (the visible ones)."""
+        return self.category_list.bound_rows()
 
     def has_unsaved_changes(self):
-        """Checks if any CategoryRow has unsaved changes."""
-        for row in self.get_category_rows():
-            if row.is_dirty:
-                return True
-        return False
+        """Checks if any category, visible or scrolled out of view, has unsaved changes."""
+        self.change_tracker.flush()
+        return self.change_tracker.has_changes()
+
+    def save_category(self, original_folder, new_folder_name, new_extensions_str):
+        """Validates and saves one edited category.
+
+        Returns (result, ordered_unique_extensions) where result is True on success,
+        False if the user cancelled a sub-dialog, or the validation error message.
+        """
+        # Use the helper function
+        ordered_unique_extensions = process_extensions_string(new_extensions_str)
+
+        # Use ordered_unique_extensions for validation
+        is_valid, error_message = validate_input(new_folder_name, ordered_unique_extensions, original_folder=original_folder)
+        if is_valid is None:
+            return False, ordered_unique_extensions
+        if not is_valid:
+            return error_message, ordered_unique_extensions
+
+        # --- Save logic ---
+        config_data = load_config()
+        mapping = config_data['folder_extensions_mapping']
+        index = get_rule_index(mapping)
+        mapping.pop(original_folder, None)
+        mapping[new_folder_name] = ordered_unique_extensions
+        index.replace_category(original_folder, new_folder_name, ordered_unique_extensions)
+        save_config(folder_extensions_mapping=mapping)
+        return True, ordered_unique_extensions
+
+    def schedule_rule_migration(self, old_mapping):
+        """Offers to re-sort already-sorted files shortly after the rules were saved.
+
+        Saves in quick succession are diffed together, from the rules before the first one.
+        """
+        if self._migration_base is None:
+            self._migration_base = old_mapping
+        if self._migration_after_id is not None:
+            self.after_cancel(self._migration_after_id)
+        self._migration_after_id = self.after(MIGRATION_DEBOUNCE_MS, self._start_rule_migration)
+
+    def _start_rule_migration(self):
+        old_mapping, self._migration_base, self._migration_after_id = self._migration_base, None, None
+        start_rule_migration(self, old_mapping)
 
     def save_all_changes(self, render_on_success=True):
-        """Attempts to save changes in all dirty CategoryRow widgets.
+        """Attempts to save changes in all dirty categories, including off-screen drafts.
         Args:
-            render_on_success (bool): If True, re-renders the scrollable widget
+            render_on_success (bool): If True, refreshes the visible rows
                                       if any changes were successfully saved.
         Returns:
             True if all saves were successful.
@@ -1109,21 +1585,35 @@ class ConfigWindow(ctk.CTk):
         first_error = None
         user_cancelled = False
 
-        # Create a list to avoid issues if render_scrollable_widget modifies the children during iteration
-        rows_to_process = self.get_category_rows()
+        # Snapshot by original folder name; saving one entry may rebind the recycled rows
+        pending = self.category_list.pending_edits()
+        old_mapping = dict(load_config()['folder_extensions_mapping']) # for re-sorting files sorted under the old rules
+        drafts_saved = False
 
-        for row in rows_to_process:
-            if row.is_dirty:
+        for original_folder, (new_folder_name, new_extensions_str) in pending.items():
+            row = self.category_list.row_for(original_folder)
+            if row is not None:
                 save_result = row.save_entry_changes()
-
-                if isinstance(save_result, str): # Validation error occurred
-                    first_error = save_result
-                    break # Stop processing on the first error
-                elif save_result is False: # User cancellation in a sub-dialog
-                    user_cancelled = True
-                    break # Stop processing on cancellation
-                elif save_result is True: # Successful save for this row
-                    rows_to_rerender = True
+            else:
+                save_result, _ = self.save_category(original_folder, new_folder_name, new_extensions_str)
+                if save_result is True:
+                    drafts_saved = True
+                    self.category_list.drafts.pop(original_folder, None)
+                    self.change_tracker.forget(original_folder)
+                    self.category_list.replace_folder(original_folder, new_folder_name)
+
+            if isinstance(save_result, str): # Validation error occurred
+                first_error = save_result
+                break # Stop processing on the first error
+            elif save_result is False: # User cancellation in a sub-dialog
+                user_cancelled = True
+                break # Stop processing on cancellation
+            elif save_result is True: # Successful save for this row
+                rows_to_rerender = True
+
+        if drafts_saved:
+            # Visible rows schedule their own; the debounce folds these into one migration from old_mapping
+            self.schedule_rule_migration(old_mapping)
 
         if first_error:
             return first_error # Return the specific validation error message
@@ -1132,7 +1622,7 @@ class ConfigWindow(ctk.CTk):
             print("Save operation cancelled by user in a sub-dialog.")
             return False # Indicate cancellation occurred
 
-        # Only re-render if no errors/cancellations stopped us,
+        # Only refresh if no errors/cancellations stopped us,
         # some rows were actually saved, AND we are asked to render on success
         if rows_to_rerender and render_on_success:
             self.render_scrollable_widget()
@@ -1249,6 +1739,11 @@ class ConfigWindow(ctk.CTk):
         browse_button = ctk.CTkButton(path_frame, text="Browse", width=12, font=FONTS['semibold_12'], command=self.select_folder)
         browse_button.pack(side="right", padx=(7,8), pady=7)
 
+        preview_button = ctk.CTkButton(path_frame, text="Preview", width=12, font=FONTS['semibold_12'],
+                                       fg_color="#343638", hover_color="#2d2a2e",
+                                       command=lambda: show_sort_preview(self))
+        preview_button.pack(side="right", padx=(7,0), pady=7)
+
 
     def refresh_path_entry(self, new_path):
         """Update the path entry with a new path"""
@@ -1317,54 +1812,84 @@ class ConfigWindow(ctk.CTk):
             return
 
         # config should be loaded already
+        get_rule_index(config['folder_extensions_mapping']).add_category(folder_name, ordered_unique_extensions)
         config['folder_extensions_mapping'][folder_name] = ordered_unique_extensions
         save_config(folder_extensions_mapping=config['folder_extensions_mapping'])
 
-        self.render_scrollable_widget()
+        self.category_list.add_folder(folder_name)
+        self.category_list.scroll_to(folder_name)
 
         self.new_category_entry.delete(0, ctk.END)
         self.new_extensions_entry.delete(0, ctk.END)
 
+    def _build_search_frame(self):
+        """Creates the search box that filters the category list."""
+        search_frame = ctk.CTkFrame(self, fg_color="transparent")
+        search_frame.pack(fill="x", padx=10, pady=(0,8))
+
+        self.search_var = ctk.StringVar()
+        self.search_entry = ctk.CTkEntry(search_frame, height=25, font=FONTS['semibold_12'], textvariable=self.search_var,
+                                         placeholder_text="Search folders or extensions (e.g. .heic)")
+        self.search_entry.pack(side="left", fill="x", expand=True)
+
+        export_button = ctk.CTkButton(search_frame, text="Export", width=60, height=25, font=FONTS['semibold_12'],
+                                      fg_color="#343638", hover_color="#2d2a2e", command=self.export_rules)
+        export_button.pack(side="right", padx=(6,0))
+        import_button = ctk.CTkButton(search_frame, text="Import", width=60, height=25, font=FONTS['semibold_12'],
+                                      fg_color="#343638", hover_color="#2d2a2e", command=self.import_rules)
+        import_button.pack(side="right", padx=(6,0))
+        self._search_after_id = None
+        self.search_var.trace_add("write", self._schedule_search)
+
+    def _schedule_search(self, *args):
+        """Debounce typing: run the query once the user pauses."""
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self._run_search)
+
+    def _run_search(self):
+        self._search_after_id = None
+        self.category_list.set_search(self.search_var.get())
+
+    def import_rules(self):
+        """Bulk-imports rules from a JSON/CSV/YAML file as one validated, atomic save."""
+        if self.has_unsaved_changes():
+            show_error_dialog(self, "Save or reset your unsaved changes before importing rules.")
+            return
+        file_path = ctk.filedialog.askopenfilename(
+            filetypes=[("Rule files", "*.json *.csv *.yaml *.yml"), ("All files", "*.*")])
+        if not file_path:
+            return
+        old_mapping = dict(load_config()['folder_extensions_mapping'])
+        mapping, errors = rule_io.import_rules(file_path)
+        if errors:
+            shown = "\n".join(errors[:10])
+            more = f"\n...and {len(errors) - 10} more." if len(errors) > 10 else ""
+            show_error_dialog(self, f"Import failed with {len(errors)} problem(s); nothing was saved.\n\n{shown}{more}")
+            return
+        print(f"Imported rules from '{file_path}' ({len(mapping)} categories).")
+        self.render_scrollable_widget()
+        self.schedule_rule_migration(old_mapping)
+
+    def export_rules(self):
+        """Exports the current rules to a JSON/CSV/YAML file."""
+        file_path = ctk.filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("CSV", "*.csv"), ("YAML", "*.yaml")])
+        if not file_path:
+            return
+        error_message = rule_io.export_rules(file_path)
+        if error_message:
+            show_error_dialog(self, error_message)
+
     def _build_scrollable_frame(self):
-        """Creates the main scrollable frame."""
-        self.scrollable_frame = ctk.CTkScrollableFrame(self)
-        self.scrollable_frame.pack(fill="both", expand=True, padx=10, pady=(0,10))
-        scrollbar = self.scrollable_frame._scrollbar
-        scrollbar.configure(width=6)
+        """Creates the virtualized category list."""
+        self.category_list = VirtualCategoryList(self, config_window=self, delete_icon=self.delete_icon)
+        self.category_list.pack(fill="both", expand=True, padx=10, pady=(0,10))
 
     def render_scrollable_widget(self):
-        """Renders the list of existing categories using CategoryRow."""
-        # Destroy existing widgets first
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-
-        # Build Header
-        header_frame = ctk.CTkFrame(self.scrollable_frame)
-        header_frame.pack(fill="x", padx=5, pady=10)
-        folders_frame = ctk.CTkFrame(header_frame, corner_radius=8, fg_color="#242424")
-        folders_frame.pack(side="left", padx=(68, 0))
-        folders_label = ctk.CTkLabel(folders_frame, text="Folders", font=FONTS['semibold_12'])
-        folders_label.pack(padx=7)
-        extensions_frame = ctk.CTkFrame(header_frame, corner_radius=8, fg_color="#242424")
-        extensions_frame.pack(side="left", padx=(140, 0)) # Adjusted based on your provided code
-        extensions_label = ctk.CTkLabel(extensions_frame, text="Extensions", font=FONTS['semibold_12'])
-        extensions_label.pack(padx=7)
-
-
-        # config should be loaded already
-        sorted_folder_extensions = sorted(config['folder_extensions_mapping'].items(), key=lambda item: item[0].lower())
-
-        # Build Rows
-        for folder, extensions in sorted_folder_extensions:
-            CategoryRow(
-                master=self.scrollable_frame,
-                config_window=self,
-                folder_name=folder,
-                extensions=extensions,
-                delete_icon=self.delete_icon
-            )
-        
-        self.scrollable_frame.update_idletasks()
+        """Reloads the category names from config and rebinds the visible rows (no widgets are rebuilt)."""
+        self.category_list.load(load_config()['folder_extensions_mapping'].keys())
 # endregion
 
 # region run gui
@@ -0,0 +1,234 @@
+"""
+
+Copy-sort: builds the category tree next to the files instead of moving them.
+
+Each file is materialized in its category folder as a reflink (a copy-on-write
+clone via the Linux FICLONE ioctl, e.g. on Btrfs/XFS), a hard link, or, where
+neither works, a plain copy. The source folder is left untouched, and a re-run
+only adds files that are not materialized yet.
+
+A symlink view is the lightest variant: category folders hold symlinks into the
+source folder, and prune_view drops links whose file is gone or whose rule
+changed, so the view can be kept current on every run. Only links and folders
+recorded in the view's manifest are ever removed.
+
+"""
+
+import errno
+import json
+import os
+from os import path
+from shutil import copy2, copystat
+
+FICLONE = 0x40049409 # _IOW(0x94, 9, int) from linux/fs.h
+
+LINK_METHODS = ('reflink', 'hardlink', 'copy')
+SYMLINK = 'symlink'
+VIEW_MANIFEST_NAME = '.folder_sorter_view.json' # links and folders a symlink view sort created
+
+# Errors meaning "this method does not work between these two filesystems"
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS,
+                       errno.EPERM, getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP)}
+
+def reflink(source_file_path, destination_file_path):
+    """Clones source into a new destination file sharing its data blocks. Linux only."""
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported on this platform")
+    with open(source_file_path, 'rb') as source, open(destination_file_path, 'xb') as destination:
+        try:
+            fcntl.ioctl(destination.fileno(), FICLONE, source.fileno())
+        except OSError:
+            destination.close()
+            os.remove(destination_file_path)
+            raise
+    copystat(source_file_path, destination_file_path) # keep mtime so re-runs recognise the clone
+
+def _is_materialized(source_stat, destination_file_path):
+    """True if destination already holds source: the same inode, or a clone/copy with equal size and mtime."""
+    try:
+        destination_stat = os.stat(destination_file_path)
+    except OSError:
+        return False
+    if (destination_stat.st_dev, destination_stat.st_ino) == (source_stat.st_dev, source_stat.st_ino):
+        return True
+    return (destination_stat.st_size == source_stat.st_size
+            and destination_stat.st_mtime_ns == source_stat.st_mtime_ns)
+
+class FileLinker:
+    """Materializes files into category folders without touching the source.
+
+    method 'auto' tries reflink, then hard link, then copy; naming one method tries
+    it and falls back to copying. A method that fails for a pair of filesystems is
+    not tried again for that pair during the run.
+    """
+    def __init__(self, method='auto'):
+        if method == 'auto':
+            self.methods = LINK_METHODS
+        elif method == SYMLINK:
+            self.methods = (SYMLINK,) # a view of links only; copying would defeat the point
+        elif method in LINK_METHODS:
+            self.methods = (method,) if method == 'copy' else (method, 'copy')
+        else:
+            raise ValueError(f"Unknown link method '{method}'. Use 'auto' or one of: {', '.join(LINK_METHODS)}.")
+        self.counts = dict.fromkeys(LINK_METHODS + (SYMLINK,), 0) # files materialized per method
+        self._unsupported = set() # (method, source device, target device)
+        self._folder_devices = {} # target folder -> st_dev
+
+    def _create(self, method, source_file_path, destination_file_path):
+        if method == 'reflink':
+            reflink(source_file_path, destination_file_path)
+        elif method == 'hardlink':
+            os.link(source_file_path, destination_file_path)
+        elif method == SYMLINK:
+            os.symlink(path.abspath(source_file_path), destination_file_path)
+        else:
+            copy2(source_file_path, destination_file_path)
+
+    def link(self, source_file_path, target_folder_path, filename):
+        """Materializes one file in an existing category folder.
+
+        Returns (destination, size in bytes, method), with method None when the
+        file was already materialized by an earlier run.
+        """
+        source_stat = os.stat(source_file_path)
+        base, extension = path.splitext(filename)
+        destination_file_path = path.join(target_folder_path, filename)
+        counter = 1
+        # Walk name, name_1, ... like generate_unique_filename, stopping early at an existing copy of this file
+        while path.lexists(destination_file_path):
+            if _is_materialized(source_stat, destination_file_path):
+                return destination_file_path, source_stat.st_size, None
+            destination_file_path = path.join(target_folder_path, f"{base}_{counter}{extension}")
+            counter += 1
+
+        target_device = self._folder_devices.get(target_folder_path)
+        if target_device is None:
+            target_device = self._folder_devices[target_folder_path] = os.stat(target_folder_path).st_dev
+
+        last_error = None
+        for method in self.methods:
+            key = (method, source_stat.st_dev, target_device)
+            if key in self._unsupported:
+                continue
+            try:
+                self._create(method, source_file_path, destination_file_path)
+            except OSError as e:
+                if method in ('copy', SYMLINK) or e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                self._unsupported.add(key)
+                last_error = e
+                continue
+            self.counts[method] += 1
+            return destination_file_path, source_stat.st_size, method
+        raise last_error or OSError(errno.EOPNOTSUPP, f"No link method available for '{source_file_path}'")
+
+class ViewManifest:
+    """Record of the links and folders a symlink view sort created, kept in the view root.
+
+    prune_view only ever removes what is listed here, so links and folders the
+    user made in the view (or in the source folder, when it is the view) are
+    never touched.
+    """
+    def __init__(self, view_root):
+        self.view_root = path.abspath(view_root)
+        self.manifest_path = path.join(self.view_root, VIEW_MANIFEST_NAME)
+        self.links = set()   # link paths relative to view_root
+        self.folders = set() # folders relative to view_root, created by a sort
+        self.changed = False
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.links = set(data.get('links', []))
+            self.folders = set(data.get('folders', []))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Could not read the view manifest '{self.manifest_path}': {e}. No links will be pruned this run.")
+
+    def _relative(self, full_path):
+        return path.relpath(path.abspath(full_path), self.view_root)
+
+    def add_link(self, link_path):
+        self.links.add(self._relative(link_path))
+        self.changed = True
+
+    def note_missing_folders(self, categories):
+        """Records the category folders (and their parents) that do not exist yet, before a sort creates them."""
+        for category in categories:
+            parts = [part for part in category.replace('\\', '/').split('/') if part]
+            for depth in range(1, len(parts) + 1):
+                relative = path.join(*parts[:depth])
+                if relative not in self.folders and not path.lexists(path.join(self.view_root, relative)):
+                    self.folders.add(relative)
+                    self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        temp_path = self.manifest_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'links': sorted(self.links), 'folders': sorted(self.folders)}, f)
+            os.replace(temp_path, self.manifest_path)
+            self.changed = False
+        except OSError as e:
+            print(f"Could not save the view manifest '{self.manifest_path}': {e}")
+
+def prune_view(manifest, folder_path, planned_moves):
+    """Removes stale links recorded in manifest and reports the live ones.
+
+    A recorded link is kept if its file is still planned for the category folder
+    it sits in. Links to files that disappeared or now belong elsewhere are
+    removed, and so are folders the sorter created that become empty. Recorded
+    links that were deleted or replaced by the user are forgotten, not touched.
+    Returns (set of source files already linked, links removed).
+    """
+    source_root = path.normcase(path.abspath(folder_path))
+    view_root = manifest.view_root
+    wanted = {} # normcased source file -> normcased category folder it should be linked from
+    for filename, category in planned_moves:
+        wanted[path.normcase(path.join(source_root, filename))] = path.normcase(path.normpath(path.join(view_root, category)))
+
+    linked = set()
+    pruned = 0
+    emptied_folders = set() # relative to view_root
+    for relative in sorted(manifest.links):
+        link_path = path.join(view_root, relative)
+        try:
+            target = os.readlink(link_path)
+        except OSError:
+            manifest.links.discard(relative) # gone, or replaced by a real file
+            manifest.changed = True
+            continue
+        folder = path.dirname(link_path)
+        target = path.normcase(path.normpath(path.join(folder, target)))
+        if path.dirname(target) != source_root:
+            manifest.links.discard(relative) # re-pointed by the user; no longer ours
+            manifest.changed = True
+            continue
+        if wanted.get(target) == path.normcase(folder) and target not in linked:
+            linked.add(target)
+            continue
+        try:
+            os.remove(link_path)
+        except OSError as e:
+            print(f"Could not remove stale link '{link_path}': {e}")
+            continue
+        manifest.links.discard(relative)
+        manifest.changed = True
+        pruned += 1
+        emptied_folders.add(path.dirname(relative))
+
+    # Only folders the sorter created, deepest first; rmdir leaves non-empty folders alone
+    candidates = {folder for folder in manifest.folders
+                  if any(emptied == folder or emptied.startswith(folder + os.sep) for emptied in emptied_folders)}
+    for folder in sorted(candidates, key=len, reverse=True):
+        try:
+            os.rmdir(path.join(view_root, folder))
+        except OSError:
+            continue
+        manifest.folders.discard(folder)
+        manifest.changed = True
+    return linked, pruned
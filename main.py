@@ -5,9 +5,16 @@ Folder Sorter - an application to sort files into categorized folders
 This module is the entry point for the application.
 It initializes the tray icon and manages the app.
 
+Only one instance runs per user. Launching it again forwards the command to
+the running instance and exits:
+    python main.py              open the configuration window
+    python main.py --sort       sort the folder now
+
 """
 
 import sys
+from argparse import ArgumentParser
+from multiprocessing import freeze_support
 from os import path
 
 # Make sure imports work even if running from a different directory
@@ -15,20 +22,48 @@ current_dir = path.dirname(path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
-from tray_handler import start_tray_thread
+from single_instance import SingleInstance
+
+def parse_args(argv=None):
+    parser = ArgumentParser(description="Folder Sorter tray app.")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--sort', action='store_true', help="sort the folder now")
+    group.add_argument('--configure', action='store_true', help="open the configuration window")
+    return parser.parse_args(argv)
 
-def main():
+def main(argv=None):
     """Main function to start the application"""
-    # Start the tray icon in a separate thread
-    tray_thread = start_tray_thread()
-    
-    # Keep the main thread alive until the tray thread exits
+    args = parse_args(argv)
+    command = 'sort' if args.sort else 'open-config' if args.configure else None
+
+    instance = SingleInstance()
+    if not instance.acquire():
+        # Hand the request to the running instance before any GUI module is loaded
+        forwarded = instance.forward(command or 'open-config')
+        print("Folder Sorter is already running; " + ("request forwarded." if forwarded else "the request failed."))
+        return 0 if forwarded else 1
+
     try:
-        tray_thread.join()
-    except KeyboardInterrupt:
-        print("Application stopped by user")
-    
+        from tray_handler import start_tray_thread, open_config_gui, run_sort_files
+        instance.serve({'open-config': open_config_gui, 'sort': run_sort_files})
+
+        # Start the tray icon in a separate thread
+        tray_thread = start_tray_thread()
+        if command == 'sort':
+            run_sort_files()
+        elif command == 'open-config':
+            open_config_gui()
+
+        # Keep the main thread alive until the tray thread exits
+        try:
+            tray_thread.join()
+        except KeyboardInterrupt:
+            print("Application stopped by user")
+    finally:
+        instance.release()
+
     return 0
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    freeze_support() # process-pool workers in a frozen Windows build
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+
+Capture dates for destination templates ('Images' -> 'Images/2024/06').
+
+A file's date is its EXIF capture date (DateTimeOriginal, then
+DateTimeDigitized, then DateTime) when it is an image format that carries
+EXIF, and its mtime otherwise. Only the header is read: PIL parses the EXIF
+block without decoding pixels.
+
+Dates are read lazily: only for files in a category with a template, and
+only when the cache has no answer. Reads run on a thread pool. Results are
+cached by file identity (device, inode, size, mtime), in memory and
+optionally in a SQLite file. A file keeps its identity when it is moved within
+a volume, so later runs, previews and link views never parse its header
+again. A file that has no EXIF date is cached too.
+
+A template must stay inside its category folder: absolute paths, drive letters
+and '..' parts are rejected when the config loads (template_error), and again
+for every rendered folder.
+
+"""
+
+import os
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from os import path
+from threading import Lock
+from time import localtime, mktime, strftime, strptime, time
+
+from sort_rules import file_extension_of
+
+EXIF_EXTENSIONS = frozenset(('jpg', 'jpeg', 'jpe', 'jfif', 'tif', 'tiff', 'webp', 'png'))
+EXIF_IFD_POINTER = 0x8769
+EXIF_DATE_TAGS = (0x9003, 0x9004) # DateTimeOriginal, DateTimeDigitized (in the Exif IFD)
+TIFF_DATETIME = 0x0132 # DateTime (in IFD0; usually the last edit, so only a fallback)
+METADATA_WORKERS = 4
+DATE_CHUNK_SIZE = 256 # files per pool task
+CACHE_MAX_AGE_DAYS = 730 # cached dates older than this are dropped (and re-read if the file is still around)
+_DRIVE_PREFIX = re.compile(r'^[A-Za-z]:')
+
+def _parse_exif_date(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        return mktime(strptime(value.strip().rstrip('\x00')[:19], '%Y:%m:%d %H:%M:%S'))
+    except (ValueError, OverflowError):
+        return None # e.g. '0000:00:00 00:00:00' from cameras without a clock
+
+def read_exif_date(file_path):
+    """Returns the EXIF capture date of file_path as a timestamp, or None if it has none."""
+    from PIL import Image, UnidentifiedImageError
+    try:
+        with Image.open(file_path) as image:
+            exif = image.getexif()
+            exif_ifd = exif.get_ifd(EXIF_IFD_POINTER)
+            for tag in EXIF_DATE_TAGS:
+                taken = _parse_exif_date(exif_ifd.get(tag))
+                if taken is not None:
+                    return taken
+            return _parse_exif_date(exif.get(TIFF_DATETIME))
+    except (OSError, UnidentifiedImageError, ValueError, SyntaxError):
+        return None # not an image after all, truncated, or unreadable
+
+def file_identity(file_stat):
+    return (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+
+class MetadataCache:
+    """File identity -> EXIF date (or None for 'has no EXIF date'), in memory and optionally on disk."""
+    def __init__(self, db_path=''):
+        self._lock = Lock()
+        self._memory = {}
+        self._db = None
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS dates (dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, "
+                                 "taken REAL, added REAL, PRIMARY KEY (dev, ino, size, mtime_ns)) WITHOUT ROWID")
+                self._db.execute("DELETE FROM dates WHERE added < ?", (time() - CACHE_MAX_AGE_DAYS * 86400,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Could not open the metadata cache '{db_path}': {e}. Caching in memory only.")
+                self._db = None
+
+    def lookup(self, identity):
+        """Returns (found, taken)."""
+        with self._lock:
+            if identity in self._memory:
+                return True, self._memory[identity]
+            if self._db is None:
+                return False, None
+            try:
+                row = self._db.execute("SELECT taken FROM dates WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?",
+                                       identity).fetchone()
+            except sqlite3.Error:
+                return False, None
+            if row is None:
+                return False, None
+            self._memory[identity] = row[0]
+            return True, row[0]
+
+    def store_many(self, items):
+        """Stores (identity, taken) pairs."""
+        with self._lock:
+            self._memory.update(items)
+            if self._db is None:
+                return
+            added = time()
+            try:
+                self._db.executemany("INSERT OR REPLACE INTO dates VALUES (?, ?, ?, ?, ?, ?)",
+                                     [(*identity, taken, added) for identity, taken in items])
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Could not update the metadata cache: {e}")
+
+_caches = {} # db path -> MetadataCache, shared by every sort in this process
+_caches_lock = Lock()
+
+def shared_cache(db_path=''):
+    with _caches_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = _caches[db_path] = MetadataCache(db_path)
+        return cache
+
+def file_dates(folder_path, filenames, cache=None, workers=METADATA_WORKERS, executor=None, chunk_size=DATE_CHUNK_SIZE,
+               on_file=None, cancel_event=None):
+    """Returns {filename: timestamp} for files in folder_path: the EXIF capture date, else the mtime.
+
+    Files that cannot be stat'ed are left out. Files are stat'ed and, on a cache
+    miss, their EXIF header read on a thread pool, in chunks of chunk_size.
+    on_file() is called from the pool after each file. Once cancel_event is set,
+    the remaining files are left out too.
+    """
+    cache = cache if cache is not None else shared_cache()
+    filenames = list(filenames)
+
+    def resolve_chunk(chunk):
+        dates, new_entries = {}, []
+        for filename in chunk:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            if on_file is not None:
+                on_file()
+            try:
+                file_stat = os.stat(path.join(folder_path, filename))
+            except OSError:
+                continue
+            if file_extension_of(filename) not in EXIF_EXTENSIONS:
+                dates[filename] = file_stat.st_mtime
+                continue
+            identity = file_identity(file_stat)
+            found, taken = cache.lookup(identity)
+            if not found:
+                taken = read_exif_date(path.join(folder_path, filename))
+                new_entries.append((identity, taken))
+            dates[filename] = taken if taken is not None else file_stat.st_mtime
+        return dates, new_entries
+
+    chunks = [filenames[i:i + chunk_size] for i in range(0, len(filenames), chunk_size)]
+    if executor is not None:
+        results = list(executor.map(resolve_chunk, chunks))
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="metadata") as own_executor:
+            results = list(own_executor.map(resolve_chunk, chunks))
+    dates, new_entries = {}, []
+    for chunk_dates, chunk_entries in results:
+        dates.update(chunk_dates)
+        new_entries.extend(chunk_entries)
+    if new_entries:
+        cache.store_many(new_entries)
+    return dates
+
+def template_error(template):
+    """Why template (or a folder rendered from it) would leave its category folder, or None if it is fine."""
+    if not isinstance(template, str) or not template.strip():
+        return "must be a non-empty strftime pattern"
+    if template.startswith(('/', '\\')) or _DRIVE_PREFIX.match(template) or path.isabs(template):
+        return "must be a relative path"
+    if '..' in re.split(r'[\\/]', template):
+        return "must not contain '..'"
+    return None
+
+def render_destination(category, template, timestamp):
+    """The folder for a file of category dated timestamp, e.g. ('Images', '%Y/%m', ...) -> 'Images/2024/06'.
+
+    Raises ValueError if the rendered folder would not be inside the category folder.
+    """
+    rendered = strftime(template, localtime(timestamp))
+    error = template_error(rendered)
+    destination = path.normpath(path.join(category, rendered))
+    if error or not (destination + path.sep).startswith(path.normpath(category) + path.sep):
+        raise ValueError(f"Destination template '{template}' for '{category}' gives '{rendered}', outside the category folder")
+    return destination
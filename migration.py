@@ -0,0 +1,254 @@
+"""
+
+Re-sort on rule change: moves already-sorted files to match edited rules.
+
+plan_migration diffs the old and new rules per extension and only looks inside
+category folders whose extensions now go somewhere else. A category whose
+extensions all moved to one new, not yet existing folder is renamed as a whole
+(one rename instead of a move per file), provided everything in the folder is a
+file the old rules put there; otherwise its affected files are moved one by
+one. Only files the old rules would have put in that folder are touched.
+
+Categories with a destination template also hold dated subfolders
+(Images/2024/06/x.jpg); those are scanned too. Their files keep their dated
+subfolder when the new category uses the same template, and go to the top of
+the new category otherwise (its files are not re-dated).
+
+A migration holds the folder like a sort does: claimed in this process and,
+with root_lock enabled, locked against other processes.
+
+"""
+
+import os
+from os import path
+from time import monotonic, sleep
+
+from file_sorter import SortRules, SortProgress, claim_root, release_root, create_category_folders, move_file
+from root_lock import RootLock, POLL_SECONDS
+from sort_rules import file_extension_of
+
+def _category_key(category):
+    return path.normcase(path.normpath(category))
+
+def _is_nested(inner_key, outer_key):
+    return inner_key.startswith(outer_key + path.sep)
+
+class MigrationPlan:
+    """Folder renames and per-file moves that bring a sorted folder in line with new rules."""
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+        self.renames = [] # (old category, new category)
+        self.moves = []   # (old category, path inside it, new category, destination folder)
+        self.retired = [] # categories no longer in the rules; their folders are removed if left empty
+
+    @property
+    def total(self):
+        return len(self.renames) + len(self.moves)
+
+    def describe(self, max_examples=10):
+        """Report lines for the confirmation dialog."""
+        lines = [f"Re-sorting '{self.folder_path}' for the new rules:"]
+        for old_category, new_category in self.renames:
+            lines.append(f"  rename folder {old_category} -> {new_category}")
+        if self.moves:
+            counts = {}
+            for old_category, _, new_category, _ in self.moves:
+                counts[(old_category, new_category)] = counts.get((old_category, new_category), 0) + 1
+            for (old_category, new_category), files in sorted(counts.items(), key=lambda item: -item[1])[:max_examples]:
+                lines.append(f"  move {files} file(s) {old_category} -> {new_category}")
+            if len(counts) > max_examples:
+                lines.append(f"  ...and {len(counts) - max_examples} more folder pairs")
+        return lines
+
+def _scan_category(old_folder, ext_targets, bucket_template, skip_keys):
+    """Lists the files in old_folder whose extension ext_targets covers, by path inside it.
+
+    Dated subfolders are scanned when the category has a template (bucket_template),
+    except folders of other categories (normcased paths in skip_keys). Returns
+    (files, foreign): foreign is True if the folder holds anything else.
+    """
+    files, foreign = [], False
+    pending = ['']
+    while pending:
+        subfolder = pending.pop()
+        with os.scandir(path.join(old_folder, subfolder)) as entries:
+            for entry in entries:
+                relative = path.join(subfolder, entry.name)
+                try:
+                    is_file = entry.is_file(follow_symlinks=False)
+                    is_dir = not is_file and entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_file = is_dir = False
+                if is_file and file_extension_of(entry.name) in ext_targets:
+                    files.append(relative)
+                    continue
+                if is_dir and bucket_template and path.normcase(path.join(old_folder, relative)) not in skip_keys:
+                    pending.append(relative)
+                foreign = True
+    return files, foreign
+
+def plan_migration(folder_path, old_mapping, new_mapping, destination_templates=None):
+    """Builds the MigrationPlan for a change from old_mapping to new_mapping.
+
+    destination_templates (category -> strftime pattern) says which categories
+    hold dated subfolders that must be scanned as well.
+    """
+    templates = destination_templates or {}
+    old_rules = old_mapping if isinstance(old_mapping, SortRules) else SortRules(old_mapping)
+    new_rules = new_mapping if isinstance(new_mapping, SortRules) else SortRules(new_mapping)
+    plan = MigrationPlan(folder_path)
+
+    # Extension-level diff: old category -> {extension: new category or None}
+    changed = {}
+    for ext, old_category in old_rules.by_extension.items():
+        new_category = new_rules.by_extension.get(ext)
+        if new_category is None or _category_key(new_category) != _category_key(old_category):
+            changed.setdefault(old_category, {})[ext] = new_category
+    if not changed:
+        return plan
+
+    old_keys = {_category_key(category) for category in old_rules.mapping}
+    new_keys = {_category_key(category) for category in new_rules.mapping}
+    all_keys = old_keys | new_keys
+    plan.retired = [category for category in old_rules.mapping if _category_key(category) not in new_keys]
+
+    for old_category, ext_targets in changed.items():
+        old_folder = path.join(folder_path, old_category)
+        if not path.isdir(old_folder):
+            continue # nothing was ever sorted there
+        old_key = _category_key(old_category)
+        owned_extensions = [ext for ext, category in old_rules.by_extension.items() if category == old_category]
+        targets = set(ext_targets.values())
+        bucket_template = templates.get(old_category)
+        skip_keys = {path.normcase(path.join(folder_path, category)) for category in all_keys if _is_nested(category, old_key)}
+        try:
+            # foreign: something the old rules did not put here (other files, subfolders, dated buckets)
+            files, foreign = _scan_category(old_folder, ext_targets, bucket_template, skip_keys)
+        except OSError as e:
+            print(f"Could not read category folder '{old_folder}': {e}")
+            continue
+
+        # Whole-folder rename: every extension now goes to one new folder that nothing else uses,
+        # and the folder holds nothing but files the old rules put there
+        if not foreign and len(ext_targets) == len(owned_extensions) and len(targets) == 1 and None not in targets:
+            new_category = targets.pop()
+            new_key = _category_key(new_category)
+            new_folder = path.join(folder_path, new_category)
+            case_only = new_key == old_key
+            if (old_key not in new_keys or case_only) and (new_key not in old_keys or case_only) \
+                    and not any(_is_nested(key, old_key) or _is_nested(key, new_key) for key in all_keys) \
+                    and not _is_nested(new_key, old_key) and not _is_nested(old_key, new_key) \
+                    and (case_only or not path.lexists(new_folder)):
+                plan.renames.append((old_category, new_category))
+                continue
+
+        for relative in files:
+            new_category = ext_targets[file_extension_of(relative)]
+            if new_category is None:
+                continue # no longer matched by any rule, so left where it is
+            bucket = path.dirname(relative)
+            keep_bucket = bucket and bucket_template and templates.get(new_category) == bucket_template
+            plan.moves.append((old_category, relative, new_category,
+                               path.join(new_category, bucket) if keep_bucket else new_category))
+    return plan
+
+def _acquire_root(folder_path, lock, settings, cancel_event):
+    """Claims folder_path and takes its RootLock (if any), waiting like a sort when contention is 'wait'.
+
+    Returns None once held, or the reason it could not be.
+    """
+    deadline = monotonic() + float(settings.get('wait_seconds', 600))
+    while True:
+        if claim_root(folder_path):
+            if lock is None or lock.try_acquire():
+                return None
+            release_root(folder_path)
+            holder = lock.holder()
+            busy = f"'{folder_path}' is being sorted" + (f" by {holder}" if holder else "")
+        else:
+            busy = f"A sort of '{folder_path}' is running"
+        # merge and skip make no sense for an interactive migration: report it instead
+        if settings.get('contention', 'wait') != 'wait' or monotonic() >= deadline:
+            return f"{busy}. Try again when it has finished."
+        if cancel_event is not None:
+            if cancel_event.wait(POLL_SECONDS):
+                return "Cancelled while waiting for a running sort."
+        else:
+            sleep(POLL_SECONDS)
+
+def execute_migration(plan, progress_callback=None, cancel_event=None, root_lock=None):
+    """Carries out a MigrationPlan. Returns (SortProgress, [error messages]).
+
+    progress_callback(SortProgress) is throttled like a normal sort. The folder is
+    claimed for the duration, and locked across processes when root_lock (the
+    config section; the saved config's by default) is enabled, so no sort of the
+    same folder can run alongside.
+    """
+    if root_lock is None:
+        from config_manager import load_config
+        root_lock = load_config().get('root_lock', {})
+    progress = SortProgress(plan.folder_path, plan.total)
+    errors = []
+    lock = RootLock(plan.folder_path) if root_lock.get('enabled') else None
+    reason = _acquire_root(plan.folder_path, lock, root_lock, cancel_event)
+    if reason:
+        errors.append(reason)
+        progress.finished = True
+        return progress, errors
+    try:
+        for old_category, new_category in plan.renames:
+            if cancel_event is not None and cancel_event.is_set():
+                progress.cancelled = True
+                break
+            progress.done += 1
+            old_folder = path.join(plan.folder_path, old_category)
+            new_folder = path.join(plan.folder_path, new_category)
+            try:
+                parent = path.dirname(new_folder)
+                if parent:
+                    os.makedirs(parent, exist_ok=True)
+                os.rename(old_folder, new_folder)
+                progress.moved += 1
+                print(f"Renamed category folder '{old_folder}' to '{new_folder}'")
+            except OSError as e:
+                errors.append(f"Error renaming folder '{old_folder}' to '{new_folder}': {e}")
+            progress.report(progress_callback)
+
+        failed_destinations = create_category_folders(
+            plan.folder_path, {destination for _, _, _, destination in plan.moves})
+        for destination, e in failed_destinations.items():
+            errors.append(f"Error creating folder '{path.join(plan.folder_path, destination)}': {e}")
+
+        emptied = set() # dated subfolders files were moved out of
+        for old_category, relative, new_category, destination in plan.moves:
+            if progress.cancelled or (cancel_event is not None and cancel_event.is_set()):
+                progress.cancelled = True
+                break
+            progress.done += 1
+            if destination in failed_destinations:
+                continue
+            try:
+                move_file(path.join(plan.folder_path, old_category, relative),
+                          path.join(plan.folder_path, destination), path.basename(relative))
+                progress.moved += 1
+                bucket = path.dirname(relative)
+                while bucket:
+                    emptied.add(path.join(old_category, bucket))
+                    bucket = path.dirname(bucket)
+            except OSError as e:
+                errors.append(f"Error moving '{relative}' from '{old_category}' to '{new_category}': {e}")
+            progress.report(progress_callback)
+
+        # Drop emptied dated subfolders, then folders of retired categories once they are empty (deepest first)
+        for category in sorted(emptied, key=len, reverse=True) + sorted(plan.retired, key=len, reverse=True):
+            try:
+                os.rmdir(path.join(plan.folder_path, category))
+            except OSError:
+                pass
+    finally:
+        if lock is not None:
+            lock.release()
+        release_root(plan.folder_path)
+    progress.finished = True
+    progress.report(progress_callback, force=True)
+    return progress, errors
@@ -0,0 +1,205 @@
+import platform
+from os import environ
+from queue import Queue, Empty
+from shutil import which
+from subprocess import run
+from threading import Thread, Lock
+from time import monotonic
+
+# Seconds to wait for further completed runs before showing a single toast
+COALESCE_WINDOW = 5.0
+
+def format_size(num_bytes):
+    """Formats a byte count as a short human readable string (e.g. '1.4 MB')."""
+    size = float(num_bytes)
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+class RunSummary:
+    """Aggregated per-category file and byte counts for one or more sort runs of a folder."""
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+        self.runs = 1
+        self.cancelled = False # True if any merged run was stopped early
+        self.categories = {} # category name -> [files, bytes]
+
+    def add_file(self, category, size):
+        counts = self.categories.setdefault(category, [0, 0])
+        counts[0] += 1
+        counts[1] += size
+
+    def merge(self, other):
+        self.runs += other.runs
+        self.cancelled = self.cancelled or other.cancelled
+        for category, (files, size) in other.categories.items():
+            counts = self.categories.setdefault(category, [0, 0])
+            counts[0] += files
+            counts[1] += size
+
+    @property
+    def total_files(self):
+        return sum(files for files, _ in self.categories.values())
+
+    @property
+    def total_bytes(self):
+        return sum(size for _, size in self.categories.values())
+
+    def message(self, max_categories=4):
+        """Builds the toast body, listing the largest categories first."""
+        runs_note = f" over {self.runs} runs" if self.runs > 1 else ""
+        if self.cancelled:
+            runs_note += " (cancelled, partial)"
+        lines = [f'Sorted {self.total_files} files ({format_size(self.total_bytes)}){runs_note} in "{self.folder_path}"']
+        ranked = sorted(self.categories.items(), key=lambda item: item[1][0], reverse=True)
+        for category, (files, size) in ranked[:max_categories]:
+            lines.append(f"{category}: {files} ({format_size(size)})")
+        if len(ranked) > max_categories:
+            lines.append(f"+{len(ranked) - max_categories} more categories")
+        return "\n".join(lines)
+
+class NotificationBackend:
+    """Interface for notification backends. Subclasses implement show()."""
+    name = None
+
+    @classmethod
+    def available(cls):
+        """Returns True if the backend can be used on this machine."""
+        return True
+
+    def show(self, folder_path, title, message):
+        raise NotImplementedError
+
+class ToastBackend(NotificationBackend):
+    """Windows toast notifications through win11toast (imported on first use)."""
+    name = 'toast'
+
+    @classmethod
+    def available(cls):
+        if platform.system() != "Windows":
+            return False
+        try:
+            import win11toast # noqa: F401
+        except Exception: # ImportError, or broken WinRT bindings
+            return False
+        return True
+
+    def show(self, folder_path, title, message):
+        from win11toast import toast
+        buttons = [
+            {'activationType': 'protocol', 'arguments': f'file:///{folder_path}', 'content': 'Open Folder'}
+        ]
+        toast(title, message, buttons=buttons, audio={'silent': 'true'}, duration='short')
+
+class DBusBackend(NotificationBackend):
+    """freedesktop.org notifications over the D-Bus session bus, via the gdbus CLI."""
+    name = 'dbus'
+
+    @classmethod
+    def available(cls):
+        return bool(environ.get('DBUS_SESSION_BUS_ADDRESS')) and which('gdbus') is not None
+
+    def show(self, folder_path, title, message):
+        # Notify(app_name, replaces_id, app_icon, summary, body, actions, hints, expire_timeout)
+        run([
+            'gdbus', 'call', '--session',
+            '--dest', 'org.freedesktop.Notifications',
+            '--object-path', '/org/freedesktop/Notifications',
+            '--method', 'org.freedesktop.Notifications.Notify',
+            'Folder Sorter', '0', 'folder', title, message, '[]', '{}', '5000'
+        ], check=True, capture_output=True, timeout=5)
+
+class LogBackend(NotificationBackend):
+    """Prints notifications to stdout; used on headless machines."""
+    name = 'log'
+
+    def show(self, folder_path, title, message):
+        print(f"[{title}] {message}")
+
+class MemoryBackend(NotificationBackend):
+    """Records notifications in memory instead of showing them (for tests and embedding)."""
+    name = 'memory'
+
+    def __init__(self):
+        self.shown = [] # list of (folder_path, title, message)
+
+    def show(self, folder_path, title, message):
+        self.shown.append((folder_path, title, message))
+
+BACKENDS = {backend.name: backend for backend in (ToastBackend, DBusBackend, LogBackend, MemoryBackend)}
+AUTO_ORDER = ('toast', 'dbus', 'log')
+
+def select_backend(name='auto'):
+    """Instantiates the named backend, or the first available one for 'auto'.
+
+    Falls back to LogBackend if the requested backend is unknown or unavailable,
+    so a missing notification library never stops a sort.
+    """
+    if name and name != 'auto':
+        backend_class = BACKENDS.get(name)
+        if backend_class and backend_class.available():
+            return backend_class()
+        print(f"Notification backend '{name}' is unavailable, falling back to log output.")
+        return LogBackend()
+    for candidate in AUTO_ORDER:
+        if BACKENDS[candidate].available():
+            return BACKENDS[candidate]()
+    return LogBackend()
+
+class NotificationDispatcher:
+    """Single long-lived worker that coalesces completed runs into one notification per folder.
+
+    Runs submitted within `window` seconds of the first pending one are merged, so a
+    burst of scheduled or watched sorts produces one toast instead of one per run.
+    """
+    def __init__(self, window=COALESCE_WINDOW, backend=None, backend_name='auto', before_show=None):
+        self.window = window
+        self.backend = backend # resolved lazily from backend_name on first delivery
+        self.backend_name = backend_name
+        self.before_show = before_show # optional hook called on the worker before each toast
+        self._queue = Queue()
+        self._thread = None
+        self._lock = Lock()
+
+    def submit(self, summary):
+        """Queues a RunSummary for display, starting the worker on first use."""
+        self._ensure_worker()
+        self._queue.put(summary)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name="NotificationDispatcher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            pending = {first.folder_path: first}
+            deadline = monotonic() + self.window
+            while True:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    summary = self._queue.get(timeout=remaining)
+                except Empty:
+                    break
+                if summary.folder_path in pending:
+                    pending[summary.folder_path].merge(summary)
+                else:
+                    pending[summary.folder_path] = summary
+            for summary in pending.values():
+                self._deliver(summary)
+
+    def _deliver(self, summary):
+        if self.backend is None:
+            self.backend = select_backend(self.backend_name)
+        try:
+            if self.before_show:
+                self.before_show(summary)
+            self.backend.show(summary.folder_path, 'Folder Sorted', summary.message())
+        except Exception as e:
+            print(f"Error showing notification for '{summary.folder_path}': {e}")
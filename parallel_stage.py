@@ -0,0 +1,138 @@
+"""
+
+Optional process-pool stage for the CPU-bound part of a sort.
+
+The folder is listed once in the calling process, a chunk of names at a time,
+and each chunk is sent to a worker process as soon as it is read, which
+classifies it against the rules. Only names go out and only (name, category)
+tuples come back, straight into the CompactPlan; the full name list is never
+built, and only a few chunks per worker are in flight at once. The rules are
+sent once per worker through the pool initializer. Moving files stays in the calling process,
+which is the I/O stage.
+
+Classifying by extension is cheap, so the pool only pays off on very large
+folders. benchmark.py measures where it starts to help. A sort therefore
+classifies in its own process on a single CPU, and only hands chunks to a pool
+once PARALLEL_MIN_NAMES names have been classified in-process without reaching
+the end of the folder. The pool is off unless classify_workers is set.
+
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from os import scandir
+
+from sort_rules import SortRules
+from compact_plan import CompactPlan
+
+DEFAULT_CHUNK_SIZE = 2000 # names per task; large enough to amortize pickling and scheduling
+PARALLEL_MIN_NAMES = 100000 # below this, in-process classification (~2M names/s) beats starting a pool
+CHUNKS_PER_WORKER = 2 # chunks queued per worker process, so names are read only as fast as they are classified
+
+def default_workers():
+    return max(1, (os.cpu_count() or 1) - 1) # leave a core for the GUI and the I/O stage
+
+def iter_name_chunks(folder_path, chunk_size=DEFAULT_CHUNK_SIZE, on_error=None):
+    """Yields the regular files directly in folder_path in lists of up to chunk_size names (one scandir pass)."""
+    names = []
+    with scandir(folder_path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    names.append(entry.name)
+            except OSError as e:
+                if on_error:
+                    on_error(entry.name, e)
+                continue
+            if len(names) >= chunk_size:
+                yield names
+                names = []
+    if names:
+        yield names
+
+def scan_file_names(folder_path, on_error=None):
+    """Lists the regular files directly in folder_path (one scandir pass)."""
+    return [name for chunk in iter_name_chunks(folder_path, on_error=on_error) for name in chunk]
+
+# region worker side
+_worker_rules = None
+
+def _init_worker(folder_extensions_mapping):
+    global _worker_rules
+    _worker_rules = SortRules(folder_extensions_mapping)
+
+def _classify_chunk(names):
+    category_for = _worker_rules.category_for
+    results = []
+    for name in names:
+        category = category_for(name)
+        if category is not None:
+            results.append((name, category))
+    return results
+# endregion
+
+def _chunks(items, chunk_size):
+    for start in range(0, len(items), chunk_size):
+        yield items[start:start + chunk_size]
+
+def _classify_in_process(names, rules):
+    category_for = rules.category_for
+    return [(name, category) for name in names if (category := category_for(name)) is not None]
+
+def _classified_chunks(name_chunks, rules, workers):
+    """Classifies an iterable of name chunks, yielding one result list per chunk in order.
+
+    Unlike executor.map, which submits every chunk up front, at most
+    CHUNKS_PER_WORKER chunks per worker are pending, so name_chunks is consumed
+    as results come back.
+    """
+    if workers == 0:
+        for names in name_chunks:
+            yield _classify_in_process(names, rules)
+        return
+    workers = workers or default_workers()
+    mapping = {folder: list(exts) for folder, exts in rules.mapping.items()}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(mapping,)) as executor:
+        pending = deque()
+        for names in name_chunks:
+            pending.append(executor.submit(_classify_chunk, names))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def classify_names(names, rules, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Returns [(name, category)] for the matching names, in input order.
+
+    workers=0 classifies in this process; otherwise names are sharded over a
+    pool of `workers` processes (default: one per core but one).
+    """
+    planned = []
+    for chunk_result in _classified_chunks(_chunks(names, chunk_size), rules, workers):
+        planned.extend(chunk_result)
+    return planned
+
+def plan_moves_parallel(folder_path, rules, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, on_error=None):
+    """Same result as file_sorter.plan_moves (a CompactPlan), with classification sharded over a process pool.
+
+    Names are classified as they are read. The first PARALLEL_MIN_NAMES are
+    classified in this process, so small folders never start a pool; single-CPU
+    machines classify everything here.
+    """
+    name_chunks = iter_name_chunks(folder_path, chunk_size, on_error)
+    planned = CompactPlan()
+    classified = 0
+    for names in name_chunks:
+        planned.extend(_classify_in_process(names, rules))
+        classified += len(names)
+        if classified >= PARALLEL_MIN_NAMES and workers != 0 and (os.cpu_count() or 1) >= 2:
+            following = next(name_chunks, None)
+            if following is None:
+                break # the folder ended right here; no pool needed
+            # Hand the rest to the pool; results are taken in order
+            for chunk_result in _classified_chunks(chain([following], name_chunks), rules, workers):
+                planned.extend(chunk_result)
+            break
+    return planned
@@ -0,0 +1,167 @@
+"""
+
+Advisory lock on a sorted root, shared by every process and machine that sorts it.
+
+The lock is a byte-range lock on a hidden file in the root. POSIX systems use
+fcntl.lockf, Windows uses msvcrt.locking. Unlike flock(), lockf() locks are
+forwarded to the server on NFS (NLM for v3, built in for v4), so two machines
+sorting the same export exclude each other. The operating system drops the
+lock when its holder exits or crashes, so a stale lock file is harmless.
+
+A sort that finds the root busy can wait for it, skip the run, or merge into
+the running sort. To merge, it leaves a re-run marker next to the lock, and
+the holder sorts the root once more before it lets go.
+
+lockf() locks belong to a process, not a thread, so within one process
+file_sorter.claim_root still keeps two sorts of a root apart. Closing any
+descriptor of the lock file also drops the process's lock, so a process only
+ever has the one descriptor of the RootLock that holds it: other RootLocks of
+the same root read the holder line through it and never open the file.
+
+"""
+
+import errno
+import os
+import platform
+import socket
+import sys
+from os import path
+from threading import Lock
+from time import time
+
+LOCK_FILE_NAME = '.folder_sorter.lock'
+RERUN_FILE_NAME = '.folder_sorter.rerun'
+CONTENTION_POLICIES = ('wait', 'skip', 'merge')
+POLL_SECONDS = 0.5 # how often a waiting sort retries the lock
+
+# errno values meaning "someone else holds it", as opposed to "locking is not supported here"
+_BUSY_ERRNOS = {errno.EACCES, errno.EAGAIN, errno.EDEADLK}
+
+_held = {} # normcased lock path -> RootLock holding it in this process
+_held_lock = Lock()
+
+def _hide_on_windows(file_path):
+    if platform.system() == "Windows":
+        import ctypes
+        FILE_ATTRIBUTE_HIDDEN = 0x2
+        ctypes.windll.kernel32.SetFileAttributesW(file_path, FILE_ATTRIBUTE_HIDDEN)
+
+class RootLock:
+    """The cross-process lock of one root folder. See the module docstring."""
+    def __init__(self, root):
+        self.root = root
+        self.lock_path = path.join(root, LOCK_FILE_NAME)
+        self._key = path.normcase(path.abspath(self.lock_path))
+        self.rerun_path = path.join(root, RERUN_FILE_NAME)
+        self._handle = None
+        self.unsupported = False # set when the file system cannot lock; sorts then run unlocked
+
+    @property
+    def held(self):
+        return self._handle is not None or self.unsupported
+
+    def try_acquire(self):
+        """Takes the lock without waiting. Returns False if another process (or RootLock of this process) holds it."""
+        if self.held:
+            return True
+        with _held_lock:
+            if self._key in _held:
+                return False # held by another RootLock of this process; a second descriptor would drop it on close
+            return self._acquire()
+
+    def _acquire(self):
+        try:
+            created = not path.exists(self.lock_path)
+            handle = open(self.lock_path, 'a+')
+        except OSError as e:
+            print(f"Could not open the lock file in '{self.root}': {e}. Sorting without a cross-process lock.")
+            self.unsupported = True
+            return True
+        try:
+            if sys.platform == 'win32':
+                import msvcrt
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.lockf(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError as e:
+            handle.close()
+            if sys.platform == 'win32' or e.errno in _BUSY_ERRNOS:
+                return False
+            print(f"File locking is not supported in '{self.root}' ({e}). Sorting without a cross-process lock.")
+            self.unsupported = True
+            return True
+        if created:
+            _hide_on_windows(self.lock_path)
+        self._handle = handle
+        _held[self._key] = self
+        self._write_holder()
+        return True
+
+    def _write_holder(self):
+        """Records who holds the lock, for the message other sorts print while they wait."""
+        try:
+            self._handle.seek(0)
+            self._handle.truncate()
+            self._handle.write(f"{socket.gethostname()} pid {os.getpid()} since {time():.0f}\n")
+            self._handle.flush()
+        except OSError:
+            pass # informational only
+
+    def holder(self):
+        """Who holds the lock, as written by the holder, or '' if unknown."""
+        with _held_lock:
+            owner = _held.get(self._key)
+            if owner is not None:
+                # Held in this process: read through its descriptor, as closing another one would drop the lock
+                try:
+                    return os.pread(owner._handle.fileno(), 4096, 0).decode('utf-8', 'replace').partition('\n')[0].strip()
+                except (OSError, AttributeError):
+                    return '' # no pread on Windows
+            try:
+                with open(self.lock_path, 'r') as f:
+                    return f.readline().strip()
+            except OSError:
+                return '' # Windows cannot read a locked range
+
+    def release(self):
+        with _held_lock:
+            handle, self._handle = self._handle, None
+            self.unsupported = False
+            if handle is None:
+                return
+            _held.pop(self._key, None)
+            self._release(handle)
+
+    def _release(self, handle):
+        try:
+            if sys.platform == 'win32':
+                import msvcrt
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.lockf(handle.fileno(), fcntl.LOCK_UN)
+        except OSError:
+            pass # closing the file drops the lock anyway
+        handle.close()
+
+    def request_rerun(self):
+        """Asks the current holder to sort the root again before releasing it ('merge')."""
+        try:
+            with open(self.rerun_path, 'a'):
+                pass
+        except OSError as e:
+            print(f"Could not leave a re-run request in '{self.root}': {e}")
+            return False
+        _hide_on_windows(self.rerun_path)
+        return True
+
+    def take_rerun_request(self):
+        """Consumes a pending re-run request. Returns True if there was one."""
+        try:
+            os.remove(self.rerun_path)
+        except OSError:
+            return False
+        return True
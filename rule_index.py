@@ -0,0 +1,191 @@
+from bisect import bisect_right
+from re import compile
+
+from config_manager import reserved_names
+
+# Compiled once; validate_rule runs on every save
+INVALID_FOLDER_CHARS = compile(r'[\\:*?"<>|]')
+INVALID_EXTENSION_CHARS = compile(r'[\\/:*?"<>|]')
+
+def normalize_extensions(extensions):
+    """Strips, drops leading dots, lowercases and de-duplicates extensions, keeping first-seen order."""
+    raw_extensions_list = [ext.strip().lstrip('.').lower() for ext in extensions if ext.strip()]
+    seen_extensions = set()
+    ordered_unique_extensions = []
+    for ext in raw_extensions_list:
+        if ext not in seen_extensions:
+            ordered_unique_extensions.append(ext)
+            seen_extensions.add(ext)
+    return ordered_unique_extensions
+
+class RuleIndex:
+    """Lookup tables over folder_extensions_mapping used for validation.
+
+    folders maps lowercased folder name -> folder name and extension_owners maps
+    lowercased extension -> folder names using it, so a conflict check costs O(1)
+    per name instead of a scan over every rule. Callers that edit the mapping keep
+    the index current with add/remove/replace_category.
+    """
+    def __init__(self, folder_extensions_mapping):
+        self.categories = {}       # folder name -> tuple of extensions as indexed
+        self.folders = {}          # lowercased folder name -> folder name
+        self.extension_owners = {} # lowercased extension -> [folder names]
+        for folder_name, extensions in folder_extensions_mapping.items():
+            self.add_category(folder_name, extensions)
+
+    def add_category(self, folder_name, extensions):
+        if folder_name in self.categories:
+            self.remove_category(folder_name)
+        extensions = tuple(ext.lower() for ext in extensions)
+        self.categories[folder_name] = extensions
+        self.folders[folder_name.lower()] = folder_name
+        for ext in extensions:
+            owners = self.extension_owners.setdefault(ext, [])
+            if folder_name not in owners:
+                owners.append(folder_name)
+
+    def remove_category(self, folder_name):
+        extensions = self.categories.pop(folder_name, None)
+        if extensions is None:
+            return
+        if self.folders.get(folder_name.lower()) == folder_name:
+            del self.folders[folder_name.lower()]
+        for ext in extensions:
+            owners = self.extension_owners.get(ext)
+            if owners and folder_name in owners:
+                owners.remove(folder_name)
+                if not owners:
+                    del self.extension_owners[ext]
+
+    def replace_category(self, old_folder_name, new_folder_name, extensions):
+        self.remove_category(old_folder_name)
+        self.add_category(new_folder_name, extensions)
+
+    def folder_owner(self, folder_name):
+        """Returns the existing folder name equal to folder_name ignoring case, or None."""
+        return self.folders.get(folder_name.lower())
+
+    def extension_owner(self, ext, excluding=None):
+        """Returns a folder using ext other than `excluding` (compared case-insensitively), or None."""
+        excluding_lower = excluding.lower() if excluding is not None else None
+        for owner in self.extension_owners.get(ext.lower(), ()):
+            if owner.lower() != excluding_lower:
+                return owner
+        return None
+
+# Shared index for the live config mapping, rebuilt when the mapping object is replaced
+_index = None
+_index_source = None
+
+def get_rule_index(folder_extensions_mapping):
+    """Returns the maintained RuleIndex for folder_extensions_mapping, building it on first use."""
+    global _index, _index_source
+    if (_index is None or _index_source is not folder_extensions_mapping
+            or len(_index.categories) != len(folder_extensions_mapping)):
+        _index = RuleIndex(folder_extensions_mapping)
+        _index_source = folder_extensions_mapping
+    return _index
+
+def rule_errors(index, folder_name, extensions, original_folder=None):
+    """Every problem with a folder name and its extensions against a RuleIndex, as messages (empty if valid).
+
+    Cost depends only on the size of the input.
+    """
+    errors = []
+    folder_name_stripped = folder_name.strip()
+    if not folder_name_stripped:
+        errors.append("Folder name cannot be empty.")
+    else:
+        if INVALID_FOLDER_CHARS.search(folder_name_stripped):
+            errors.append(f"Folder name '{folder_name_stripped}' contains invalid characters (e.g., \\:*?\"<>|).")
+        if folder_name_stripped.upper() in reserved_names:
+            errors.append(f"Folder name '{folder_name_stripped}' is a reserved name.")
+        if '//' in folder_name_stripped or '\\\\' in folder_name_stripped:
+            errors.append(f"Folder name '{folder_name_stripped}' contains multiple consecutive slashes or backslashes.")
+        if folder_name_stripped.strip('/') == '': # Catches names like "/" or "///"
+            errors.append("Folder name cannot be just slashes.")
+        elif folder_name_stripped.startswith('/') or folder_name_stripped.endswith('/'):
+            errors.append("Folder name cannot start or end with a slash.")
+        if folder_name_stripped.startswith('\\') or folder_name_stripped.endswith('\\'):
+            errors.append("Folder name cannot start or end with a backslash.")
+
+        if folder_name_stripped == "." or folder_name_stripped == "..":
+            errors.append(f"Folder name cannot be '{folder_name_stripped}' as it's a special directory reference.")
+
+        existing_folder = index.folder_owner(folder_name_stripped)
+        if existing_folder is not None:
+            if original_folder is None: # Adding a new category
+                errors.append(f"Folder name '{folder_name_stripped}' already exists in the configuration.")
+            elif existing_folder.lower() != original_folder.lower(): # Editing an existing category
+                errors.append(f"Folder name '{folder_name_stripped}' already exists (used by category '{existing_folder}').")
+
+    # --- Extension validation ---
+    any_extension = False
+    for ext_input in extensions:
+        ext_stripped = ext_input.strip().lstrip('.')
+        if not ext_stripped: continue
+        any_extension = True
+
+        if INVALID_EXTENSION_CHARS.search(ext_stripped):
+            errors.append(f"Extension '{ext_stripped}' contains invalid characters (e.g., \\/:*?\"<>|).")
+            continue
+        if ext_stripped.upper() in reserved_names:
+            errors.append(f"Extension '{ext_stripped}' is a reserved name.")
+            continue
+
+        owner = index.extension_owner(ext_stripped, excluding=original_folder)
+        if owner is not None:
+            errors.append(f"Extension '{ext_stripped}' is already assigned to folder '{owner}'.")
+
+    if not any_extension:
+        errors.append("At least one valid extension is required.")
+
+    return errors
+
+def validate_rule(index, folder_name, extensions, original_folder=None):
+    """Validate a folder name and its extensions against a RuleIndex.
+
+    Returns (is_valid, error_message) with the first problem rule_errors finds.
+    """
+    errors = rule_errors(index, folder_name, extensions, original_folder=original_folder)
+    if errors:
+        return False, errors[0]
+    return True, "" # Validation passed
+
+class SearchIndex:
+    """Substring index over folder names and extensions for the config search box.
+
+    Every category becomes one line of a single lowercase corpus string,
+    'folder<TAB>.ext1 .ext2', and a query is a few str.find calls over it with a
+    bisect to map hits back to categories. Extensions carry a leading '.', so a
+    query like '.hei' matches extensions by prefix while 'hei' matches anywhere.
+    """
+    def __init__(self, folder_extensions_mapping):
+        self.folders = sorted(folder_extensions_mapping, key=str.lower)
+        lines = []
+        self.line_starts = []
+        offset = 0
+        for folder_name in self.folders:
+            extensions = ' '.join('.' + ext.lower().lstrip('.') for ext in folder_extensions_mapping[folder_name])
+            line = f"{folder_name.lower()}\t{extensions}\n"
+            self.line_starts.append(offset)
+            lines.append(line)
+            offset += len(line)
+        self.corpus = ''.join(lines)
+
+    def search(self, query):
+        """Returns the folder names matching query, in case-insensitive name order."""
+        query = query.strip().lower()
+        if not query:
+            return list(self.folders)
+        if '\t' in query or '\n' in query:
+            return []
+        matches = []
+        position = self.corpus.find(query)
+        while position != -1:
+            line = bisect_right(self.line_starts, position) - 1
+            matches.append(self.folders[line])
+            if line + 1 >= len(self.line_starts):
+                break
+            position = self.corpus.find(query, self.line_starts[line + 1]) # skip rest of this line
+        return matches
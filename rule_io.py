@@ -0,0 +1,211 @@
+"""
+
+Bulk import/export of folder_extensions_mapping rules as JSON, CSV or YAML.
+
+An import is validated as a whole (against the current rules and against the
+rest of the file), every conflict is reported together, and the result is
+written with a single atomic save_config call - or not at all.
+
+CLI:
+    python rule_io.py export rules.csv
+    python rule_io.py import rules.yaml [--replace] [--dry-run]
+
+File formats:
+    JSON  {"Images": ["png", "jpg"], ...}
+    YAML  the same mapping as YAML (needs PyYAML)
+    CSV   header "folder,extensions", one row per folder, extensions comma separated
+          in the quoted second column; repeated folder rows are merged
+
+"""
+
+import csv
+import json
+import sys
+from argparse import ArgumentParser
+from os import path
+
+from config_manager import load_config, save_config
+from rule_index import RuleIndex, normalize_extensions, rule_errors
+
+FORMATS = ('json', 'csv', 'yaml')
+
+def detect_format(file_path, fmt=None):
+    """Returns the rule file format from fmt or the file extension."""
+    if fmt:
+        fmt = fmt.lower()
+    else:
+        fmt = path.splitext(file_path)[1].lstrip('.').lower()
+        fmt = 'yaml' if fmt == 'yml' else fmt
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported rule file format '{fmt}'. Use one of: {', '.join(FORMATS)}.")
+    return fmt
+
+def _import_yaml():
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("YAML rule files need PyYAML (pip install pyyaml).")
+    return yaml
+
+def _entries_from_mapping(data, source):
+    if not isinstance(data, dict):
+        raise ValueError(f"{source}: expected a mapping of folder names to extension lists.")
+    entries = []
+    for folder_name, extensions in data.items():
+        if isinstance(extensions, str):
+            extensions = extensions.split(',')
+        if not isinstance(extensions, list):
+            raise ValueError(f"{source}: extensions for '{folder_name}' must be a list or a comma separated string.")
+        entries.append((str(folder_name), normalize_extensions(str(ext) for ext in extensions)))
+    return entries
+
+def read_rules(file_path, fmt=None):
+    """Reads a rule file into a list of (folder name, [extensions]) entries, in file order.
+
+    Extensions come back normalized (see rule_index.normalize_extensions).
+    """
+    fmt = detect_format(file_path, fmt)
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        if fmt == 'json':
+            return _entries_from_mapping(json.load(f), file_path)
+        if fmt == 'yaml':
+            return _entries_from_mapping(_import_yaml().safe_load(f) or {}, file_path)
+        entries = []
+        positions = {} # folder -> index in entries, to merge repeated rows
+        for row in csv.DictReader(f):
+            folder_name = (row.get('folder') or '').strip()
+            extensions = (row.get('extensions') or '').split(',')
+            if folder_name in positions:
+                entries[positions[folder_name]][1].extend(extensions)
+            else:
+                positions[folder_name] = len(entries)
+                entries.append((folder_name, extensions))
+        return [(folder_name, normalize_extensions(extensions)) for folder_name, extensions in entries]
+
+def write_rules(mapping, file_path, fmt=None):
+    """Writes a folder_extensions_mapping to file_path in the given (or detected) format."""
+    fmt = detect_format(file_path, fmt)
+    with open(file_path, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'json':
+            json.dump(mapping, f, indent=4)
+        elif fmt == 'yaml':
+            _import_yaml().safe_dump(dict(mapping), f, sort_keys=False, allow_unicode=True)
+        else:
+            writer = csv.writer(f)
+            writer.writerow(['folder', 'extensions'])
+            for folder_name, extensions in mapping.items():
+                writer.writerow([folder_name, ', '.join(extensions)])
+
+def build_rule_set(entries, base_mapping=None):
+    """Validates entries and returns (new mapping, errors).
+
+    Entries are applied on top of base_mapping (merge) or onto an empty rule set
+    when base_mapping is None (replace). An entry whose folder already exists
+    (ignoring case) replaces that category's extensions. Extension ownership is
+    checked once against the merged mapping, so the result does not depend on
+    the order of the entries. Every problem is collected instead of stopping at
+    the first one.
+    """
+    mapping = dict(base_mapping or {})
+    folders = {folder_name.lower(): folder_name for folder_name in mapping}
+    empty_index = RuleIndex({}) # names and extension syntax only; ownership is checked below
+    problems = {} # entry number -> messages
+    accepted = {} # folder name -> entry number
+    seen_in_file = {} # lowercased folder -> entry number, to catch duplicates within the file
+
+    for number, (folder_name, extensions) in enumerate(entries, start=1):
+        folder_name = folder_name.strip()
+        if folder_name.lower() in seen_in_file:
+            problems[number] = [f"duplicate of entry {seen_in_file[folder_name.lower()]}."]
+            continue
+        seen_in_file[folder_name.lower()] = number
+
+        ordered_unique_extensions = normalize_extensions(extensions)
+        entry_problems = rule_errors(empty_index, folder_name, ordered_unique_extensions)
+        if entry_problems:
+            problems[number] = entry_problems
+            continue
+
+        existing_folder = folders.get(folder_name.lower())
+        if existing_folder is not None:
+            mapping.pop(existing_folder, None)
+        folders[folder_name.lower()] = folder_name
+        mapping[folder_name] = ordered_unique_extensions
+        accepted[folder_name] = number
+
+    index = RuleIndex(mapping)
+    for folder_name, number in accepted.items():
+        for ext in mapping[folder_name]:
+            owner = index.extension_owner(ext, excluding=folder_name)
+            if owner is not None:
+                problems.setdefault(number, []).append(f"Extension '{ext}' is already assigned to folder '{owner}'.")
+
+    errors = []
+    names = [folder_name.strip() for folder_name, _ in entries]
+    for number in sorted(problems):
+        errors.extend(f"Entry {number} ('{names[number - 1]}'): {problem}" for problem in problems[number])
+    return mapping, errors
+
+def import_rules(file_path, fmt=None, replace=False, dry_run=False):
+    """Imports a rule file into the config.
+
+    Returns (imported mapping or None, errors). Nothing is written unless the whole
+    file validates; on success the config is saved once, atomically.
+    """
+    try:
+        entries = read_rules(file_path, fmt)
+    except (OSError, ValueError, csv.Error) as e:
+        return None, [f"Could not read '{file_path}': {e}"]
+    except Exception as e: # JSON/YAML parser errors
+        return None, [f"Could not parse '{file_path}': {e}"]
+
+    current_config = load_config()
+    base_mapping = None if replace else current_config.get('folder_extensions_mapping', {})
+    mapping, errors = build_rule_set(entries, base_mapping)
+    if errors:
+        return None, errors
+    if not dry_run and not save_config(folder_extensions_mapping=mapping):
+        return None, ["Could not write config.json."]
+    return mapping, []
+
+def export_rules(file_path, fmt=None):
+    """Exports the current rules. Returns an error message or None."""
+    try:
+        write_rules(load_config().get('folder_extensions_mapping', {}), file_path, fmt)
+    except (OSError, ValueError) as e:
+        return f"Could not export rules to '{file_path}': {e}"
+    return None
+
+def main(argv=None):
+    parser = ArgumentParser(description="Import or export Folder Sorter rules.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help="write the current rules to a file")
+    export_parser.add_argument('file')
+    export_parser.add_argument('--format', choices=FORMATS)
+    import_parser = subparsers.add_parser('import', help="validate and load rules from a file")
+    import_parser.add_argument('file')
+    import_parser.add_argument('--format', choices=FORMATS)
+    import_parser.add_argument('--replace', action='store_true', help="replace all rules instead of merging")
+    import_parser.add_argument('--dry-run', action='store_true', help="validate only, do not save")
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        error = export_rules(args.file, args.format)
+        if error:
+            print(error, file=sys.stderr)
+            return 1
+        print(f"Exported rules to '{args.file}'.")
+        return 0
+
+    mapping, errors = import_rules(args.file, args.format, replace=args.replace, dry_run=args.dry_run)
+    if errors:
+        print(f"Import failed with {len(errors)} problem(s); nothing was saved:", file=sys.stderr)
+        for error in errors:
+            print(f"  {error}", file=sys.stderr)
+        return 1
+    action = "Validated" if args.dry_run else "Imported"
+    print(f"{action} {len(mapping)} categories from '{args.file}'.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
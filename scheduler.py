@@ -0,0 +1,261 @@
+"""
+
+Scheduled and idle-time sorting for the tray process.
+
+Reads the 'schedule' section of config.json on every wake-up, so edits take
+effect without restarting. Runs fire every `interval_minutes` or on a 5-field
+`cron` expression, plus a random jitter, and can be deferred while the machine
+is busy (`only_when_idle`).
+
+"""
+
+import ctypes
+import os
+import platform
+from datetime import datetime, timedelta
+from os import listdir, path
+from random import uniform
+from threading import Thread, Event
+from time import monotonic, sleep
+
+from config_manager import load_config
+
+# region cron
+class CronExpression:
+    """Minimal 5-field cron expression: minute hour day-of-month month day-of-week.
+
+    Supports '*', lists ('1,15'), ranges ('9-17') and steps ('*/15', '0-30/10').
+    Day-of-week uses 0-6 with 0 (or 7) = Sunday. As in cron, when both day fields
+    are restricted a time matches if either one does.
+    """
+    FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' must have 5 fields.")
+        self.expression = expression
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {0 if day == 7 else day for day in weekdays}
+        self.days_restricted = fields[2] != '*'
+        self.weekdays_restricted = fields[4] != '*'
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_str = part.split('/', 1)
+                step = int(step_str)
+                if step < 1:
+                    raise ValueError(f"Invalid cron step in '{field}'.")
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start_str, end_str = part.split('-', 1)
+                start, end = int(start_str), int(end_str)
+            else:
+                start = end = int(part)
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field '{field}' is out of range {low}-{high}.")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays # Python Monday=0 -> cron Sunday=0
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment):
+        """Returns the first matching minute strictly after moment (a naive datetime)."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months or not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"Cron expression '{self.expression}' never matches.")
+# endregion
+
+
+# region idle detection
+def _read_proc_stat():
+    with open('/proc/stat') as f:
+        values = [int(v) for v in f.readline().split()[1:]]
+    idle = values[3] + (values[4] if len(values) > 4 else 0) # idle + iowait
+    return idle, sum(values)
+
+def _read_windows_times():
+    idle, kernel, user = (ctypes.c_ulonglong(), ctypes.c_ulonglong(), ctypes.c_ulonglong())
+    ctypes.windll.kernel32.GetSystemTimes(ctypes.byref(idle), ctypes.byref(kernel), ctypes.byref(user))
+    return idle.value, kernel.value + user.value # kernel time includes idle time
+
+def cpu_percent(sample_seconds=0.5):
+    """Returns system-wide CPU use in percent, sampled over sample_seconds."""
+    if path.exists('/proc/stat'):
+        reader = _read_proc_stat
+    elif platform.system() == "Windows":
+        reader = _read_windows_times
+    else:
+        try:
+            return 100.0 * os.getloadavg()[0] / (os.cpu_count() or 1)
+        except (OSError, AttributeError):
+            return 0.0
+    idle_before, total_before = reader()
+    sleep(sample_seconds)
+    idle_after, total_after = reader()
+    total = total_after - total_before
+    if total <= 0:
+        return 0.0
+    return 100.0 * (1 - (idle_after - idle_before) / total)
+
+def _read_disk_sectors():
+    """Total sectors read+written on whole block devices (Linux /proc/diskstats)."""
+    devices = {name for name in listdir('/sys/block') if not name.startswith(('loop', 'ram'))}
+    sectors = 0
+    with open('/proc/diskstats') as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) > 9 and fields[2] in devices:
+                sectors += int(fields[5]) + int(fields[9])
+    return sectors
+
+def disk_mb_per_second(sample_seconds=0.5):
+    """Returns disk throughput in MB/s, or 0.0 where it cannot be measured."""
+    if not (path.exists('/proc/diskstats') and path.isdir('/sys/block')):
+        return 0.0
+    before = _read_disk_sectors()
+    sleep(sample_seconds)
+    after = _read_disk_sectors()
+    return (after - before) * 512 / (1024 * 1024) / sample_seconds
+
+def machine_is_idle(schedule):
+    """Checks CPU and disk load against the thresholds in the schedule config."""
+    try:
+        cpu = cpu_percent()
+        disk = disk_mb_per_second()
+    except Exception as e:
+        print(f"Scheduler: could not measure load ({e}), treating machine as idle.")
+        return True
+    if cpu > schedule.get('max_cpu_percent', 50):
+        print(f"Scheduler: CPU at {cpu:.0f}%, deferring sort.")
+        return False
+    if disk > schedule.get('max_disk_mb_per_s', 20):
+        print(f"Scheduler: disk at {disk:.1f} MB/s, deferring sort.")
+        return False
+    return True
+# endregion
+
+
+# region scheduler
+class SortScheduler:
+    """Background thread that triggers run_callback according to the schedule config.
+
+    run_callback must return quickly (the tray passes run_sort_files, which starts
+    a worker and ignores the request if a sort is already running).
+    """
+    def __init__(self, run_callback):
+        self.run_callback = run_callback
+        self._stop_event = Event()
+        self._wake_event = Event()
+        self._thread = None
+        self.next_run = None # datetime of the next planned run, for display
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, name="SortScheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    def reload(self):
+        """Recompute the next run after the schedule config changed."""
+        self._wake_event.set()
+
+    @staticmethod
+    def _next_slot(schedule, now, last_run):
+        """Next regular (un-jittered) run time, or None if no schedule is set."""
+        if schedule.get('cron'):
+            return CronExpression(schedule['cron']).next_after(now)
+        interval = schedule.get('interval_minutes')
+        if interval:
+            base = last_run or now
+            return max(base + timedelta(minutes=float(interval)), now)
+        return None
+
+    def _wait(self, seconds):
+        """Sleeps up to seconds; returns True if woken early (stop or reload)."""
+        woken = self._wake_event.wait(timeout=max(0.0, seconds))
+        self._wake_event.clear()
+        return woken
+
+    def _run(self):
+        last_run = None
+        while not self._stop_event.is_set():
+            schedule = load_config().get('schedule', {})
+            if not schedule.get('enabled'):
+                self.next_run = None
+                self._wait(60)
+                continue
+            now = datetime.now()
+            try:
+                slot = self._next_slot(schedule, now, last_run)
+            except ValueError as e:
+                print(f"Scheduler: invalid schedule ({e}). Retrying in 5 minutes.")
+                self._wait(300)
+                continue
+            if slot is None:
+                self.next_run = None
+                self._wait(60)
+                continue
+
+            self.next_run = slot + timedelta(seconds=uniform(0, float(schedule.get('jitter_seconds') or 0)))
+            print(f"Scheduler: next sort at {self.next_run:%Y-%m-%d %H:%M:%S}.")
+            if self._wait((self.next_run - datetime.now()).total_seconds()):
+                continue # stopped or config reloaded; recompute
+
+            # Defer while busy, but never past the following regular slot
+            if schedule.get('only_when_idle'):
+                try:
+                    following = self._next_slot(schedule, slot, slot)
+                except ValueError:
+                    following = None
+                deadline = monotonic() + (following - datetime.now()).total_seconds() if following else None
+                while not self._stop_event.is_set() and not machine_is_idle(schedule):
+                    if deadline is not None and monotonic() >= deadline:
+                        print("Scheduler: machine stayed busy until the next slot, skipping this run.")
+                        break
+                    self._wait(float(schedule.get('idle_retry_seconds') or 60))
+                else:
+                    if not self._stop_event.is_set():
+                        self._fire()
+                last_run = datetime.now()
+                continue
+
+            self._fire()
+            last_run = datetime.now()
+
+    def _fire(self):
+        print("Scheduler: starting scheduled sort.")
+        try:
+            self.run_callback()
+        except Exception as e:
+            print(f"Scheduler: error starting scheduled sort: {e}")
+# endregion
@@ -0,0 +1,185 @@
+"""
+
+Keeps one Folder Sorter running per user.
+
+The first instance holds an exclusive lock on a file in the user's runtime
+(or temp) folder, and listens on a loopback port for commands. It writes the
+port and a random token to a sidecar file that only the user can read. A second
+launch fails to get the lock, sends its command ('open-config' or 'sort') to
+the first instance and exits. It never imports the GUI stack. The first
+instance only starts listening once its GUI stack is loaded, so a second
+launch keeps retrying for up to FORWARD_WAIT_SECONDS, and tells the user if it
+still cannot deliver the command.
+
+Stdlib only: this module runs before anything heavy is imported.
+
+"""
+
+import json
+import os
+import secrets
+import socket
+import sys
+import tempfile
+from getpass import getuser
+from os import path
+from threading import Thread
+from time import monotonic, sleep
+
+FORWARD_WAIT_SECONDS = 30.0 # how long a second launch keeps trying to reach a first one that is still starting
+WAITING_NOTICE_SECONDS = 1.0 # after this, the second launch says it is waiting
+CONNECT_TIMEOUT = 5.0
+
+def _runtime_dir():
+    return os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+
+def _lock_file(f):
+    """Takes a non-blocking exclusive lock on the open file f. Returns False if another process holds it."""
+    try:
+        if sys.platform == 'win32':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+def _show_error(message):
+    """Prints message to stderr, or shows it in a message box when there is no console (pythonw on Windows)."""
+    if sys.stderr is not None:
+        print(message, file=sys.stderr)
+    elif sys.platform == 'win32':
+        import ctypes
+        MB_ICONERROR = 0x10
+        ctypes.windll.user32.MessageBoxW(None, message, "Folder Sorter", MB_ICONERROR)
+
+def _unlock_file(f):
+    try:
+        if sys.platform == 'win32':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    except OSError:
+        pass
+
+class SingleInstance:
+    """The per-user instance lock plus the command listener of the instance that holds it."""
+    def __init__(self, name='folder-sorter'):
+        try:
+            user = getuser()
+        except Exception:
+            user = 'user'
+        base = path.join(_runtime_dir(), f"{name}-{user}")
+        self.lock_path = base + '.lock'
+        self.info_path = base + '.json' # port and token of the running instance
+        self._lock_handle = None
+        self._listener = None
+        self._token = None
+
+    def acquire(self):
+        """Returns True if this process is now the running instance."""
+        handle = open(self.lock_path, 'a+b')
+        if not _lock_file(handle):
+            handle.close()
+            return False
+        self._lock_handle = handle
+        try:
+            os.remove(self.info_path) # left behind by an instance that crashed
+        except OSError:
+            pass
+        return True
+
+    def serve(self, handlers):
+        """Listens for commands from later launches; handlers maps a command to a no-argument callable."""
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(4)
+        self._listener = listener
+        self._token = secrets.token_hex(16)
+        info = {'pid': os.getpid(), 'port': listener.getsockname()[1], 'token': self._token}
+        temp_path = self.info_path + '.tmp'
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(info, f)
+        os.replace(temp_path, self.info_path)
+        Thread(target=self._accept_loop, args=(listener, handlers), name="InstanceListener", daemon=True).start()
+
+    def _accept_loop(self, listener, handlers):
+        while True:
+            try:
+                connection, _ = listener.accept()
+            except OSError:
+                return # listener closed on release()
+            with connection:
+                connection.settimeout(CONNECT_TIMEOUT)
+                try:
+                    token, _, command = connection.makefile('r', encoding='utf-8').readline().strip().partition(' ')
+                except (OSError, UnicodeDecodeError):
+                    continue
+                if not secrets.compare_digest(token, self._token) or command not in handlers:
+                    connection.sendall(b"error\n")
+                    continue
+                print(f"Received '{command}' from another launch.")
+                try:
+                    handlers[command]()
+                    connection.sendall(b"ok\n")
+                except Exception as e:
+                    print(f"Error handling forwarded command '{command}': {e}")
+                    connection.sendall(b"error\n")
+
+    def forward(self, command):
+        """Sends command to the running instance. Returns True if it was accepted.
+
+        Retries while the running instance is still starting up (no port file yet,
+        or not accepting connections) for up to FORWARD_WAIT_SECONDS. A failure is
+        shown to the user rather than dropped.
+        """
+        started = monotonic()
+        deadline = started + FORWARD_WAIT_SECONDS
+        told_waiting = False
+        while True:
+            try:
+                with open(self.info_path, 'r') as f:
+                    info = json.load(f)
+                connection = socket.create_connection(('127.0.0.1', info['port']), timeout=CONNECT_TIMEOUT)
+                break
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # The running instance may still be starting up
+                if monotonic() >= deadline:
+                    _show_error(f"Folder Sorter is already running, but could not be reached to '{command}' "
+                                f"within {FORWARD_WAIT_SECONDS:.0f} s ({e}). Try again once it has started.")
+                    return False
+                if not told_waiting and monotonic() - started >= WAITING_NOTICE_SECONDS:
+                    print("Folder Sorter is still starting; waiting for it...")
+                    told_waiting = True
+                sleep(0.2)
+        # Connected: the command is sent once, never retried, so it cannot run twice
+        try:
+            with connection:
+                connection.sendall(f"{info['token']} {command}\n".encode('utf-8'))
+                reply = connection.makefile('r', encoding='utf-8').readline().strip()
+        except OSError as e:
+            _show_error(f"Lost the connection to the running Folder Sorter while sending '{command}': {e}")
+            return False
+        if reply != 'ok':
+            _show_error(f"The running Folder Sorter could not carry out '{command}'.")
+        return reply == 'ok'
+
+    def release(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            try:
+                os.remove(self.info_path)
+            except OSError:
+                pass
+        if self._lock_handle is not None:
+            _unlock_file(self._lock_handle)
+            self._lock_handle.close()
+            self._lock_handle = None
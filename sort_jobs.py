@@ -0,0 +1,239 @@
+"""
+
+Sort jobs for the tray process: one background run per root, shared by every trigger.
+
+The tray menu, the scheduler and the control API all start sorts through a
+SortJobs instance. A request for a root that is already being sorted joins the
+running job instead of starting a second one (it is coalesced), so every caller
+sees the same progress and result.
+
+Files a sort deferred because they were still being written are picked up by
+a follow-up job ('follow-up' source) after the stability quiet window. It
+re-checks only those files, without rescanning the folder, and is rescheduled
+with a growing delay up to stability.recheck_passes times. A new sort of the
+root replaces any pending follow-up, since it plans every file anyway.
+
+"""
+
+from itertools import count
+from os import path
+from threading import Thread, Event, Lock, Timer
+from time import time
+
+import file_sorter
+from config_manager import load_config
+from throttle import lower_current_thread_priority
+
+def _root_key(root):
+    return path.normcase(path.abspath(root))
+
+class SortJob:
+    """One background sort of one root."""
+    _ids = count(1)
+
+    def __init__(self, root, source):
+        self.id = next(self._ids)
+        self.root = root
+        self.source = source # 'tray', 'schedule', 'api' or 'follow-up'
+        self.cancel_event = Event()
+        self.done = Event()
+        self.progress = None # latest SortProgress
+        self.error = None    # error message returned by the sort, if any
+        self.coalesced = 0   # requests that joined this job while it ran
+        self.started_at = time()
+        self.finished_at = None
+        self.thread = None
+        self.follow_up = None # for a follow-up job: the Sorter whose deferred files it re-checks
+        self.attempt = 0      # follow-up pass number
+
+    @property
+    def running(self):
+        return not self.done.is_set()
+
+    def to_dict(self):
+        progress = self.progress
+        return {
+            'id': self.id,
+            'root': self.root,
+            'source': self.source,
+            'running': self.running,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+            'coalesced_requests': self.coalesced,
+            'progress': None if progress is None else {
+                'phase': progress.phase,
+                'done': progress.done,
+                'total': progress.total,
+                'moved': progress.moved,
+                'percent': round(progress.percent, 1),
+                'files_per_second': round(progress.files_per_second, 1),
+                'eta_seconds': progress.eta_seconds,
+                'cancelled': progress.cancelled,
+                'finished': progress.finished,
+            },
+        }
+
+class SortJobs:
+    """Starts, coalesces, cancels and reports background sorts.
+
+    Listeners are called from the job's worker thread:
+        on_progress(job, progress)  throttled progress of any job
+        on_finished(job)            after a job ended; it no longer counts as running
+    """
+    def __init__(self, on_progress=None, on_finished=None):
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self._lock = Lock()
+        self._active = {} # root key -> running SortJob
+        self.last_job = None
+        self.counters = dict.fromkeys(('runs_started', 'runs_coalesced', 'runs_completed', 'runs_cancelled',
+                                       'runs_failed', 'files_sorted'), 0)
+        self.total_run_seconds = 0.0
+        self._follow_ups = {} # root key -> Timer of the pending follow-up pass
+
+    def _resolve_root(self, root):
+        return root or load_config().get('folder_path') or ''
+
+    def start(self, root=None, source='api'):
+        """Starts a sort of root (default: the configured folder). Returns (job, coalesced)."""
+        root = self._resolve_root(root)
+        key = _root_key(root) if root else ''
+        with self._lock:
+            job = self._active.get(key)
+            if job is not None:
+                job.coalesced += 1
+                self.counters['runs_coalesced'] += 1
+                return job, True
+            self._cancel_follow_up(key)
+            job = self._active[key] = SortJob(root, source)
+            self._launch(job, key)
+        return job, False
+
+    def _launch(self, job, key):
+        self.counters['runs_started'] += 1
+        job.thread = Thread(target=self._run, args=(job, key), name=f"SortWorker-{job.id}", daemon=True)
+        job.thread.start()
+
+    def _cancel_follow_up(self, key):
+        timer = self._follow_ups.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _schedule_follow_up(self, job, key, sorter):
+        """After a job that deferred files, schedules a pass that re-checks just those files."""
+        attempt = job.attempt + 1
+        if not sorter.deferred or job.cancel_event.is_set() \
+                or attempt > int(sorter.options.stability.get('recheck_passes', 5)):
+            return
+        delay = sorter.retry_delay(attempt)
+        print(f"Re-checking {len(sorter.deferred)} deferred file(s) in '{job.root}' in {delay:.0f}s.")
+        timer = Timer(delay, self._start_follow_up, args=(job.root, key, sorter, attempt))
+        timer.daemon = True
+        with self._lock:
+            self._cancel_follow_up(key)
+            self._follow_ups[key] = timer
+        timer.start()
+
+    def _start_follow_up(self, root, key, sorter, attempt):
+        with self._lock:
+            if self._follow_ups.get(key) is None or key in self._active:
+                return # replaced by a new sort of the root, which plans these files too
+            del self._follow_ups[key]
+            job = self._active[key] = SortJob(root, 'follow-up')
+            job.follow_up = sorter
+            job.attempt = attempt
+            self._launch(job, key)
+
+    def _run(self, job, key):
+        try:
+            throttle_settings = load_config().get('throttle', {})
+            # This thread exists only for this job, so lowering its priority is safe
+            lower_current_thread_priority(throttle_settings.get('nice', 0), throttle_settings.get('idle_io', False))
+
+            def progress_callback(progress):
+                job.progress = progress
+                if self.on_progress:
+                    self.on_progress(job, progress)
+
+            if job.follow_up is not None:
+                sorter = job.follow_up
+                sorter.on_progress = progress_callback
+                job.error = sorter.run_deferred(job.cancel_event)
+            else:
+                sorter = file_sorter.sorter_from_config(root=job.root, progress_callback=progress_callback)
+                job.error = sorter.run(job.cancel_event)
+            if sorter.progress is not None:
+                job.progress = sorter.progress
+        except Exception as e:
+            print(f"Unexpected error during sort: {e}")
+            job.error = f"Unexpected error during sort: {e}"
+            sorter = None
+        finally:
+            job.finished_at = time()
+            with self._lock:
+                self._active.pop(key, None)
+                self.last_job = job
+                self.total_run_seconds += job.finished_at - job.started_at
+                if job.error:
+                    self.counters['runs_failed'] += 1
+                elif job.progress is not None and job.progress.cancelled:
+                    self.counters['runs_cancelled'] += 1
+                else:
+                    self.counters['runs_completed'] += 1
+                if job.progress is not None:
+                    self.counters['files_sorted'] += job.progress.moved
+            job.done.set()
+            if sorter is not None and not job.error:
+                self._schedule_follow_up(job, key, sorter)
+            if self.on_finished:
+                try:
+                    self.on_finished(job)
+                except Exception as e:
+                    print(f"Error in sort finished callback: {e}")
+
+    def active(self, root=None):
+        """The running job for root (default: the configured folder), or None."""
+        root = self._resolve_root(root)
+        with self._lock:
+            return self._active.get(_root_key(root) if root else '')
+
+    def running_jobs(self):
+        with self._lock:
+            return list(self._active.values())
+
+    def cancel(self, root=None):
+        """Asks the job for root to stop after its in-flight move. Returns the job, or None if none ran."""
+        job = self.active(root)
+        if job is not None:
+            print("Cancelling sort...")
+            job.cancel_event.set()
+        return job
+
+    def cancel_all(self, timeout=5.0):
+        with self._lock:
+            for key in list(self._follow_ups):
+                self._cancel_follow_up(key)
+        for job in self.running_jobs():
+            job.cancel_event.set()
+            job.done.wait(timeout)
+
+    def status(self):
+        with self._lock:
+            last_job = self.last_job
+            running = list(self._active.values())
+        return {
+            'running': [job.to_dict() for job in running],
+            'last_run': last_job.to_dict() if last_job else None,
+        }
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self.counters)
+            metrics['running'] = len(self._active)
+            metrics['total_run_seconds'] = round(self.total_run_seconds, 3)
+        metrics['throttle'] = {
+            'moves_per_second': file_sorter.sort_throttle.moves_per_second,
+            'bytes_per_second': file_sorter.sort_throttle.bytes_per_second,
+        }
+        return metrics
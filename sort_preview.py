@@ -0,0 +1,74 @@
+"""
+
+Sort preview: what a sort of the folder would do, without moving anything.
+
+CLI:
+    python sort_preview.py [folder] [--json]
+
+Defaults to the configured folder_path. Categories with a destination template
+are shown per dated folder ('Images/2024/06'). The config GUI shows the same
+report in its Preview window.
+
+"""
+
+import json
+import sys
+from argparse import ArgumentParser
+
+from config_manager import load_config
+from file_sorter import SortOptions, SortRules, preview_sort
+from notifier import format_size
+
+def format_preview(snapshot, max_examples=10):
+    """Formats a SortPreview snapshot as report lines."""
+    lines = []
+    state = "cancelled" if snapshot['cancelled'] else ("done" if snapshot['finished'] else "scanning...")
+    lines.append(f"Preview of '{snapshot['folder_path']}' ({snapshot['scanned']} files scanned, {state})")
+    if snapshot['error']:
+        lines.append(snapshot['error'])
+    lines.append("")
+
+    categories = sorted(snapshot['categories'].items(), key=lambda item: item[1][1], reverse=True)
+    total_files = sum(files for files, _ in snapshot['categories'].values())
+    total_bytes = sum(size for _, size in snapshot['categories'].values())
+    width = max([len(category) for category, _ in categories] + [len('Unmatched')])
+    for category, (files, size) in categories:
+        lines.append(f"{category:<{width}}  {files:>8}  {format_size(size):>10}")
+    lines.append(f"{'To move':<{width}}  {total_files:>8}  {format_size(total_bytes):>10}")
+    lines.append(f"{'Unmatched':<{width}}  {snapshot['unmatched_files']:>8}  {format_size(snapshot['unmatched_bytes']):>10}")
+
+    if snapshot['collisions']:
+        lines.append("")
+        lines.append(f"{snapshot['collisions']} file(s) already exist in their category and will be renamed, e.g.:")
+        for filename, category in snapshot['collision_examples'][:max_examples]:
+            lines.append(f"  {filename} -> {category}")
+    if snapshot['unmatched_examples']:
+        lines.append("")
+        lines.append("Unmatched files stay in place, e.g.:")
+        for filename in snapshot['unmatched_examples'][:max_examples]:
+            lines.append(f"  {filename}")
+    return lines
+
+def main(argv=None):
+    parser = ArgumentParser(description="Show what sorting a folder would do, without moving anything.")
+    parser.add_argument('folder', nargs='?', help="folder to preview (defaults to the configured folder)")
+    parser.add_argument('--json', action='store_true', help="print the result as JSON")
+    args = parser.parse_args(argv)
+
+    config_data = load_config()
+    folder_path = args.folder or config_data.get('folder_path')
+    if not folder_path:
+        print("Folder path is not set. Pass a folder or configure one.", file=sys.stderr)
+        return 1
+
+    preview = preview_sort(folder_path, SortRules(config_data.get('folder_extensions_mapping', {})),
+                           options=SortOptions.from_config(config_data))
+    snapshot = preview.snapshot()
+    if args.json:
+        print(json.dumps(snapshot, indent=4))
+    else:
+        print("\n".join(format_preview(snapshot)))
+    return 1 if snapshot['error'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+
+Compiled sort rules, kept free of GUI/config imports so worker processes can load them cheaply.
+
+"""
+
+from types import MappingProxyType
+
+from linker import VIEW_MANIFEST_NAME
+from root_lock import LOCK_FILE_NAME, RERUN_FILE_NAME
+
+# Bookkeeping files the app keeps in a sorted root; never sorted themselves
+RESERVED_NAMES = frozenset((LOCK_FILE_NAME, RERUN_FILE_NAME, VIEW_MANIFEST_NAME))
+
+def file_extension_of(filename):
+    """Returns the lowercased extension used for matching, or None if the name has no '.'."""
+    if '.' not in filename:
+        return None
+    return filename.split('.')[-1].lower() # Normalize extension for comparison
+
+class SortRules:
+    """Immutable extension -> category lookup compiled from a folder_extensions_mapping.
+
+    When an extension is listed under several categories the first one in mapping
+    order wins, matching the order the old per-file category scan used.
+    """
+    __slots__ = ('mapping', 'by_extension')
+
+    def __init__(self, folder_extensions_mapping):
+        by_extension = {}
+        for category_folder_name, configured_extensions in folder_extensions_mapping.items():
+            for ext in configured_extensions:
+                by_extension.setdefault(ext.lower(), category_folder_name)
+        object.__setattr__(self, 'mapping', MappingProxyType(
+            {folder: tuple(exts) for folder, exts in folder_extensions_mapping.items()}))
+        object.__setattr__(self, 'by_extension', MappingProxyType(by_extension))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SortRules is immutable")
+
+    def category_for(self, filename):
+        """Returns the category folder name for filename, or None if it is unmatched."""
+        if filename in RESERVED_NAMES:
+            return None
+        file_extension = file_extension_of(filename)
+        if file_extension is None:
+            return None
+        return self.by_extension.get(file_extension)
@@ -0,0 +1,145 @@
+"""
+
+Detects files that are still being written, so a sort leaves them for later.
+
+A file is deferred when:
+  - its name is a browser/downloader temp name (.crdownload, .part, .tmp, ...),
+    or such a temp file sits next to it (Firefox keeps a placeholder 'x.pdf'
+    beside 'x.pdf.part' until the download ends);
+  - its size or mtime changed within the quiet window;
+  - another process has it open for writing (Linux: /proc/*/fd, scanned once
+    per pass of checks; Windows: the file cannot be opened without sharing).
+
+A run never waits for deferred files while it holds the root, and creates no
+folders for them. It keeps them (Sorter.deferred), and a follow-up pass
+re-checks just those names after quiet_seconds, without rescanning the folder
+(Sorter.run_deferred; the tray's SortJobs schedules it). The delay doubles for
+every pass that finds them still busy.
+
+"""
+
+import os
+import platform
+from os import path
+from time import time
+
+DEFAULT_QUIET_SECONDS = 5
+FOLLOW_UP_MAX_DELAY = 300.0 # longest wait between follow-up passes
+TEMP_SUFFIXES = ('.crdownload', '.part', '.partial', '.download', '.tmp', '.opdownload', '.!ut', '.!qb')
+
+def _open_for_writing_linux(folder_path):
+    """Returns the names of files directly in folder_path that some process has open with write access.
+
+    One pass over /proc/*/fd, whatever the number of files in the folder.
+    """
+    real_folder = path.realpath(folder_path)
+    busy = set()
+    try:
+        pids = [pid for pid in os.listdir('/proc') if pid.isdigit()]
+    except OSError:
+        return busy
+    for pid in pids:
+        fd_dir = f'/proc/{pid}/fd'
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue # process gone, or not ours to inspect
+        for fd in fds:
+            try:
+                target = os.readlink(f'{fd_dir}/{fd}')
+            except OSError:
+                continue
+            if path.dirname(target) != real_folder:
+                continue
+            try:
+                with open(f'/proc/{pid}/fdinfo/{fd}') as f:
+                    flags = int(f.readline().split()[1], 8) # 'flags:\t0100001'
+            except (OSError, ValueError, IndexError):
+                continue
+            if flags & (os.O_WRONLY | os.O_RDWR):
+                busy.add(path.basename(target))
+    return busy
+
+def _locked_on_windows(file_path):
+    """True if another process holds file_path open in a way that denies sharing."""
+    import ctypes
+    from ctypes import wintypes
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    kernel32.CreateFileW.restype = wintypes.HANDLE
+    GENERIC_READ, OPEN_EXISTING, INVALID_HANDLE_VALUE = 0x80000000, 3, wintypes.HANDLE(-1).value
+    ERROR_SHARING_VIOLATION = 32
+    handle = kernel32.CreateFileW(file_path, GENERIC_READ, 0, None, OPEN_EXISTING, 0, None) # share mode 0 = exclusive
+    if handle == INVALID_HANDLE_VALUE:
+        return ctypes.get_last_error() == ERROR_SHARING_VIOLATION
+    kernel32.CloseHandle(handle)
+    return False
+
+def follow_up_delay(quiet_seconds, attempt):
+    """Seconds before follow-up pass number attempt (1-based): quiet_seconds, then doubling."""
+    return min(FOLLOW_UP_MAX_DELAY, max(1.0, float(quiet_seconds)) * 2 ** (attempt - 1))
+
+class StabilityChecker:
+    """Decides per file whether it is safe to move now. See the module docstring.
+
+    settings is the 'stability' section of the config. Call prepare() before each
+    pass of checks, so the folder-wide scans run once per pass, not per file.
+    """
+    def __init__(self, folder_path, settings):
+        self.folder_path = folder_path
+        self.quiet_seconds = float(settings.get('quiet_seconds', DEFAULT_QUIET_SECONDS))
+        self.check_open_handles = settings.get('check_open_handles', True)
+        self.temp_suffixes = tuple(s.lower() for s in settings.get('temp_suffixes', TEMP_SUFFIXES))
+        self._open_for_writing = set()
+        self._temp_names = set() # lowercased names of temp files in the folder
+        self._last_seen = {} # deferred filename -> (size, mtime_ns) when it was deferred
+
+    def prepare(self):
+        """Collects folder-wide facts for a pass of checks: temp siblings and open write handles."""
+        try:
+            self._temp_names = {name.lower() for name in os.listdir(self.folder_path)
+                                if name.lower().endswith(self.temp_suffixes)}
+        except OSError:
+            self._temp_names = set()
+        self._open_for_writing = set()
+        if self.check_open_handles and platform.system() == "Linux":
+            self._open_for_writing = _open_for_writing_linux(self.folder_path)
+
+    def check(self, filename):
+        """Returns why filename should be deferred, or None if it looks complete."""
+        lower_name = filename.lower()
+        if lower_name.endswith(self.temp_suffixes):
+            return "temporary download file"
+        if any(lower_name + suffix in self._temp_names for suffix in self.temp_suffixes):
+            return "download in progress"
+
+        file_path = path.join(self.folder_path, filename)
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            return None # let the move report it
+        signature = (file_stat.st_size, file_stat.st_mtime_ns)
+        previous = self._last_seen.pop(filename, None)
+        age = time() - file_stat.st_mtime
+        reason = None
+        if previous is not None and previous != signature:
+            reason = "still growing"
+        elif 0 <= age < self.quiet_seconds:
+            reason = f"modified {age:.0f}s ago"
+        elif filename in self._open_for_writing:
+            reason = "open for writing by another program"
+        elif self.check_open_handles and platform.system() == "Windows" and _locked_on_windows(file_path):
+            reason = "in use by another program"
+        if reason:
+            self._last_seen[filename] = signature # only deferred files are remembered
+        return reason
+
+    def seconds_until_quiet(self, filenames):
+        """Shortest wait after which one of filenames may have been quiet for the whole window."""
+        now = time()
+        waits = []
+        for filename in filenames:
+            try:
+                waits.append(self.quiet_seconds - (now - os.stat(path.join(self.folder_path, filename)).st_mtime))
+            except OSError:
+                continue
+        return max(0.5, min(waits, default=self.quiet_seconds))
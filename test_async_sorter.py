@@ -0,0 +1,44 @@
+"""
+
+Tests for async_sorter: embedding it must not touch the user's files. Run with:
+
+    python -m unittest test_async_sorter
+
+"""
+
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from os import path
+
+HERE = path.dirname(path.abspath(__file__))
+
+def listing(folder):
+    """Every file and folder under folder, relative to it."""
+    return sorted(path.relpath(path.join(dirpath, name), folder)
+                  for dirpath, dirnames, filenames in os.walk(folder) for name in dirnames + filenames)
+
+class ImportTest(unittest.TestCase):
+    def setUp(self):
+        # A copy of the modules, so a stray config.json or cache would show up here
+        self.package = tempfile.mkdtemp()
+        for module in glob.glob(path.join(HERE, '*.py')):
+            shutil.copy2(module, self.package)
+
+    def tearDown(self):
+        shutil.rmtree(self.package, ignore_errors=True)
+
+    def test_import_leaves_filesystem_untouched(self):
+        before = listing(self.package)
+        result = subprocess.run([sys.executable, '-B', '-c', "import async_sorter"],
+                                cwd=self.package, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(listing(self.package), before)
+        self.assertNotIn('config', result.stdout.lower())
+
+if __name__ == "__main__":
+    unittest.main()
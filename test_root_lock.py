@@ -0,0 +1,66 @@
+"""
+
+Tests for root_lock: the cross-process lock must survive everything its
+holder's own process does with the lock file. Run with:
+
+    python -m unittest test_root_lock
+
+"""
+
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from os import path
+
+from root_lock import RootLock
+
+HERE = path.dirname(path.abspath(__file__))
+
+def child_can_acquire(root):
+    """Whether a fresh process can take the lock of root right now."""
+    code = ("import sys; from root_lock import RootLock; "
+            "sys.exit(0 if RootLock(sys.argv[1]).try_acquire() else 1)")
+    return subprocess.run([sys.executable, '-c', code, root], cwd=HERE).returncode == 0
+
+@unittest.skipIf(sys.platform == 'win32', "lockf semantics are POSIX-only")
+class RootLockTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_child_cannot_acquire_held_lock(self):
+        lock = RootLock(self.root)
+        self.assertTrue(lock.try_acquire())
+        try:
+            self.assertFalse(child_can_acquire(self.root))
+        finally:
+            lock.release()
+        self.assertTrue(child_can_acquire(self.root))
+
+    def test_holder_keeps_lock(self):
+        lock = RootLock(self.root)
+        self.assertTrue(lock.try_acquire())
+        try:
+            self.assertIn('pid', lock.holder())
+            self.assertIn('pid', RootLock(self.root).holder()) # another RootLock of the same root
+            self.assertFalse(child_can_acquire(self.root))
+        finally:
+            lock.release()
+
+    def test_second_lock_in_process_does_not_drop_it(self):
+        lock = RootLock(self.root)
+        self.assertTrue(lock.try_acquire())
+        try:
+            other = RootLock(self.root)
+            self.assertFalse(other.try_acquire())
+            other.release()
+            self.assertFalse(child_can_acquire(self.root))
+        finally:
+            lock.release()
+
+if __name__ == "__main__":
+    unittest.main()
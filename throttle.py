@@ -0,0 +1,121 @@
+"""
+
+Rate limiting and priority control for the move stage.
+
+MoveThrottle holds two token buckets, one for moves per second and one for
+bytes per second. The limits can be changed while a sort is running: a waiting
+sort checks for new limits (and for cancel) at least every WAIT_SLICE seconds.
+A rate of 0 means no limit.
+
+lower_current_thread_priority applies nice and/or the idle I/O class to the
+calling thread only. Linux only; elsewhere it does nothing.
+
+"""
+
+import os
+import platform
+import subprocess
+from threading import Lock, get_native_id
+from time import monotonic, sleep
+
+WAIT_SLICE = 0.25 # longest uninterrupted sleep, so limit changes and cancel apply quickly
+
+class TokenBucket:
+    """Token bucket allowing `rate` units per second with bursts of up to `burst` units.
+
+    acquire() takes the tokens first and then sleeps off any debt. A single request
+    larger than the burst (one big file) therefore still goes through, and the
+    following requests wait until the debt has been paid back.
+    """
+    def __init__(self, rate=0, burst=None):
+        self._lock = Lock()
+        self.rate = 0.0
+        self.burst = 0.0
+        self.tokens = 0.0
+        self._updated = monotonic()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate, burst=None):
+        with self._lock:
+            self._refill()
+            was_limited = bool(self.rate)
+            self.rate = max(0.0, float(rate or 0))
+            self.burst = float(burst) if burst else self.rate # one second's worth by default
+            # A new limit starts with a full bucket; a changed one keeps any debt
+            self.tokens = (min(self.tokens, self.burst) if was_limited else self.burst) if self.rate else 0.0
+
+    def _refill(self):
+        now = monotonic()
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1, cancel_event=None):
+        """Takes amount tokens, sleeping while the bucket is in debt. Returns False if cancelled."""
+        with self._lock:
+            if not self.rate:
+                return True
+            self._refill()
+            self.tokens -= amount
+        while True:
+            with self._lock:
+                if not self.rate: # limit lifted while waiting
+                    self.tokens = 0.0
+                    return True
+                self._refill()
+                if self.tokens >= 0:
+                    return True
+                wait = min(WAIT_SLICE, -self.tokens / self.rate)
+            if cancel_event is not None:
+                if cancel_event.wait(wait):
+                    return False
+            else:
+                sleep(wait)
+
+class MoveThrottle:
+    """Moves-per-second and bytes-per-second limits shared by every sort in the process."""
+    def __init__(self):
+        self.moves = TokenBucket()
+        self.bytes = TokenBucket()
+
+    @property
+    def moves_per_second(self):
+        return self.moves.rate
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes.rate
+
+    def configure(self, moves_per_second=None, bytes_per_second=None):
+        """Changes the limits; None leaves a limit as it is, 0 removes it."""
+        if moves_per_second is not None:
+            self.moves.set_rate(moves_per_second)
+        if bytes_per_second is not None:
+            self.bytes.set_rate(bytes_per_second)
+
+    def before_move(self, cancel_event=None):
+        return self.moves.acquire(1, cancel_event)
+
+    def after_move(self, size, cancel_event=None):
+        return self.bytes.acquire(size, cancel_event)
+
+def lower_current_thread_priority(nice_increment=0, idle_io=False):
+    """Lowers the CPU (nice) and/or I/O (idle class) priority of the calling thread on Linux.
+
+    Unprivileged processes cannot raise a priority again, so only call this on a
+    thread that exists just for the sort.
+    """
+    if platform.system() != "Linux" or not (nice_increment or idle_io):
+        return
+    thread_id = get_native_id() # on Linux, priorities set on a thread id apply to that thread only
+    if nice_increment:
+        try:
+            os.setpriority(os.PRIO_PROCESS, thread_id, os.getpriority(os.PRIO_PROCESS, thread_id) + int(nice_increment))
+        except OSError as e:
+            print(f"Could not lower CPU priority of the sort thread: {e}")
+    if idle_io:
+        try:
+            subprocess.run(['ionice', '-c', '3', '-p', str(thread_id)], check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=5)
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Could not set idle I/O priority for the sort thread: {e}")
@@ -1,25 +1,86 @@
+import secrets
 from threading import Thread
 from PIL import Image
-from config_manager import APP_ICON
+from config_manager import APP_ICON, load_config, reload_config, save_config
 from pystray import Icon, Menu, MenuItem
 
 import file_sorter
 import gui
+from control_server import ControlServer
+from scheduler import SortScheduler
+from sort_jobs import SortJobs
 
 # Global reference to the tray app and GUI thread to keep track of when they are running
 tray_app = None
 config_gui_thread = None
 
-def run_sort_files():
-    """Run the file sorting operation, showing a popup if needed in its own thread."""
-    error_message = file_sorter.sort_files()
-    if error_message:
+TRAY_TITLE = "Folder Sorter"
+
+# Speed limit presets for the tray menu: (label, bytes per second), 0 = unlimited
+SPEED_LIMITS = (("Unlimited", 0), ("50 MB/s", 50 * 1024 * 1024), ("10 MB/s", 10 * 1024 * 1024), ("2 MB/s", 2 * 1024 * 1024))
+
+# Periodic / idle-time sorts; started alongside the tray thread
+sort_scheduler = None
+
+# Local automation API (control_api in config.json); None unless enabled
+control_server = None
+
+def _on_sort_progress(job, progress):
+    """Progress listener for background sorts; refreshes the tray tooltip and menu."""
+    if not tray_app:
+        return
+    if progress.finished:
+        state = "cancelled" if progress.cancelled else "done"
+        tray_app.title = f"{TRAY_TITLE} - last sort {state}: {progress.moved} moved"
+    else:
+        tray_app.title = f"{TRAY_TITLE} - sorting {progress.describe()}"
+    try:
+        tray_app.update_menu()
+    except Exception as e:
+        print(f"Error updating tray menu: {e}")
+
+def _on_sort_finished(job):
+    """Called once a background sort ended, showing the folder prompt if the sort could not start."""
+    if tray_app:
+        tray_app.update_menu()
+    if job.error and job.source != 'api': # API callers get the error in the response
         # path_prompt_popup on the main GUI thread if available
         if gui.app and gui.app.winfo_exists():
-            gui.app.after(0, lambda msg=error_message: gui.path_prompt_popup(msg))
+            gui.app.after(0, lambda msg=job.error: gui.path_prompt_popup(msg))
         else:
             # otherwise directly call path_prompt_popup which will now handle separate threading itself
-            gui.path_prompt_popup(error_message)
+            gui.path_prompt_popup(job.error)
+
+# Every sort of this process (menu, scheduler, control API) runs through here
+sort_jobs = SortJobs(on_progress=_on_sort_progress, on_finished=_on_sort_finished)
+
+def is_sort_running():
+    return sort_jobs.active() is not None
+
+def _progress_menu_text(item):
+    job = sort_jobs.active()
+    if job is None or job.progress is None:
+        return "Sorting..."
+    return f"Sorting {job.progress.describe()}"
+
+def run_sort_files(source='tray'):
+    """Start sorting the configured folder in the background; joins the running sort if there is one."""
+    job, coalesced = sort_jobs.start(source=source)
+    if coalesced:
+        print("A sort is already running.")
+        return
+    if tray_app:
+        tray_app.title = f"{TRAY_TITLE} - scanning folder..."
+        tray_app.update_menu()
+
+def cancel_sort():
+    """Ask the running sort to stop after its in-flight move."""
+    sort_jobs.cancel()
+
+def _speed_limit_item(label, bytes_per_second):
+    """Menu entry that switches the speed limit, taking effect on a running sort too."""
+    return MenuItem(label, lambda icon, item: file_sorter.set_throttle_limits(bytes_per_second=bytes_per_second),
+                    checked=lambda item: file_sorter.sort_throttle.bytes_per_second == bytes_per_second, radio=True)
 
 def _config_gui_target():
     """Target function to run config_gui and manage gui.app state."""
@@ -57,6 +118,16 @@ def quit_app():
     global tray_app, config_gui_thread # gui.standalone_popup_thread is managed within gui.py mostly
     print("Quit requested.")
 
+    if sort_scheduler:
+        sort_scheduler.stop()
+    if control_server:
+        control_server.stop()
+
+    # Stop running sorts after their current move
+    sort_jobs.cancel_all(timeout=5.0)
+    if sort_jobs.running_jobs():
+        print("Warning: Sort worker did not stop in time.")
+
     # Close the standalone popup window if it's running
     if gui.standalone_popup_window and gui.standalone_popup_window.winfo_exists():
         print("Attempting to close standalone popup window...")
@@ -106,16 +177,23 @@ def setup_tray():
     # Load icon image
     icon_image = Image.open(APP_ICON) 
 
+    # Apply the saved speed limit before the first sort, so the menu shows it
+    throttle_settings = load_config().get('throttle', {})
+    file_sorter.sort_throttle.configure(throttle_settings.get('moves_per_second', 0), throttle_settings.get('bytes_per_second', 0))
+
     # Create menu items
     menu = Menu(
-        MenuItem('Sort Folder', run_sort_files),
+        MenuItem('Sort Folder', lambda icon, item: run_sort_files(), enabled=lambda item: not is_sort_running()),
+        MenuItem(_progress_menu_text, None, enabled=False, visible=lambda item: is_sort_running()),
+        MenuItem('Cancel sort', cancel_sort, visible=lambda item: is_sort_running()),
+        MenuItem('Speed limit', Menu(*(_speed_limit_item(label, rate) for label, rate in SPEED_LIMITS))),
         MenuItem('Configure', open_config_gui), # will run in a separate thread
         MenuItem('Quit', quit_app)
     )
 
     # Create tray icon
     tray_app = Icon("FolderSorter", icon_image, menu=menu)
-    tray_app.title = "Folder Sorter"
+    tray_app.title = TRAY_TITLE
     
     print("Running tray icon...")
     # Run the tray icon (blocking call in this thread)
@@ -123,10 +201,51 @@ def setup_tray():
     print("Tray icon stopped.")
 
 
+def start_scheduler():
+    """Start the sort scheduler; it idles until a schedule is enabled in config.json."""
+    global sort_scheduler
+    if sort_scheduler is None:
+        sort_scheduler = SortScheduler(lambda: run_sort_files(source='schedule'))
+    sort_scheduler.start()
+    return sort_scheduler
+
+def reload_settings():
+    """Re-reads config.json and applies it to the running app. Returns False if the file could not be read."""
+    if not reload_config():
+        return False
+    throttle_settings = load_config().get('throttle', {})
+    file_sorter.sort_throttle.configure(throttle_settings.get('moves_per_second', 0), throttle_settings.get('bytes_per_second', 0))
+    if sort_scheduler:
+        sort_scheduler.reload()
+    if tray_app:
+        tray_app.update_menu()
+    return True
+
+def start_control_server():
+    """Start the local control API if it is enabled in config.json."""
+    global control_server
+    settings = load_config().get('control_api', {})
+    if not settings.get('enabled') or control_server is not None:
+        return control_server
+    if not settings.get('token'):
+        settings['token'] = secrets.token_urlsafe(24)
+        save_config()
+        print("Control API: generated an access token (control_api.token in config.json).")
+    server = ControlServer(sort_jobs, dict(settings), reload_callback=reload_settings)
+    try:
+        server.start()
+    except OSError as e:
+        print(f"Could not start the control API: {e}")
+        return None
+    control_server = server
+    return control_server
+
 def start_tray_thread():
     """Start the tray icon in a separate thread"""
     print("Starting tray thread...")
     tray_thread = Thread(target=setup_tray, daemon=True)
     tray_thread.start()
+    start_scheduler()
+    start_control_server()
     return tray_thread
 